@@ -1,6 +1,9 @@
 document.addEventListener('DOMContentLoaded', () => {
     const API_URL = 'https://raw.githubusercontent.com/kineticquant/OSRS-Gear-Randomizer/main/database/items.json';
+    const SLOTS_URL = 'https://raw.githubusercontent.com/kineticquant/OSRS-Gear-Randomizer/main/database/slots/';
+    const ICONS_URL = 'https://raw.githubusercontent.com/kineticquant/OSRS-Gear-Randomizer/main/database/icons/';
     const categorizedItems = {};
+    let atlasImages = [];
     const rollCounters = {};
     const equippedItems = {};
     let totalRolls = 0;
@@ -24,29 +27,78 @@ document.addEventListener('DOMContentLoaded', () => {
         'melee_strength', 'ranged_strength', 'magic_damage', 'prayer'
     ];
 
+    async function fetchJson(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
+        return response.json();
+    }
+
+    function loadImage(url) {
+        return new Promise((resolve, reject) => {
+            const image = new Image();
+            image.crossOrigin = 'anonymous';
+            image.onload = () => resolve(image);
+            image.onerror = () => reject(new Error(`Could not load ${url}`));
+            image.src = url;
+        });
+    }
+
+    // per-slot bundles are pre-filtered by utils/build_frontend.py
+    async function loadSlotBundles() {
+        const manifest = await fetchJson(`${SLOTS_URL}manifest.json`);
+        const atlases = (manifest.atlases || []).map(entry => loadImage(`${ICONS_URL}${entry.file}?v=${entry.hash}`));
+        await Promise.all(Object.entries(manifest.slots).map(async ([slot, entry]) => {
+            categorizedItems[slot] = await fetchJson(`${SLOTS_URL}${entry.file}?v=${entry.hash}`);
+        }));
+        atlasImages = await Promise.all(atlases);
+    }
+
+    // sprite items are cut out of the shared atlas once and the data URL is kept on the item
+    function iconSource(item) {
+        if (item.sprite && atlasImages.length) {
+            if (!item.iconUrl) {
+                const [atlas, x, y, w, h] = item.sprite;
+                const canvas = document.createElement('canvas');
+                canvas.width = w;
+                canvas.height = h;
+                canvas.getContext('2d').drawImage(atlasImages[atlas], x, y, w, h, 0, 0, w, h);
+                item.iconUrl = canvas.toDataURL();
+            }
+            return item.iconUrl;
+        }
+        return `data:image/png;base64,${item.icon}`;
+    }
+
+    async function loadFullDatabase() {
+        const allItems = await fetchJson(API_URL);
+        for (const id in allItems) {
+            const item = allItems[id];
+            if (item.equipable_by_player && item.equipment) {
+                const slot = item.equipment.slot;
+                if (slot && slot !== 'null') {
+                    if (slot === '2h') {
+                        if (!categorizedItems['weapon']) categorizedItems['weapon'] = [];
+                        categorizedItems['weapon'].push(item);
+                    } else {
+                        if (!categorizedItems[slot]) categorizedItems[slot] = [];
+                        categorizedItems[slot].push(item);
+                    }
+                }
+            }
+        }
+    }
+
     async function initialize() {
         loadingMessage.classList.remove('hidden');
         try {
-            const response = await fetch(API_URL);
-            if (!response.ok) throw new Error(`HTTP error! Status: ${response.status}`);
-            const allItems = await response.json();
-            
-            for (const id in allItems) {
-                const item = allItems[id];
-                if (item.equipable_by_player && item.equipment) {
-                    const slot = item.equipment.slot;
-                    if (slot && slot !== 'null') {
-                        if (slot === '2h') {
-                            if (!categorizedItems['weapon']) categorizedItems['weapon'] = [];
-                            categorizedItems['weapon'].push(item);
-                        } else {
-                            if (!categorizedItems[slot]) categorizedItems[slot] = [];
-                            categorizedItems[slot].push(item);
-                        }
-                    }
-                }
+            try {
+                await loadSlotBundles();
+            } catch (bundleError) {
+                console.warn("Slot bundles unavailable, falling back to the full item database:", bundleError);
+                for (const slot in categorizedItems) delete categorizedItems[slot];
+                await loadFullDatabase();
             }
-            
+
             setupSlotListeners();
             itemNameDisplay.textContent = 'Ready! Click a slot to start.';
 
@@ -127,7 +179,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const slotElement = document.getElementById(slotName);
         const img = slotElement.querySelector('img');
         if (img) {
-            img.src = `data:image/png;base64,${item.icon}`;
+            img.src = iconSource(item);
             img.alt = item.name;
         }
 
@@ -0,0 +1,205 @@
+import codecs
+import hashlib
+import json
+import os
+import time
+
+import requests
+
+from infobox_parser import STAT_MAP
+from item_record import ItemRecord
+from run_metrics import metrics
+
+BASELINE_URL = 'https://raw.githubusercontent.com/osrsbox/osrsbox-db/master/docs/items-complete.json'
+# the osrsbox export has been frozen for years, so the cached copy is only revalidated this rarely
+REVALIDATE_AFTER = 30 * 24 * 3600
+CHUNK_SIZE = 1 << 20
+
+# the item schema the merge scripts write; load(trim=True) drops anything else, for read-only lookups
+ITEM_FIELDS = (
+    'id', 'name', 'last_updated', 'incomplete', 'members', 'tradeable', 'tradeable_on_ge', 'stackable',
+    'stacked', 'noted', 'noteable', 'linked_id_item', 'linked_id_noted', 'linked_id_placeholder',
+    'placeholder', 'equipable', 'equipable_by_player', 'equipable_weapon', 'cost', 'lowalch', 'highalch',
+    'weight', 'buy_limit', 'quest_item', 'release_date', 'examine', 'icon', 'wiki_name', 'wiki_url',
+    'equipment', 'weapon',
+)
+EQUIPMENT_FIELDS = tuple(STAT_MAP.values()) + ('slot',)
+WEAPON_FIELDS = ('attack_speed', 'weapon_type')
+
+
+def trim_item(item):
+    trimmed = {key: item[key] for key in ITEM_FIELDS if key in item}
+    equipment = trimmed.get('equipment')
+    if equipment:
+        trimmed['equipment'] = {key: equipment[key] for key in EQUIPMENT_FIELDS if key in equipment}
+    weapon = trimmed.get('weapon')
+    if weapon:
+        # stances are the bulk of each weapon record and nothing reads them; keep the key like the wiki parser does
+        trimmed['weapon'] = {key: weapon[key] for key in WEAPON_FIELDS if key in weapon}
+        trimmed['weapon']['stances'] = []
+    return trimmed
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def iter_object_items(f, digest=None, chunk_size=CHUNK_SIZE):
+    # yields (key, value) from a top-level JSON object one member at a time, hashing the raw bytes as they're read
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    eof = False
+
+    def read_more():
+        nonlocal eof
+        chunk = f.read(chunk_size)
+        if digest is not None:
+            digest.update(chunk)
+        if not chunk:
+            eof = True
+        return text_decoder.decode(chunk, final=not chunk)
+
+    while True:
+        pos = _skip_whitespace(buffer, 0)
+        if pos < len(buffer) or eof:
+            break
+        buffer += read_more()
+    if pos >= len(buffer) or buffer[pos] != '{':
+        raise ValueError("JSON input is not an object.")
+    pos += 1
+
+    while True:
+        start = pos
+        try:
+            pos = _skip_whitespace(buffer, pos)
+            if buffer[pos] == '}':
+                return
+            if buffer[pos] == ',':
+                pos = _skip_whitespace(buffer, pos + 1)
+            key, pos = decoder.raw_decode(buffer, pos)
+            pos = _skip_whitespace(buffer, pos)
+            if buffer[pos] != ':':
+                raise ValueError(f"Expected ':' after key {key!r} in JSON input.")
+            value, pos = decoder.raw_decode(buffer, _skip_whitespace(buffer, pos + 1))
+        except (IndexError, json.JSONDecodeError):
+            # ran off the end of the buffer mid-member: keep the unparsed tail and read the next chunk
+            if eof:
+                raise ValueError("JSON input is truncated.")
+            buffer = buffer[start:] + read_more()
+            pos = 0
+            continue
+        yield key, value
+
+
+class BaselineCache:
+    # <cache_dir>/items-complete.json plus meta.json with its sha256 and HTTP validators
+    def __init__(self, url=BASELINE_URL, session=None, cache_dir=os.path.join(".cache", "baseline"), offline=False,
+                 revalidate_after=REVALIDATE_AFTER):
+        self.url = url
+        self.session = session or metrics.watch(requests.Session())
+        self.offline = offline
+        self.revalidate_after = revalidate_after
+        self.path = os.path.join(cache_dir, os.path.basename(url) or "baseline.json")
+        self.meta_path = os.path.join(cache_dir, "meta.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.meta = self._load_meta()
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return meta if meta.get("url") == self.url and os.path.exists(self.path) else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_meta(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def refresh(self):
+        # makes sure a cached copy exists, downloading or revalidating it when due; returns False on failure
+        if self.meta and (self.offline or time.time() - self.meta.get("checked", 0) < self.revalidate_after):
+            return True
+        if self.offline:
+            print(f"Offline: no cached baseline at '{self.path}'.")
+            return False
+
+        headers = {}
+        if self.meta:
+            if self.meta.get("etag"):
+                headers["If-None-Match"] = self.meta["etag"]
+            if self.meta.get("last_modified"):
+                headers["If-Modified-Since"] = self.meta["last_modified"]
+        try:
+            with self.session.get(self.url, headers=headers, stream=True) as response:
+                if response.status_code == 304:
+                    self.meta["checked"] = time.time()
+                    self._save_meta()
+                    print("Cached baseline is still current.")
+                    return True
+                response.raise_for_status()
+                # stream straight to disk so the raw text is never held in memory
+                digest = hashlib.sha256()
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                os.replace(tmp_path, self.path)
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching base JSON: {e}")
+            # a stale copy of a frozen file beats no baseline at all
+            return self.meta is not None
+
+        self.meta = {
+            "url": self.url,
+            "sha256": digest.hexdigest(),
+            "size": os.path.getsize(self.path),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked": time.time(),
+        }
+        self._save_meta()
+        print(f"Downloaded base JSON ({self.meta['size'] / (1024 * 1024):.1f} MB) to '{self.path}'.")
+        return True
+
+    def _parse(self, as_records, trim):
+        digest = hashlib.sha256()
+        items = {}
+        with open(self.path, 'rb') as f:
+            for key, value in iter_object_items(f, digest):
+                if trim:
+                    value = trim_item(value)
+                items[key] = ItemRecord.from_dict(value) if as_records else value
+        return items, digest.hexdigest()
+
+    def load(self, as_records=False, trim=False):
+        # returns {id: item}, re-downloading once if the cached copy fails its checksum. trim=True keeps only
+        # the written schema and empties weapon stances, so it's for lookups only: never write trimmed items out
+        for attempt in range(2):
+            if not self.refresh():
+                return None
+            try:
+                items, checksum = self._parse(as_records, trim)
+            except ValueError as e:
+                items, checksum = None, str(e)
+            if items is not None and checksum == self.meta["sha256"]:
+                return items
+            print(f"Cached baseline at '{self.path}' failed its checksum, discarding it.")
+            self.meta = None
+            if self.offline:
+                return None
+        return None
+
+
+def load_baseline(url=BASELINE_URL, session=None, offline=False, as_records=False, trim=False):
+    print("Loading base JSON from the local OSRSBox baseline cache.")
+    items = BaselineCache(url, session, offline=offline).load(as_records, trim)
+    if items is not None:
+        print(f"Successfully loaded base JSON ({len(items)} items).")
+    return items
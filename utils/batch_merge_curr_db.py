@@ -1,23 +1,47 @@
+import argparse
+import atexit
 import requests
-import json
-import re
-import time
 import os
 from datetime import datetime, timezone, timedelta
-import base64
+
+from baseline_cache import iter_object_items
+from icon_cache import IconCache
+import infobox_parser
+from item_deltas import publish_delta, record_hashes, snapshot_hash
+from item_index import ItemIndex
+from item_record import ItemRecord
+from item_sources import add_source_args, open_source
+from items_writer import write_items
+from name_search import NameSearchIndex
+from page_cache import PageCache, parser_fingerprint
+from run_journal import RunJournal
+from run_metrics import add_metrics_args, metrics
+from wiki_fetch import api_get, crawl_category, get_category_members, get_recent_changes, iter_wiki_batches, mount_pooled_adapter
 
 # enter RSN name or email here if you want to be kind to the API maintainers
 contact_info = "email@na.com"
 
+# batches kept in flight at once and the overall request rate against the wiki; set concurrency to 1 for the old serial behaviour
+fetch_concurrency = 4
+requests_per_second = 5
+
+# --sync re-reads recent changes from a little before the last run's start, to cover edits still replicating then;
+# the wiki only keeps recent changes for about a month, so older marks fall back to a full run
+sync_overlap = timedelta(minutes=5)
+sync_max_age = timedelta(days=30)
+SYNC_MARK_KEY = "recentchanges_mark"
+WIKI_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
 def load_existing_items(filepath):
     print(f"Loading existing items from '{filepath}'.")
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # streamed one item at a time straight into compact records, so the full dict tree never exists
+        with open(filepath, 'rb') as f:
+            return {item_id: ItemRecord.from_dict(item) for item_id, item in iter_object_items(f)}
     except FileNotFoundError:
         print(f"Error: The file '{filepath}' was not found. Please run the initial script first.")
         return None
-    except json.JSONDecodeError:
+    except ValueError:
         print(f"Error: Could not decode JSON from '{filepath}'.")
         return None
 
@@ -27,12 +51,11 @@ def get_session():
         'User-Agent': f'OSRS-Item-Delta-Updater/1.0 (contact: {contact_info})'
     }
     session.headers.update(headers)
-    return session
+    return metrics.watch(mount_pooled_adapter(session, fetch_concurrency))
 
 def get_wiki_item_titles(session):
     print("Fetching all item titles from the OSRS Wiki.")
     all_titles = set()
-    api_url = "https://oldschool.runescape.wiki/api.php"
     params = {
         "action": "query",
         "format": "json",
@@ -44,9 +67,8 @@ def get_wiki_item_titles(session):
     while True:
         try:
             req_params = {**params, **last_continue}
-            response = session.get(url=api_url, params=req_params)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage("titles"):
+                data = api_get(session, req_params)
             for member in data.get("query", {}).get("categorymembers", []):
                 all_titles.add(member["title"])
             if "continue" in data:
@@ -61,185 +83,197 @@ def get_wiki_item_titles(session):
     print(f"Found a total of {len(all_titles)} item titles on the Wiki.")
     return all_titles
 
-def batch_get_wiki_data(page_titles, session):
-    results = {}
-    params = {
-        "action": "query", "prop": "revisions|pageimages", "rvprop": "content|timestamp",
-        "format": "json", "titles": "|".join(page_titles), "pithumbsize": 50
-    }
-    try:
-        response = session.get("https://oldschool.runescape.wiki/api.php", params=params)
-        response.raise_for_status()
-        pages = response.json().get("query", {}).get("pages", {})
-        for _, page_data in pages.items():
-            title = page_data.get("title")
-            icon_url = page_data.get("thumbnail", {}).get("source")
-            if title and "revisions" in page_data and page_data["revisions"]:
-                revision = page_data["revisions"][0]
-                content = revision.get("*")
-                timestamp = revision.get("timestamp")
-                if content and timestamp:
-                    results[title] = {"content": content, "timestamp": timestamp, "icon_url": icon_url}
-        return results
-    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-        print(f"Could not fetch a batch of wikitext: {e}")
-        return {}
-
-def _get_icon_b64(url, session):
-    if not url:
+def get_changed_titles(session, page_cache, cached_titles, item_index):
+    # titles edited or created since the stored high-water mark, or None when a full run is needed
+    mark = page_cache.get_meta(SYNC_MARK_KEY)
+    if mark is None:
+        print("No sync mark stored yet, doing a full run first.")
         return None
-    try:
-        response = session.get(url)
-        response.raise_for_status()
-        return base64.b64encode(response.content).decode('utf-8')
-    except requests.exceptions.RequestException:
+    mark_dt = datetime.strptime(mark, WIKI_TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - mark_dt > sync_max_age:
+        print(f"Sync mark {mark} is older than the wiki's recent changes, doing a full run.")
         return None
 
-def _to_int(value, default=0):
-    try:
-        return int(re.sub(r'[^0-9-]', '', str(value)))
-    except (ValueError, TypeError):
-        return default
-
-def _to_float(value, default=0.0):
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return default
-
-def _parse_equipment_and_weapon(wikitext):
-    equipment = {}
-    weapon = {}
-    
-    match = re.search(r'\{\{Infobox Bonuses\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
-    if not match:
-        return equipment, weapon
-
-    content = match.group(1)
-    bonus_data = {}
-    lines = content.split('\n|')
-    for line in lines:
-        if '=' not in line:
-            continue
-        key, value = line.split('=', 1)
-        bonus_data[key.strip().lower()] = value.strip()
-
-    stat_map = {
-        'astab': 'attack_stab', 'aslash': 'attack_slash', 'acrush': 'attack_crush',
-        'amagic': 'attack_magic', 'arange': 'attack_ranged', 'dstab': 'defence_stab',
-        'dslash': 'defence_slash', 'dcrush': 'defence_crush', 'dmagic': 'defence_magic',
-        'drange': 'defence_ranged', 'str': 'melee_strength', 'rstr': 'ranged_strength',
-        'mdmg': 'magic_damage', 'prayer': 'prayer'
-    }
-    for wiki_key, osrsbox_key in stat_map.items():
-        equipment[osrsbox_key] = _to_int(bonus_data.get(wiki_key, 0))
-
-    slot = bonus_data.get('slot', 'not equipable').lower()
-    if '2h' in slot:
-        equipment['slot'] = '2h'
-    else:
-        equipment['slot'] = slot
-
-    weapon['attack_speed'] = _to_int(bonus_data.get('aspeed', 0))
-    weapon['weapon_type'] = bonus_data.get('wtype', 'unarmed').lower()
-    
-    weapon['stances'] = [] 
-    
-    return equipment, weapon
-
-def parse_infobox(wikitext, item_name, last_updated_iso, icon_b64):
-    match = re.search(r'\{\{Infobox Item\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
-    if not match: return None
-    
-    content = match.group(1)
-    item_data = {}
-
-    lines = content.split('\n|')
-    for line in lines:
-        if '=' not in line:
-            continue
-        key, value = line.split('=', 1)
-        key = key.strip().lower()
-        value = value.strip()
-        value = re.sub(r'\[\[(?:[^|]+\|)?([^\]]+)\]\]', r'\1', value)
-        value = re.sub(r'<[^>]+>', '', value)
-        value = re.sub(r'\{\{[^}]*?\}\}', '', value)
-        value = value.strip()
-        item_data[key] = value
-
-    try:
-        item_id = _to_int(item_data.get('id', '0'))
-        if item_id == 0: return None
-    except (ValueError, TypeError):
+    since = (mark_dt - sync_overlap).strftime(WIKI_TIMESTAMP_FORMAT)
+    print(f"Fetching recent changes since {since}.")
+    changes = get_recent_changes(session, since)
+    if changes is None:
         return None
+    # edits only matter on pages already known to be items; a created page is a new item if it's in Category:Items
+    def is_known(title):
+        return title in cached_titles or item_index.resolve(title) is not None
+
+    changed_titles = {change['title'] for change in changes if is_known(change['title'])}
+    created_titles = sorted({change['title'] for change in changes if change['type'] == 'new' and not is_known(change['title'])})
+    created_items = get_category_members(session, created_titles) if created_titles else set()
+    if created_items is None:
+        return None
+    changed_titles |= created_items
+    print(f"Found {len(changes)} recent changes touching {len(changed_titles)} candidate item pages "
+          f"({len(created_titles) - len(created_items)} new pages outside Category:Items skipped).")
+    return changed_titles
+
+def merge_parsed_item(item_database, title, parsed_item, missing_item_titles, items_to_update):
+    item_id_str = str(parsed_item['id'])
+    wiki_timestamp_dt = datetime.fromisoformat(parsed_item['last_updated']).replace(tzinfo=timezone.utc)
+
+    if title in missing_item_titles:
+        if item_id_str not in item_database:
+            item_database[item_id_str] = ItemRecord.from_dict(parsed_item)
+            return 'added'
+    elif title in items_to_update:
+        if item_id_str in item_database:
+            should_update = False
+            local_timestamp_str = item_database[item_id_str].get('last_updated')
+            if not local_timestamp_str:
+                should_update = True
+            else:
+                try:
+                    local_timestamp_dt = datetime.fromisoformat(local_timestamp_str)
+                    if local_timestamp_dt.tzinfo is None:
+                        local_timestamp_dt = local_timestamp_dt.replace(tzinfo=timezone.utc)
+                    
+                    if wiki_timestamp_dt > local_timestamp_dt:
+                        should_update = True
+                except ValueError:
+                    should_update = True
+
+            if should_update:
+                item_database[item_id_str].update(parsed_item)
+                return 'updated'
+    return None
+
+def select_titles(args, session, page_cache, icon_cache, item_database, item_index):
+    # (titles to insert, titles to check for updates, titles a --crawl put in the page cache or None),
+    # or None when the wiki couldn't be listed
+    changed_titles = None
+    crawled_titles = None
+    if args.sync and not args.offline:
+        cached_titles = page_cache.load_titles()
+        changed_titles = get_changed_titles(session, page_cache, cached_titles, item_index)
+
+    if changed_titles is not None:
+        missing_item_titles = {
+            title for title in changed_titles
+            if item_index.resolve(title) is None and '/' not in title and '(unobtainable)' not in title.lower()
+        }
+        items_to_update = {title for title in changed_titles if item_index.resolve(title) is not None}
+        # remember created pages so their later edits are picked up too
+        page_cache.save_titles(cached_titles | missing_item_titles)
+    else:
+        # stale items are picked first, so a --crawl can skip the icons of items it won't touch
+        updates_cutoff_date = datetime.now(timezone.utc) - timedelta(days=10)
+        items_to_update = set()
+        for item_id, item in item_database.items():
+            try:
+                last_updated_str = item.get('last_updated')
+                if not last_updated_str:
+                    items_to_update.add(item['name'])
+                    continue
+                
+                last_updated_dt = datetime.fromisoformat(last_updated_str)
+                if last_updated_dt.tzinfo is None:
+                    last_updated_dt = last_updated_dt.replace(tzinfo=timezone.utc)
+
+                if last_updated_dt < updates_cutoff_date:
+                    items_to_update.add(item['name'])
+            except (ValueError, TypeError):
+                items_to_update.add(item['name'])
 
-    equipment, weapon = _parse_equipment_and_weapon(wikitext)
-
-    return {
-        'id': item_id, 'name': item_name, 'last_updated': last_updated_iso,
-        'incomplete': False, 'members': item_data.get('members', 'no').lower() == 'yes',
-        'tradeable': 'yes' in item_data.get('tradeable', 'yes').lower(),
-        'tradeable_on_ge': 'yes' in item_data.get('tradeable', 'yes').lower(),
-        'stackable': item_data.get('stackable', 'no').lower() == 'yes',
-        'stacked': None, 'noted': 'yes' in item_data.get('noteable', 'no').lower(),
-        'noteable': 'yes' in item_data.get('noteable', 'no').lower(),
-        'linked_id_item': None, 'linked_id_noted': None, 'linked_id_placeholder': None,
-        'placeholder': False, 'equipable': item_data.get('equipable', 'no').lower() == 'yes',
-        'equipable_by_player': item_data.get('equipable', 'no').lower() == 'yes',
-        'equipable_weapon': 'weapon' in item_data.get('slayercat', ''),
-        'cost': _to_int(item_data.get('value', '0')),
-        'lowalch': _to_int(item_data.get('lowalch', '0')),
-        'highalch': _to_int(item_data.get('highalch', '0')),
-        'weight': _to_float(item_data.get('weight', 0.0)),
-        'buy_limit': _to_int(item_data.get('gemw'), default=None) if item_data.get('gemw') else None,
-        'quest_item': item_data.get('quest', 'no').lower() == 'yes',
-        'release_date': item_data.get('release', None),
-        'examine': item_data.get('examine', ''),
-        'icon': icon_b64,
-        'wiki_name': item_name.replace(' ', '_'),
-        'wiki_url': f"https://oldschool.runescape.wiki/w/{item_name.replace(' ', '_')}",
-        'equipment': equipment,
-        'weapon': weapon
-    }
+        def is_missing(title):
+            return item_index.resolve(title) is None and '/' not in title and '(unobtainable)' not in title.lower()
+
+        if args.offline:
+            all_wiki_titles = page_cache.load_titles()
+            print(f"Offline: using {len(all_wiki_titles)} cached item titles.")
+        elif args.crawl:
+            crawled_titles, complete = crawl_category(session, page_cache, concurrency=fetch_concurrency,
+                                                      requests_per_second=requests_per_second,
+                                                      on_pages=lambda found: icon_cache.prefetch(
+                                                          data.get('icon_url') for title, data in found.items()
+                                                          if is_missing(title) or title in items_to_update))
+            all_wiki_titles = crawled_titles if complete else get_wiki_item_titles(session)
+            if all_wiki_titles is None:
+                return None
+            page_cache.save_titles(all_wiki_titles)
+        else:
+            all_wiki_titles = get_wiki_item_titles(session)
+            if all_wiki_titles is None:
+                return None
+            page_cache.save_titles(all_wiki_titles)
+
+        missing_item_titles = {title for title in all_wiki_titles if is_missing(title)}
+    return missing_item_titles, items_to_update, crawled_titles
+
+def apply_parsed_item(item_database, item_index, name_index, title, parsed_item, missing_item_titles, items_to_update):
+    result = merge_parsed_item(item_database, title, parsed_item, missing_item_titles, items_to_update)
+    if result:
+        item_id_str = str(parsed_item['id'])
+        for other_id in item_index.add(item_id_str, item_database[item_id_str]):
+            print(f"\nWarning: '{title}' ({item_id_str}) differs only in spelling from '{item_index.by_id[other_id][0]}' ({other_id}).")
+        name_index.add(item_id_str, item_database[item_id_str])
+    return result
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Update database/items.json from the OSRS Wiki.")
+    parser.add_argument("--offline", action="store_true",
+                        help="re-run from the local page cache only, without touching the network")
+    parser.add_argument("--compact", action="store_true",
+                        help="write the output JSON without indentation")
+    parser.add_argument("--sync", action="store_true",
+                        help="only fetch pages edited or created since the last run, using the wiki's recent changes")
+    parser.add_argument("--crawl", action="store_true",
+                        help="list the items and fetch every page in one category crawl; pays off on full rebuilds")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its journal instead of starting over")
+    add_source_args(parser)
+    add_metrics_args(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    metrics.start("batch_merge_curr_db", args.metrics_dir, args.profile)
     input_filename = os.path.join("database", "items.json")
     
-    item_database = load_existing_items(input_filename)
-    if item_database is None:
-        return
+    with metrics.stage("load"):
+        item_database = load_existing_items(input_filename)
+        if item_database is None:
+            return
+        before_hashes = record_hashes(item_database)
+        before_snapshot = snapshot_hash(item_database)
+        item_index = ItemIndex.load_or_build(item_database, input_filename)
+        name_index = NameSearchIndex.load_or_build(item_index, input_filename)
+    item_index.report()
 
     session = get_session()
+    icon_cache = IconCache(session, offline=args.offline)
+    # saved at exit rather than after the merge, so icons fetched before an interruption are kept for --resume
+    atexit.register(icon_cache.save)
+    page_cache = PageCache()
+    parser_version = parser_fingerprint(infobox_parser)
     
-    all_wiki_titles = get_wiki_item_titles(session)
-    if all_wiki_titles is None:
-        return
-
-    existing_items_map = {str(item['id']): item['name'] for item in item_database.values()}
-    
-    missing_item_titles = {
-        title for title in all_wiki_titles 
-        if title not in existing_items_map.values() and '/' not in title and '(unobtainable)' not in title.lower()
-    }
-    
-    updates_cutoff_date = datetime.now(timezone.utc) - timedelta(days=10)
-    items_to_update = set()
-    for item_id, item in item_database.items():
-        try:
-            last_updated_str = item.get('last_updated')
-            if not last_updated_str:
-                items_to_update.add(item['name'])
-                continue
-            
-            last_updated_dt = datetime.fromisoformat(last_updated_str)
-            if last_updated_dt.tzinfo is None:
-                last_updated_dt = last_updated_dt.replace(tzinfo=timezone.utc)
-
-            if last_updated_dt < updates_cutoff_date:
-                items_to_update.add(item['name'])
-        except (ValueError, TypeError):
-            items_to_update.add(item['name'])
-
+    journal = RunJournal("batch_merge_curr_db")
+    resumed = journal.load() if args.resume else None
+    if resumed is not None and resumed[0]['snapshot'] != before_snapshot:
+        print(f"'{input_filename}' changed since the unfinished run started, so it can't be resumed.")
+        resumed = None
+    elif args.resume and resumed is None:
+        print("No unfinished run to resume, starting a new one.")
+
+    crawled_titles = None
+    if resumed is not None:
+        # the interrupted run's title lists and start time are reused, so nothing is listed or fetched twice
+        state, journal_batches = resumed
+        sync_started = state['sync_started']
+        missing_item_titles = set(state['missing'])
+        items_to_update = set(state['update'])
+        print(f"Resuming an unfinished run: {len(journal_batches)} batches already merged.")
+    else:
+        sync_started = datetime.now(timezone.utc).strftime(WIKI_TIMESTAMP_FORMAT)
+        selected = select_titles(args, session, page_cache, icon_cache, item_database, item_index)
+        if selected is None:
+            return
+        missing_item_titles, items_to_update, crawled_titles = selected
 
     all_titles_to_fetch = sorted(list(missing_item_titles | items_to_update))
     
@@ -248,65 +282,101 @@ def main():
     
     if not all_titles_to_fetch:
         print("No items to process. The database is up to date.")
+        item_index.save(input_filename)
+        name_index.save(input_filename)
+        if not args.offline:
+            page_cache.set_meta(SYNC_MARK_KEY, sync_started)
+        page_cache.close()
         return
 
-    print("\nFetching and parsing wiki data in batches.")
+    from_cache = args.offline or crawled_titles is not None
+    source = open_source(args.source, session, page_cache, icon_cache, parser_version, from_cache=from_cache,
+                         parse_workers=args.parse_workers, concurrency=fetch_concurrency, requests_per_second=requests_per_second)
+    if not source.prepare():
+        return
+
+    print(f"\nFetching and parsing wiki data in batches ({source.name} source).")
     new_items_added = 0
     items_updated = 0
     batch_size = 50
 
-    for i in range(0, len(all_titles_to_fetch), batch_size):
-        batch_titles = all_titles_to_fetch[i:i + batch_size]
-        print(f"Processing batch {i//batch_size + 1}/{(len(all_titles_to_fetch) + batch_size - 1)//batch_size}...", end='\r')
-        
-        wiki_data_batch = batch_get_wiki_data(batch_titles, session)
-        
-        for title, data in wiki_data_batch.items():
-            wiki_timestamp_iso = data['timestamp']
-            wiki_timestamp_dt = datetime.fromisoformat(wiki_timestamp_iso).replace(tzinfo=timezone.utc)
-            
-            icon_b64 = _get_icon_b64(data.get('icon_url'), session)
-            parsed_item = parse_infobox(data['content'], title, wiki_timestamp_iso, icon_b64)
-            if not parsed_item:
-                continue
-
-            item_id_str = str(parsed_item['id'])
-            
-            if title in missing_item_titles:
-                if item_id_str not in item_database:
-                    item_database[item_id_str] = parsed_item
-                    new_items_added += 1
-            elif title in items_to_update:
-                if item_id_str in item_database:
-                    should_update = False
-                    local_timestamp_str = item_database[item_id_str].get('last_updated')
-                    if not local_timestamp_str:
-                        should_update = True
-                    else:
-                        try:
-                            local_timestamp_dt = datetime.fromisoformat(local_timestamp_str)
-                            if local_timestamp_dt.tzinfo is None:
-                                local_timestamp_dt = local_timestamp_dt.replace(tzinfo=timezone.utc)
-                            
-                            if wiki_timestamp_dt > local_timestamp_dt:
-                                should_update = True
-                        except ValueError:
-                            should_update = True
-
-                    if should_update:
-                        item_database[item_id_str].update(parsed_item)
+    # batch sizes adapt to the wiki's responses, so progress is counted in titles
+    titles_done = 0
+    if resumed is not None:
+        with metrics.stage("merge"):
+            for count, items in journal_batches:
+                for title, parsed_item in items:
+                    result = apply_parsed_item(item_database, item_index, name_index, title, parsed_item, missing_item_titles, items_to_update)
+                    if result == 'added':
+                        new_items_added += 1
+                    elif result == 'updated':
                         items_updated += 1
+                titles_done += count
+                metrics.incr("pages_replayed", len(items))
+        journal.resume()
+    else:
+        journal.begin({
+            'snapshot': before_snapshot, 'sync_started': sync_started,
+            'missing': sorted(missing_item_titles), 'update': sorted(items_to_update),
+        })
+
+    remaining_titles = all_titles_to_fetch[titles_done:]
+    if crawled_titles is not None:
+        # stale items whose pages left the category aren't in the crawl; they're fetched by title first,
+        # so the merge below still runs in title order
+        uncrawled = [t for t in remaining_titles if t not in crawled_titles]
+        for _, wiki_data_batch in iter_wiki_batches(uncrawled, session, batch_size, fetch_concurrency, requests_per_second):
+            page_cache.store_pages(wiki_data_batch)
+
+    for batch_no, (batch_titles, wiki_data_batch, parsed_batch) in enumerate(source.iter_items(remaining_titles, batch_size), 1):
+        titles_done += len(batch_titles)
+        print(f"Processing batch {batch_no} ({titles_done}/{len(all_titles_to_fetch)} titles)...", end='\r')
+        metrics.incr("pages_processed", len(wiki_data_batch))
         
-        time.sleep(0.1)
+        with metrics.stage("merge"):
+            journal_items = []
+            for title, data in wiki_data_batch.items():
+                parsed_item = parsed_batch[title]
+                if not parsed_item:
+                    metrics.incr("parse_failures", reason=source.failure_reason(title, data))
+                    continue
+                parsed_item['last_updated'] = data['timestamp']
+                parsed_item['icon'] = icon_cache.get_b64(data.get('icon_url'))
+                journal_items.append([title, parsed_item])
+
+                result = apply_parsed_item(item_database, item_index, name_index, title, parsed_item, missing_item_titles, items_to_update)
+                if result == 'added':
+                    new_items_added += 1
+                elif result == 'updated':
+                    items_updated += 1
+
+            page_cache.commit()
+            journal.record_batch(len(batch_titles), journal_items)
 
     print(f"\n\nProcessing complete.")
     print(f"Added: {new_items_added} new items.")
     print(f"Updated: {items_updated} existing items.")
+    name_index.report()
+    metrics.incr("items_added", new_items_added)
+    metrics.incr("near_duplicates", len(name_index.flagged))
+    metrics.incr("items_updated", items_updated)
+    print(f"Icons: {icon_cache.downloads} downloaded, {icon_cache.revalidations} revalidated, the rest served from cache.")
+    print(f"Parse cache: {page_cache.parse_hits} hits, {page_cache.parse_misses} parsed.")
 
     print(f"Saving combined data to '{input_filename}'...")
-    with open(input_filename, 'w', encoding='utf-8') as f:
-        sorted_data = {k: v for k, v in sorted(item_database.items(), key=lambda item: int(item[0]))}
-        json.dump(sorted_data, f, indent=4)
+    with metrics.stage("write"):
+        write_items(input_filename, item_database, compact=args.compact)
+        item_index.save(input_filename)
+        name_index.save(input_filename)
+        # the mark only moves once the output is safely written, so a failed run is retried from the same point
+        if not args.offline:
+            page_cache.set_meta(SYNC_MARK_KEY, sync_started)
+        page_cache.close()
+
+        version = publish_delta(item_database, before_hashes, before_snapshot)
+        journal.finish()
+    if version is not None:
+        print(f"Published delta version {version} to '{os.path.join('database', 'deltas')}'.")
 
     print("Done!")
 
@@ -1,24 +1,28 @@
+import argparse
+import atexit
 import requests
-import json
-import re
-import time
 import os
 from datetime import datetime, timezone
-import base64
+
+from baseline_cache import load_baseline
+from icon_cache import IconCache
+import infobox_parser
+from item_index import ItemIndex
+from item_record import ItemRecord
+from item_sources import add_source_args, open_source
+from items_writer import write_items
+from name_search import NameSearchIndex
+from page_cache import PageCache, parser_fingerprint
+from run_journal import RunJournal
+from run_metrics import add_metrics_args, metrics
+from wiki_fetch import api_get, crawl_category, iter_wiki_batches, mount_pooled_adapter
 
 # enter RSN name or email here if you want to be kind to the API maintainers
 contact_info = "email@na.com"
 
-def get_base_json(url):
-    print("Fetching base JSON from GitHub in OSRSBox Master to create item baseline.")
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        print("Successfully fetched base JSON.")
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching base JSON: {e}")
-        return None
+# batches kept in flight at once and the overall request rate against the wiki; set concurrency to 1 for the old serial behaviour
+fetch_concurrency = 4
+requests_per_second = 5
 
 def get_session():
     session = requests.Session()
@@ -26,12 +30,11 @@ def get_session():
         'User-Agent': 'OSRS-Item-DB-Updater/2.1 (https://github.com/osrsbox/osrsbox-db; contact: {contact_info})'
     }
     session.headers.update(headers)
-    return session
+    return metrics.watch(mount_pooled_adapter(session, fetch_concurrency))
 
 def get_wiki_itm_tls(session):
     print("Fetching all item titles from the OSRS Wiki.")
     all_titles = set()
-    api_url = "https://oldschool.runescape.wiki/api.php"
     params = {
         "action": "query", "format": "json", "list": "categorymembers",
         "cmtitle": "Category:Items", "cmlimit": "500"
@@ -40,9 +43,8 @@ def get_wiki_itm_tls(session):
     while True:
         try:
             req_params = {**params, **last_continue}
-            response = session.get(url=api_url, params=req_params)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage("titles"):
+                data = api_get(session, req_params)
             for member in data.get("query", {}).get("categorymembers", []):
                 all_titles.add(member["title"])
             if "continue" in data:
@@ -57,144 +59,68 @@ def get_wiki_itm_tls(session):
     print(f"Found a total of {len(all_titles)} item titles on the Wiki.")
     return all_titles
 
-def batch_get_wiki_data(page_titles, session):
-    results = {}
-    params = {
-        "action": "query", "prop": "revisions|pageimages", "rvprop": "content|timestamp",
-        "format": "json", "titles": "|".join(page_titles), "pithumbsize": 50
-    }
-    try:
-        response = session.get("https://oldschool.runescape.wiki/api.php", params=params)
-        response.raise_for_status()
-        pages = response.json().get("query", {}).get("pages", {})
-        for _, page_data in pages.items():
-            title = page_data.get("title")
-            icon_url = page_data.get("thumbnail", {}).get("source")
-            if title and "revisions" in page_data and page_data["revisions"]:
-                revision = page_data["revisions"][0]
-                content = revision.get("*")
-                timestamp = revision.get("timestamp")
-                if content and timestamp:
-                    results[title] = {"content": content, "timestamp": timestamp, "icon_url": icon_url}
-        return results
-    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-        print(f"Could not fetch a batch of wikitext: {e}")
-        return {}
-
-def _get_icon_b64(url, session):
-    if not url:
-        return None
-    try:
-        response = session.get(url)
-        response.raise_for_status()
-        return base64.b64encode(response.content).decode('utf-8')
-    except requests.exceptions.RequestException:
-        return None
-
-def _to_int(value, default=0):
-    try:
-        return int(re.sub(r'[^0-9-]', '', str(value)))
-    except (ValueError, TypeError):
-        return default
-
-def _to_float(value, default=0.0):
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return default
-
-def _parse_equipment_and_weapon(wikitext):
-    equipment = {}
-    weapon = {}
-    
-    match = re.search(r'\{\{Infobox Bonuses\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
-    if not match:
-        return equipment, weapon
-
-    content = match.group(1)
-    bonus_data = {}
-    lines = content.split('\n|')
-    for line in lines:
-        if '=' not in line:
-            continue
-        key, value = line.split('=', 1)
-        bonus_data[key.strip().lower()] = value.strip()
-
-    stat_map = {
-        'astab': 'attack_stab', 'aslash': 'attack_slash', 'acrush': 'attack_crush',
-        'amagic': 'attack_magic', 'arange': 'attack_ranged', 'dstab': 'defence_stab',
-        'dslash': 'defence_slash', 'dcrush': 'defence_crush', 'dmagic': 'defence_magic',
-        'drange': 'defence_ranged', 'str': 'melee_strength', 'rstr': 'ranged_strength',
-        'mdmg': 'magic_damage', 'prayer': 'prayer'
-    }
-    for wiki_key, osrsbox_key in stat_map.items():
-        equipment[osrsbox_key] = _to_int(bonus_data.get(wiki_key, 0))
-
-    equipment['slot'] = bonus_data.get('slot', 'not equipable').lower()
-    
-    weapon['attack_speed'] = _to_int(bonus_data.get('aspeed', 0))
-    weapon['weapon_type'] = bonus_data.get('wtype', 'unarmed').lower()
-    
-    weapon['stances'] = [] 
-    
-    return equipment, weapon
-
-def parse_infobox(wikitext, item_name, last_updated_iso, icon_b64):
-    match = re.search(r'\{\{Infobox Item\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
-    if not match: return None
-    
-    content = match.group(1)
-    item_data = {}
-
-    lines = content.split('\n|')
-    for line in lines:
-        if '=' not in line:
-            continue
-        key, value = line.split('=', 1)
-        key = key.strip().lower()
-        value = value.strip()
-        value = re.sub(r'\[\[(?:[^|]+\|)?([^\]]+)\]\]', r'\1', value)
-        value = re.sub(r'<[^>]+>', '', value)
-        value = re.sub(r'\{\{[^}]*?\}\}', '', value)
-        value = value.strip()
-        item_data[key] = value
-
-    try:
-        item_id = _to_int(item_data.get('id', '0'))
-        if item_id == 0: return None
-    except (ValueError, TypeError):
-        return None
-
-    equipment, weapon = _parse_equipment_and_weapon(wikitext)
-
-    return {
-        'id': item_id, 'name': item_name, 'last_updated': last_updated_iso,
-        'incomplete': False, 'members': item_data.get('members', 'no').lower() == 'yes',
-        'tradeable': 'yes' in item_data.get('tradeable', 'yes').lower(),
-        'tradeable_on_ge': 'yes' in item_data.get('tradeable', 'yes').lower(),
-        'stackable': item_data.get('stackable', 'no').lower() == 'yes',
-        'stacked': None, 'noted': 'yes' in item_data.get('noteable', 'no').lower(),
-        'noteable': 'yes' in item_data.get('noteable', 'no').lower(),
-        'linked_id_item': None, 'linked_id_noted': None, 'linked_id_placeholder': None,
-        'placeholder': False, 'equipable': item_data.get('equipable', 'no').lower() == 'yes',
-        'equipable_by_player': item_data.get('equipable', 'no').lower() == 'yes',
-        'equipable_weapon': 'weapon' in item_data.get('slayercat', ''),
-        'cost': _to_int(item_data.get('value', '0')),
-        'lowalch': _to_int(item_data.get('lowalch', '0')),
-        'highalch': _to_int(item_data.get('highalch', '0')),
-        'weight': _to_float(item_data.get('weight', 0.0)),
-        'buy_limit': _to_int(item_data.get('gemw'), default=None) if item_data.get('gemw') else None,
-        'quest_item': item_data.get('quest', 'no').lower() == 'yes',
-        'release_date': item_data.get('release', None),
-        'examine': item_data.get('examine', ''),
-        'icon': icon_b64,
-        'wiki_name': item_name.replace(' ', '_'),
-        'wiki_url': f"https://oldschool.runescape.wiki/w/{item_name.replace(' ', '_')}",
-        'equipment': equipment,
-        'weapon': weapon
-    }
+def merge_kind(title, parsed_item, new_item_titles, items_to_update, item_index, versions):
+    # 'new', 'update' or None for an item parsed from page `title`, normally decided by the title alone. With
+    # --versions, a switch infobox's versions whose id isn't known yet are new items even on a known page
+    if title in new_item_titles:
+        return 'new'
+    if versions and '#' in parsed_item['wiki_name'] and str(parsed_item['id']) not in item_index:
+        return 'new'
+    if title in items_to_update:
+        return 'update'
+    return None
+
+def merge_wiki_item(base_data, item_index, title, parsed_item, kind, osrsbox_cutoff):
+    # returns 'added', 'updated' or None
+    item_id_str = str(parsed_item['id'])
+    wiki_timestamp_dt = datetime.fromisoformat(parsed_item['last_updated']).replace(tzinfo=timezone.utc)
+
+    if kind == 'new':
+        if item_id_str not in item_index:
+            base_data[item_id_str] = ItemRecord.from_dict(parsed_item)
+            for other_id in item_index.add(item_id_str, parsed_item):
+                print(f"\nWarning: '{title}' ({item_id_str}) differs only in spelling from '{item_index.by_id[other_id][0]}' ({other_id}).")
+            return 'added'
+    elif kind == 'update':
+        if item_id_str in base_data:
+            item = base_data[item_id_str]
+            original_name = item['name']
+
+            # records hand out copies of nested dicts, so merge into a new dict and assign it back
+            item['equipment'] = {**(item.get('equipment') or {}), **parsed_item['equipment']}
+            item['weapon'] = {**(item.get('weapon') or {}), **parsed_item['weapon']}
+            if parsed_item.get('icon'):
+                item['icon'] = parsed_item['icon']
+
+            result = None
+            if wiki_timestamp_dt > osrsbox_cutoff:
+                item.update(parsed_item)
+                result = 'updated'
+
+            item['name'] = original_name
+            return result
+    return None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild database/items.json from the OSRSBox baseline and the OSRS Wiki.")
+    parser.add_argument("--offline", action="store_true",
+                        help="re-run from the local page cache only, without touching the wiki")
+    parser.add_argument("--compact", action="store_true",
+                        help="write the output JSON without indentation")
+    parser.add_argument("--crawl", action="store_true",
+                        help="list the items and fetch their pages in one category crawl instead of two passes")
+    parser.add_argument("--versions", action="store_true",
+                        help="turn every version of a switch infobox into its own item, so variant pages those "
+                             "versions already cover aren't fetched")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its journal instead of starting over")
+    add_source_args(parser)
+    add_metrics_args(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    metrics.start("batch_merge_osrsbox", args.metrics_dir, args.profile)
     api_url = 'https://raw.githubusercontent.com/osrsbox/osrsbox-db/master/docs/items-complete.json'
     
     output_dir = "database"
@@ -203,23 +129,65 @@ def main():
     
     osrsbox_cutoff = datetime.fromisoformat("2021-09-30T00:00:00").replace(tzinfo=timezone.utc)
 
-    base_data = get_base_json(api_url)
-    if base_data is None: return
+    with metrics.stage("load"):
+        base_data = load_baseline(api_url, offline=args.offline, as_records=True)
+        if base_data is None: return
 
-    existing_item_names = {item['name'] for item_id, item in base_data.items()}
-    print(f"Loaded {len(existing_item_names)} items from the base JSON.")
+        item_index = ItemIndex.build(base_data)
+        name_index = NameSearchIndex.build(item_index)
+    print(f"Loaded {len(item_index.names())} items from the base JSON.")
+    item_index.report()
 
     session = get_session()
-    wiki_titles = get_wiki_itm_tls(session)
-    if wiki_titles is None: return
-
-    new_item_titles = {t for t in (wiki_titles - existing_item_names) if '/' not in t}
-    items_to_update = {t for t in (wiki_titles & existing_item_names) if '/' not in t}
+    icon_cache = IconCache(session, offline=args.offline)
+    # saved at exit rather than after the merge, so icons fetched before an interruption are kept for --resume
+    atexit.register(icon_cache.save)
+    page_cache = PageCache()
+    parser_version = parser_fingerprint(infobox_parser)
+
+    journal = RunJournal("batch_merge_osrsbox")
+    resumed = journal.load() if args.resume else None
+    if args.resume and resumed is None:
+        print("No unfinished run to resume, starting a new one.")
+
+    # titles whose pages a --crawl already put in the page cache
+    crawled_titles = None
+    if resumed is not None:
+        # the interrupted run's title lists are reused, so nothing is listed or fetched twice
+        state, journal_batches = resumed
+        new_item_titles = set(state['new'])
+        items_to_update = set(state['update'])
+        versions = state.get('versions', False)
+        print(f"Resuming an unfinished run: {len(journal_batches)} batches already merged.")
+    else:
+        versions = args.versions
+        if args.offline:
+            wiki_titles = page_cache.load_titles()
+            print(f"Offline: using {len(wiki_titles)} cached item titles.")
+        elif args.crawl:
+            crawled_titles, complete = crawl_category(session, page_cache, concurrency=fetch_concurrency,
+                                                      requests_per_second=requests_per_second,
+                                                      on_pages=lambda found: icon_cache.prefetch(
+                                                          data.get('icon_url') for title, data in found.items() if 'unobtainable' not in title.lower()))
+            wiki_titles = crawled_titles if complete else get_wiki_itm_tls(session)
+            if wiki_titles is None: return
+            page_cache.save_titles(wiki_titles)
+        else:
+            wiki_titles = get_wiki_itm_tls(session)
+            if wiki_titles is None: return
+            page_cache.save_titles(wiki_titles)
+
+        # titles are matched to ids by exact name, then wiki_name, then case- and spacing-insensitive name
+        new_item_titles = {t for t in wiki_titles if '/' not in t and item_index.resolve(t) is None}
+        items_to_update = {t for t in wiki_titles if '/' not in t and item_index.resolve(t) is not None}
     
     primary_new = sorted([t for t in new_item_titles if '(' not in t])
     variant_new = sorted([t for t in new_item_titles if '(' in t])
     
-    all_titles_to_fetch = primary_new + sorted(list(items_to_update)) + variant_new
+    # unobtainable pages are never merged, so they aren't fetched either
+    main_titles = [t for t in primary_new + sorted(list(items_to_update)) if 'unobtainable' not in t.lower()]
+    variant_titles = [t for t in variant_new if 'unobtainable' not in t.lower()]
+    all_titles_to_fetch = main_titles + variant_titles
 
     print(f"\nFound {len(new_item_titles)} new item titles to process for insertion.")
     print(f"Found {len(items_to_update)} existing item titles to check for updates.")
@@ -229,65 +197,108 @@ def main():
         print("No items to process. The database is up to date.")
         return
 
-    print("\nFetching and parsing wiki data in batches.")
+    from_cache = args.offline or crawled_titles is not None
+    source = open_source(args.source, session, page_cache, icon_cache, parser_version, fold_2h=False, from_cache=from_cache,
+                         parse_workers=args.parse_workers, concurrency=fetch_concurrency, requests_per_second=requests_per_second,
+                         versions=versions)
+    if not source.prepare(): return
+
+    print(f"\nFetching and parsing wiki data in batches ({source.name} source).")
     new_items_added = 0
     items_updated = 0
     batch_size = 50
 
-    for i in range(0, len(all_titles_to_fetch), batch_size):
-        batch_titles = all_titles_to_fetch[i:i + batch_size]
-        print(f"Processing batch {i//batch_size + 1}/{(len(all_titles_to_fetch) + batch_size - 1)//batch_size}...", end='\r')
-        
-        wiki_data_batch = batch_get_wiki_data(batch_titles, session)
-        
-        for title, data in wiki_data_batch.items():
-            if 'unobtainable' in title.lower():
-                continue
-
-            wiki_timestamp_iso = data['timestamp']
-            wiki_timestamp_dt = datetime.fromisoformat(wiki_timestamp_iso).replace(tzinfo=timezone.utc)
-            
-            icon_b64 = _get_icon_b64(data.get('icon_url'), session)
-            parsed_item = parse_infobox(data['content'], title, wiki_timestamp_iso, icon_b64)
-            if not parsed_item:
-                continue
-
-            item_id_str = str(parsed_item['id'])
-            
-            if title in new_item_titles:
-                if item_id_str not in base_data:
-                    base_data[item_id_str] = parsed_item
-                    new_items_added += 1
-            elif title in items_to_update:
-                if item_id_str in base_data:
-                    original_name = base_data[item_id_str]['name']
-                    
-                    if not base_data[item_id_str].get('equipment'):
-                        base_data[item_id_str]['equipment'] = {}
-                    if not base_data[item_id_str].get('weapon'):
-                        base_data[item_id_str]['weapon'] = {}
-                    
-                    base_data[item_id_str]['equipment'].update(parsed_item['equipment'])
-                    base_data[item_id_str]['weapon'].update(parsed_item['weapon'])
-                    if parsed_item.get('icon'):
-                        base_data[item_id_str]['icon'] = parsed_item['icon']
-                    
-                    if wiki_timestamp_dt > osrsbox_cutoff:
-                        base_data[item_id_str].update(parsed_item)
+    # batch sizes adapt to the wiki's responses, so progress is counted in titles
+    titles_done = 0
+    # with --versions, the names of the items the main titles' pages expanded to; variant titles among them
+    # are already covered and aren't fetched. Batches never span both lists, so a resume rebuilds the same set
+    version_names = set()
+    if resumed is not None:
+        with metrics.stage("merge"):
+            for count, items in journal_batches:
+                for title, parsed_item in items:
+                    kind = merge_kind(title, parsed_item, new_item_titles, items_to_update, item_index, versions)
+                    result = merge_wiki_item(base_data, item_index, title, parsed_item, kind, osrsbox_cutoff)
+                    if result == 'added':
+                        new_items_added += 1
+                        name_index.add(str(parsed_item['id']), parsed_item)
+                    elif result == 'updated':
                         items_updated += 1
-
-                    base_data[item_id_str]['name'] = original_name
-
-        time.sleep(0.1)
+                if titles_done < len(main_titles):
+                    version_names.update(parsed_item['name'] for _, parsed_item in items)
+                titles_done += count
+                metrics.incr("pages_replayed", len(items))
+        journal.resume()
+    else:
+        journal.begin({'new': sorted(new_item_titles), 'update': sorted(items_to_update), 'versions': versions})
+
+    if crawled_titles is not None:
+        # anything the crawl didn't return is fetched by title first, so the merge below still runs in title order
+        uncrawled = [t for t in all_titles_to_fetch[titles_done:] if t not in crawled_titles]
+        for _, wiki_data_batch in iter_wiki_batches(uncrawled, session, batch_size, fetch_concurrency, requests_per_second):
+            page_cache.store_pages(wiki_data_batch)
+
+    total_titles = len(all_titles_to_fetch)
+    phase_start = 0
+    batch_no = 0
+    for phase, phase_titles in enumerate((main_titles, variant_titles)):
+        if phase == 1 and versions:
+            phase_titles = [t for t in variant_titles if t not in version_names]
+            total_titles = len(main_titles) + len(phase_titles)
+            if len(phase_titles) < len(variant_titles):
+                print(f"\nSkipping {len(variant_titles) - len(phase_titles)} variant titles already expanded from their base pages.")
+        remaining_titles = phase_titles[max(0, titles_done - phase_start):]
+        phase_start += len(phase_titles)
+
+        for batch_titles, pages, parsed_batch in source.iter_items(remaining_titles, batch_size):
+            batch_no += 1
+            titles_done += len(batch_titles)
+            print(f"Processing batch {batch_no} ({titles_done}/{total_titles} titles)...", end='\r')
+            metrics.incr("pages_processed", len(pages))
+
+            with metrics.stage("merge"):
+                journal_items = []
+                for title, data in pages.items():
+                    parsed_items = parsed_batch[title] if versions else [parsed_batch[title]] if parsed_batch[title] else []
+                    if not parsed_items:
+                        metrics.incr("parse_failures", reason=source.failure_reason(title, data))
+                        continue
+                    icon_b64 = icon_cache.get_b64(data.get('icon_url'))
+                    for parsed_item in parsed_items:
+                        parsed_item['last_updated'] = data['timestamp']
+                        parsed_item['icon'] = icon_b64
+                        journal_items.append([title, parsed_item])
+                        if phase == 0:
+                            version_names.add(parsed_item['name'])
+
+                        kind = merge_kind(title, parsed_item, new_item_titles, items_to_update, item_index, versions)
+                        result = merge_wiki_item(base_data, item_index, title, parsed_item, kind, osrsbox_cutoff)
+                        if result == 'added':
+                            new_items_added += 1
+                            name_index.add(str(parsed_item['id']), parsed_item)
+                        elif result == 'updated':
+                            items_updated += 1
+
+            page_cache.commit()
+            journal.record_batch(len(batch_titles), journal_items)
 
     print(f"\n\nProcessing complete.")
     print(f"Added: {new_items_added} new items.")
     print(f"Updated: {items_updated} existing items.")
+    name_index.report()
+    metrics.incr("items_added", new_items_added)
+    metrics.incr("near_duplicates", len(name_index.flagged))
+    metrics.incr("items_updated", items_updated)
+    print(f"Icons: {icon_cache.downloads} downloaded, {icon_cache.revalidations} revalidated, the rest served from cache.")
+    print(f"Parse cache: {page_cache.parse_hits} hits, {page_cache.parse_misses} parsed.")
+    page_cache.close()
 
     print(f"Saving combined data to '{output_filename}'...")
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        sorted_data = {k: v for k, v in sorted(base_data.items(), key=lambda item: int(item[0]))}
-        json.dump(sorted_data, f, indent=4)
+    with metrics.stage("write"):
+        write_items(output_filename, base_data, compact=args.compact)
+        item_index.save(output_filename)
+        name_index.save(output_filename)
+        journal.finish()
 
     print("Done!")
 
@@ -0,0 +1,90 @@
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from bench_writer import synthetic_database
+from items_writer import write_items
+from sprite_atlas import build_atlas
+
+
+def synthetic_icon(seed):
+    # roughly wiki-thumbnail sized, mostly transparent with a few shapes, like real item sprites
+    rng = random.Random(seed)
+    w, h = rng.randint(24, 36), rng.randint(24, 32)
+    image = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for _ in range(4):
+        x0, y0 = rng.randint(0, w // 2), rng.randint(0, h // 2)
+        x1, y1 = rng.randint(x0 + 2, w), rng.randint(y0 + 2, h)
+        draw.ellipse((x0, y0, x1, y1), fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255), 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def timed_load(path):
+    start = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        json.load(f)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline base64 icons with sprite atlases.")
+    parser.add_argument("--items", type=int, default=15000)
+    parser.add_argument("--variants", type=int, default=3, help="items sharing each distinct icon (doses, charges)")
+    args = parser.parse_args()
+
+    database = synthetic_database(args.items)
+    icons = {}
+    for item_id, item in database.items():
+        seed = int(item_id) // args.variants
+        if seed not in icons:
+            icons[seed] = synthetic_icon(seed)
+        item['icon'] = icons[seed]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inline_path = os.path.join(tmp, "items.json")
+        stripped_path = os.path.join(tmp, "items-noicons.json")
+        atlas_dir = os.path.join(tmp, "icons")
+        write_items(inline_path, database, compact=True)
+
+        start = time.perf_counter()
+        index = build_atlas(database, atlas_dir)
+        build_time = time.perf_counter() - start
+        write_items(stripped_path, database, compact=True, omit_fields=('icon',))
+
+        atlas_bytes = sum(os.path.getsize(os.path.join(atlas_dir, name)) for name in index['atlases'])
+        index_bytes = os.path.getsize(os.path.join(atlas_dir, "index.json"))
+        inline_bytes = os.path.getsize(inline_path)
+        stripped_bytes = os.path.getsize(stripped_path)
+
+        inline_load = timed_load(inline_path)
+        start = time.perf_counter()
+        timed_load(stripped_path)
+        with open(os.path.join(atlas_dir, "index.json"), 'r', encoding='utf-8') as f:
+            json.load(f)
+        for name in index['atlases']:
+            with Image.open(os.path.join(atlas_dir, name)) as atlas:
+                atlas.load()
+        atlas_load = time.perf_counter() - start
+
+    print(f"{args.items} items, {len(index['sprites'])} unique icons in {len(index['atlases'])} atlas(es), built in {build_time:.2f}s")
+    print(f"inline base64:  {inline_bytes / 1024:9.1f} KB, json.load {inline_load * 1000:7.1f} ms")
+    print(f"atlas layout:   {(stripped_bytes + atlas_bytes + index_bytes) / 1024:9.1f} KB "
+          f"(items {stripped_bytes / 1024:.1f} + atlases {atlas_bytes / 1024:.1f} + index {index_bytes / 1024:.1f}), "
+          f"load + decode {atlas_load * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
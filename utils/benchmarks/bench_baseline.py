@@ -0,0 +1,128 @@
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from baseline_cache import BaselineCache, trim_item
+from bench_writer import _max_rss_mb, synthetic_database
+
+
+def synthetic_baseline(count):
+    # synthetic items padded out with the osrsbox-only fields the loader drops
+    database = synthetic_database(count)
+    for item in database.values():
+        item['duplicate'] = False
+        item['equipment']['requirements'] = {'attack': 40, 'defence': 40}
+        item['weapon']['stances'] = [
+            {'combat_style': style, 'attack_type': 'stab', 'attack_style': 'accurate',
+             'experience': 'attack', 'boosts': None}
+            for style in ('stab', 'lunge', 'slash', 'block')
+        ]
+    return database
+
+
+class ThrottledHandler(SimpleHTTPRequestHandler):
+    # serves files at roughly `mbps` megabits per second, so the download cost a warm cache avoids shows up
+    mbps = 100.0
+
+    def copyfile(self, source, outputfile):
+        chunk_size = 64 * 1024
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            outputfile.write(chunk)
+            if self.mbps:
+                time.sleep(len(chunk) * 8 / (self.mbps * 1000 * 1000))
+
+    def log_message(self, *args):
+        pass
+
+
+def _load(loader, url, cache_dir):
+    if loader == 'legacy':
+        response = requests.get(url)
+        response.raise_for_status()
+        return response.json()
+    return BaselineCache(url, cache_dir=cache_dir).load()
+
+
+def _run_loader(loader, url, cache_dir, results):
+    rss_before = _max_rss_mb()
+    start = time.perf_counter()
+    items = _load(loader, url, cache_dir)
+    elapsed = time.perf_counter() - start
+    rss_growth = _max_rss_mb() - rss_before
+    count = len(items)
+    del items
+    # second pass under tracemalloc, which is too slow to time against
+    tracemalloc.start()
+    _load(loader, url, cache_dir)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put((elapsed, traced_peak / (1024 * 1024), rss_growth, count))
+
+
+def measure(loader, url, cache_dir):
+    # each loader runs in a fresh process so peak RSS is not shared between runs
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_loader, args=(loader, url, cache_dir, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cached streaming baseline loader with response.json().")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--mbps", type=float, default=100.0, help="simulated download bandwidth, 0 for unthrottled loopback")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_dir = os.path.join(tmp, "serve")
+        os.makedirs(serve_dir)
+        baseline = synthetic_baseline(args.items)
+        with open(os.path.join(serve_dir, "items-complete.json"), 'w', encoding='utf-8') as f:
+            json.dump(baseline, f)
+        size_mb = os.path.getsize(os.path.join(serve_dir, "items-complete.json")) / (1024 * 1024)
+
+        ThrottledHandler.mbps = args.mbps
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ThrottledHandler, directory=serve_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/items-complete.json"
+        try:
+            cold_dir = os.path.join(tmp, "cold")
+            warm_dir = os.path.join(tmp, "warm")
+            BaselineCache(url, cache_dir=warm_dir).refresh()
+            assert BaselineCache(url, cache_dir=warm_dir).load() == baseline, "streaming loader output differs"
+            expected = {key: trim_item(item) for key, item in baseline.items()}
+            assert BaselineCache(url, cache_dir=warm_dir).load(trim=True) == expected, "trimmed loader output differs"
+            runs = [
+                ("response.json()", measure('legacy', url, None)),
+                ("cache cold (download)", measure('cache', url, cold_dir)),
+                ("cache warm", measure('cache', url, warm_dir)),
+            ]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    bandwidth = f"{args.mbps:g} Mbit/s" if args.mbps else "unthrottled"
+    print(f"{args.items} items, {size_mb:.1f} MB baseline served at {bandwidth}; streaming output matches the json.load result")
+    for label, (elapsed, traced_mb, rss_mb, count) in runs:
+        print(f"{label:<22} {elapsed:6.2f}s  peak traced {traced_mb:7.1f} MB  peak RSS growth {rss_mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
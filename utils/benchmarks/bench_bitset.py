@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_writer import synthetic_database
+from bitset_index import BitsetIndex, item_keys
+from build_frontend import ui_slot
+
+QUERIES = ["!members", "tradeable !quest_item", "!members slot:2h|speed:fast", "members !slot:weapon !slot:2h"]
+
+
+def scan_query(item_database, query):
+    # the same filter as a pass over every item dict
+    terms = [(term.startswith('!'), set(term.lstrip('!').split('|'))) for term in query.split()]
+    matches = []
+    for item_id in sorted(item_database, key=int):
+        item = item_database[item_id]
+        if not ui_slot(item):
+            continue
+        keys = set(item_keys(item))
+        if all(bool(keys & options) != negate for negate, options in terms):
+            matches.append(item)
+    return matches
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time filtered roll pools from the bitset index against scanning items.")
+    parser.add_argument("--items", type=int, default=15000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database = synthetic_database(args.items)
+    build_time, index = best_time(lambda: BitsetIndex(database), 1)
+    print(f"{args.items} items, index built in {build_time * 1000:.1f} ms, "
+          f"{sum((bits.bit_length() + 7) // 8 for bits in index.bits.values()) / 1024:.1f} KB of bitsets")
+    print(f"{'query':<34} {'matches':>8} {'scan ms':>9} {'bits us':>9} {'+ items ms':>11}")
+    for query in QUERIES:
+        scan_time, scanned = best_time(lambda: scan_query(database, query), args.repeat)
+        bits_time, bits = best_time(lambda: index.query(query), args.repeat)
+        select_time, selected = best_time(lambda: index.select(bits), args.repeat)
+        if [item['id'] for item in selected] != [item['id'] for item in scanned]:
+            print(f"'{query}' differs between the scan and the index!")
+        print(f"{query:<34} {len(selected):>8} {scan_time * 1000:>9.2f} {bits_time * 1e6:>9.1f} {select_time * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import wiki_fetch
+from stub_wiki import StubWiki, make_page
+
+
+def run_fetch(titles, concurrency, rate):
+    session = wiki_fetch.mount_pooled_adapter(requests.Session(), concurrency)
+    results = {}
+    start = time.perf_counter()
+    for _, data in wiki_fetch.iter_wiki_batches(titles, session, 50, concurrency, rate):
+        results.update(data)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and concurrent batch fetching against a stub wiki.")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rate", type=float, default=50, help="token bucket requests/sec")
+    parser.add_argument("--bad-titles", type=int, default=0,
+                        help="titles whose batches fail with an api error, to measure what bisection recovers")
+    parser.add_argument("--transient-errors", type=int, default=0, help="503s injected before each run")
+    args = parser.parse_args()
+
+    titles = [f"Stub item {i}" for i in range(1, args.pages + 1)]
+    pages = {t: make_page(i, t) for i, t in enumerate(titles, 1)}
+
+    with StubWiki(pages, latency=args.latency) as stub:
+        wiki_fetch.WIKI_API_URL = stub.api_url
+        stub.error_titles = set(titles[len(titles) // (args.bad_titles + 1)::len(titles) // (args.bad_titles + 1)][:args.bad_titles])
+        baseline = None
+        for concurrency in args.concurrency:
+            stub.request_count = 0
+            stub.transient_errors = args.transient_errors
+            results, elapsed = run_fetch(titles, concurrency, args.rate)
+            if baseline is None:
+                baseline = results
+            assert results == baseline, "concurrent fetch returned different pages"
+            print(f"concurrency={concurrency:<3} {len(results)} pages in {elapsed:.2f}s "
+                  f"({len(results) / elapsed:.0f} pages/sec, {stub.request_count} requests)")
+        if stub.error_titles:
+            # without bisection each bad title would have cost its whole batch of 50
+            lost = len({titles.index(t) // 50 for t in stub.error_titles}) * 50
+            print(f"{len(stub.error_titles)} bad titles: {len(titles) - len(baseline)} pages lost with bisection, "
+                  f"{lost} with whole-batch failure")
+
+
+if __name__ == "__main__":
+    main()
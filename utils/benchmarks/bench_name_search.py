@@ -0,0 +1,70 @@
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import baseline_items, generate_corpus
+from item_index import ItemIndex, normalize_name
+from name_search import NameSearchIndex
+
+
+def misspell(name, rng):
+    # one dropped, doubled or swapped letter
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time trigram name search against substring and difflib scans.")
+    parser.add_argument("--pages", type=int, default=5000, help="corpus pages to take item names from")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    database = baseline_items(generate_corpus(args.pages))
+    item_index = ItemIndex.build(database)
+    start = time.perf_counter()
+    names = NameSearchIndex.build(item_index)
+    build_time = time.perf_counter() - start
+    print(f"{len(database)} items, {len(names.docs)} names, {len(names.postings)} trigrams, built in {build_time * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    targets = rng.sample(sorted((item_id, item['name']) for item_id, item in database.items() if len(item['name']) > 4),
+                         args.queries)
+    queries = [(item_id, misspell(name, rng)) for item_id, name in targets]
+    normalized = {item_id: normalize_name(item['name']) for item_id, item in database.items()}
+    by_text = {}
+    for item_id, text in normalized.items():
+        by_text.setdefault(text, []).append(item_id)
+    texts = list(by_text)
+
+    def substring(query):
+        query = normalize_name(query)
+        return [item_id for item_id, text in normalized.items() if query in text][:args.limit]
+
+    def close_matches(query):
+        matches = difflib.get_close_matches(normalize_name(query), texts, n=args.limit, cutoff=0.6)
+        return [item_id for text in matches for item_id in by_text[text]]
+
+    def trigram(query):
+        return [item_id for _, item_id, _ in names.search(query, args.limit)]
+
+    print(f"{'method':<12} {'ms/query':>9} {'found':>7}   ({args.queries} names with one typo, top {args.limit})")
+    for method, search in (("substring", substring), ("difflib", close_matches), ("trigram", trigram)):
+        start = time.perf_counter()
+        found = sum(item_id in search(query) for item_id, query in queries)
+        elapsed = time.perf_counter() - start
+        print(f"{method:<12} {elapsed / args.queries * 1000:>9.3f} {found / args.queries:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import infobox_parser
+import legacy_parser
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wikitext")
+
+
+def load_corpus(fixture_dir=FIXTURE_DIR):
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.wiki"))):
+        title = os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus[title] = f.read()
+    return corpus
+
+
+def time_parser(parse, corpus, rounds, fold_2h):
+    pages = list(corpus.items())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for title, wikitext in pages:
+            parse(wikitext, title, "2025-01-01T00:00:00Z", None, fold_2h=fold_2h)
+    elapsed = time.perf_counter() - start
+    return rounds * len(pages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check infobox_parser against the legacy regex parser and time both.")
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over the fixture corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    parsed = 0
+    for fold_2h in (True, False):
+        for title, wikitext in corpus.items():
+            expected = legacy_parser.parse_infobox(wikitext, title, "2025-01-01T00:00:00Z", None, fold_2h=fold_2h)
+            actual = infobox_parser.parse_infobox(wikitext, title, "2025-01-01T00:00:00Z", None, fold_2h=fold_2h)
+            assert actual == expected, f"parser mismatch on '{title}' (fold_2h={fold_2h})"
+            parsed += expected is not None
+    print(f"{len(corpus)} fixture pages, outputs identical in both slot modes ({parsed // 2} pages yield an item).")
+
+    legacy_rate = time_parser(legacy_parser.parse_infobox, corpus, args.rounds, True)
+    new_rate = time_parser(infobox_parser.parse_infobox, corpus, args.rounds, True)
+    print(f"legacy parser: {legacy_rate:,.0f} pages/sec")
+    print(f"single-pass parser: {new_rate:,.0f} pages/sec ({new_rate / legacy_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
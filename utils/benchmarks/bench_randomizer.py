@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_writer import synthetic_database
+from randomizer import Randomizer, weight_function
+
+
+def bisect_rolls(pool, weights, rng, count):
+    # what a weighted pick costs without an alias table: a binary search over cumulative weights per roll
+    cumulative = list(accumulate(weights))
+    total = cumulative[-1]
+    return [pool[bisect(cumulative, rng.random() * total)] for _ in range(count)]
+
+
+def uniform_rolls(pool, rng, count):
+    # script.js: Math.floor(Math.random() * items.length)
+    return [pool[int(rng.random() * len(pool))] for _ in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time weighted rolls from alias tables against cumulative-weight bisection.")
+    parser.add_argument("--items", type=int, default=15000)
+    parser.add_argument("--rolls", type=int, default=2_000_000)
+    parser.add_argument("--slot", default="weapon")
+    parser.add_argument("--weight", default="value")
+    args = parser.parse_args()
+
+    database = synthetic_database(args.items)
+    build_time, randomizer = timed(lambda: Randomizer(database, args.weight, seed=1))
+    pool = randomizer.pools[args.slot]
+    weigh = weight_function(args.weight)
+    weights = [weigh(item) for item in pool]
+    print(f"{args.items} items, {len(pool)} in the {args.slot} pool, '{args.weight}' weighting")
+    print(f"building every slot's alias table: {build_time * 1000:.1f} ms")
+
+    rng = random.Random(1)
+    results = [
+        ("uniform", timed(lambda: uniform_rolls(pool, rng, args.rolls))),
+        ("bisect", timed(lambda: bisect_rolls(pool, weights, rng, args.rolls))),
+        ("alias", timed(lambda: randomizer.roll_many(args.slot, args.rolls))),
+    ]
+    for name, (elapsed, _) in results:
+        print(f"{name:<8} {args.rolls:>9} rolls {elapsed:7.2f} s {args.rolls / elapsed / 1e6:7.2f} M rolls/s")
+
+    # the alias rolls should follow the weights: compare each item's share with its expected share
+    counts = {}
+    for item in results[2][1][1]:
+        counts[item['id']] = counts.get(item['id'], 0) + 1
+    total = sum(weights)
+    worst = max(abs(counts.get(item['id'], 0) / args.rolls - w / total) for item, w in zip(pool, weights))
+    print(f"largest gap between an item's rolled and expected share: {worst:.6f} (expected shares average {1 / len(pool):.6f})")
+
+    builds, _ = timed(lambda: [randomizer.roll_build() for _ in range(args.rolls // 20)])
+    print(f"full builds: {args.rolls // 20 / builds / 1e3:.0f} K builds/s")
+
+    first, second = Randomizer(database, args.weight, seed=7), Randomizer(database, args.weight, seed=7)
+    if [first.roll_build() for _ in range(100)] != [second.roll_build() for _ in range(100)]:
+        print("The same seed gave different builds!")
+
+
+if __name__ == "__main__":
+    main()
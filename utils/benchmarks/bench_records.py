@@ -0,0 +1,104 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from baseline_cache import iter_object_items
+from bench_writer import synthetic_database
+from item_index import ItemIndex
+from item_record import ItemRecord
+from items_writer import write_items
+
+EXAMINES = ["Swap this note at any bank for the equivalent item.", "A set of armour.", "A razor sharp weapon."]
+RELEASES = ["4 January 2001", "25 February 2013", "27 October 2016", "24 July 2019"]
+
+
+def realistic_database(count):
+    # the synthetic items with the repetition the real database has: shared examines, release dates and timestamps
+    database = synthetic_database(count)
+    for item_id, item in database.items():
+        n = int(item_id)
+        item['examine'] = EXAMINES[n % len(EXAMINES)] if n % 4 else item['examine']
+        item['release_date'] = RELEASES[n % len(RELEASES)]
+        item['last_updated'] = f"2025-0{n % 9 + 1}-01T00:00:00Z"
+    return database
+
+
+def load(mode, path):
+    if mode == 'dict':
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return {item_id: ItemRecord.from_dict(item) for item_id, item in iter_object_items(f)}
+
+
+def merge(item_database, updates):
+    # the per-item work of a merge run: timestamp checks over everything, updates to a slice, and the name index
+    stale = sum(1 for item in item_database.values() if item.get('last_updated', '') < "2025-05-01")
+    for item_id, parsed_item in updates.items():
+        item_database[item_id].update(parsed_item)
+    ItemIndex.build(item_database)
+    return stale
+
+
+def _run(mode, path, updates, results):
+    start = time.perf_counter()
+    item_database = load(mode, path)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    merge(item_database, updates)
+    merge_time = time.perf_counter() - start
+    del item_database
+
+    # second pass under tracemalloc, which is too slow to time against
+    tracemalloc.start()
+    item_database = load(mode, path)
+    resident, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put((load_time, merge_time, resident / (1024 * 1024), peak / (1024 * 1024)))
+
+
+def measure(mode, path, updates):
+    # each mode runs in a fresh process so interned strings and allocator state are not shared
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(mode, path, updates, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plain item dicts with compact ItemRecords.")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--updated", type=float, default=0.1, help="fraction of items the merge updates")
+    args = parser.parse_args()
+
+    database = realistic_database(args.items)
+    step = max(1, int(1 / args.updated)) if args.updated else 0
+    updates = {
+        item_id: {'last_updated': "2025-10-01T00:00:00Z", 'equipment': dict(item['equipment'], prayer=1)}
+        for item_id, item in database.items() if step and int(item_id) % step == 0
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "items.json")
+        write_items(path, database)
+        roundtrip = {item_id: ItemRecord.from_dict(item).to_dict() for item_id, item in load('dict', path).items()}
+        assert json.dumps(roundtrip) == json.dumps(load('dict', path)), "records do not round-trip losslessly"
+        runs = [("dicts (json.load)", measure('dict', path, updates)), ("ItemRecord", measure('record', path, updates))]
+
+    print(f"{args.items} items, {len(updates)} updated by the merge; records round-trip losslessly")
+    for label, (load_time, merge_time, resident_mb, peak_mb) in runs:
+        print(f"{label:<18} load {load_time:6.2f}s  merge {merge_time:6.2f}s  "
+              f"resident {resident_mb:7.1f} MB  peak during load {peak_mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from baseline_cache import BASELINE_URL
+from corpus import baseline_items, generate_corpus
+from items_writer import write_items
+from stub_wiki import StubWiki
+
+# extra runs of the batch scripts with other fetch modes, compared against their default
+VARIANTS = {'crawl': ("--crawl",), 'bucket': ("--source", "bucket")}
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    'batch_merge_osrsbox': ("batch_merge_osrsbox.py", os.path.join("database", "items.json")),
+    'batch_merge_curr_db': ("batch_merge_curr_db.py", os.path.join("database", "items.json")),
+    'incremental_create': ("incremental_create.py", "items-delta.json"),
+}
+
+
+def prepare_workdir(workdir, script, baseline):
+    # each run starts cold: no page, icon or index caches, only the inputs the script expects to find
+    if script == 'batch_merge_curr_db':
+        write_items(os.path.join(workdir, "database", "items.json"), baseline)
+        return
+    cache_dir = os.path.join(workdir, ".cache", "baseline")
+    os.makedirs(cache_dir)
+    raw = json.dumps(baseline).encode('utf-8')
+    with open(os.path.join(cache_dir, os.path.basename(BASELINE_URL)), 'wb') as f:
+        f.write(raw)
+    with open(os.path.join(cache_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"url": BASELINE_URL, "sha256": hashlib.sha256(raw).hexdigest(), "checked": time.time()}, f)
+
+
+def run_script(script, workdir, api_url, script_args=()):
+    # returns (seconds, peak RSS in MB, exit status) for one script run in its own process
+    env = dict(os.environ, OSRS_WIKI_API_URL=api_url)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(UTILS_DIR, SCRIPTS[script][0]), *script_args],
+                               cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        print(stderr.decode('utf-8', 'replace')[-2000:])
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss / 1024, process.returncode
+
+
+def count_items(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return len(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the merge scripts end to end against a synthetic stub wiki.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[200, 1000, 5000], help="corpus sizes in pages")
+    parser.add_argument("--scripts", nargs='+', choices=sorted(SCRIPTS), default=sorted(SCRIPTS))
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the stub adds to every response")
+    parser.add_argument("--known", type=float, default=0.7, help="fraction of the corpus already in the baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", nargs='+', choices=sorted(VARIANTS), default=[],
+                        help="also run the batch scripts with --crawl or --source bucket")
+    args = parser.parse_args()
+
+    runs = [(script, ()) for script in args.scripts]
+    for variant in args.variants:
+        runs += [(script, VARIANTS[variant]) for script in args.scripts if script.startswith("batch_merge")]
+
+    print(f"latency {args.latency * 1000:.0f} ms per request, {args.known:.0%} of each corpus in the baseline")
+    print("incremental_create sleeps 50 ms per new title by design, which bounds its rate")
+    print(f"{'script':<26}{'pages':>7}{'seconds':>9}{'pages/s':>9}{'api':>7}{'api MB':>8}{'thumbs':>8}{'peak MB':>9}{'items':>8}")
+    for size in args.sizes:
+        pages = generate_corpus(size, args.seed)
+        baseline = baseline_items(pages, args.known)
+        with StubWiki(pages, latency=args.latency) as stub:
+            for script, script_args in runs:
+                with tempfile.TemporaryDirectory() as workdir:
+                    prepare_workdir(workdir, script, baseline)
+                    requests_before, thumbs_before, bytes_before = stub.request_count, stub.thumb_requests, stub.api_bytes
+                    elapsed, peak_mb, status = run_script(script, workdir, stub.api_url, script_args)
+                    items = count_items(os.path.join(workdir, SCRIPTS[script][1]))
+                name = " ".join((script.replace("batch_merge_", "") if script_args else script,) + script_args)
+                if status:
+                    print(f"{name:<26}{size:>7}  failed with exit status {status}")
+                    continue
+                thumbs = stub.thumb_requests - thumbs_before
+                # request_count includes the thumbnail fetches
+                api_mb = (stub.api_bytes - bytes_before) / (1024 * 1024)
+                print(f"{name:<26}{size:>7}{elapsed:>9.2f}{size / elapsed:>9.0f}"
+                      f"{stub.request_count - requests_before - thumbs:>7}{api_mb:>8.1f}{thumbs:>8}{peak_mb:>9.1f}{items:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_writer import synthetic_database
+from build_simulator import BuildSimulator
+from randomizer import Randomizer, build_totals
+
+
+def python_means(database, weight, builds):
+    # the per-build loop the simulator replaces
+    randomizer = Randomizer(database, weight, seed=1)
+    sums = {}
+    for _ in range(builds):
+        for key, value in build_totals(randomizer.roll_build()).items():
+            sums[key] = sums.get(key, 0) + value
+    return {key: total / builds for key, total in sums.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time bulk build simulation against rolling builds one at a time.")
+    parser.add_argument("--items", type=int, default=15000)
+    parser.add_argument("--builds", type=int, default=1_000_000)
+    parser.add_argument("--python-builds", type=int, default=100_000)
+    parser.add_argument("--weight", default="uniform")
+    parser.add_argument("--workers", type=int, default=0, help="for the multiprocessing run (0: one per core)")
+    args = parser.parse_args()
+
+    database = synthetic_database(args.items)
+    simulator = BuildSimulator(database, args.weight)
+
+    start = time.perf_counter()
+    expected = python_means(database, args.weight, args.python_builds)
+    python_time = time.perf_counter() - start
+    print(f"{args.items} items, '{args.weight}' weighting")
+    print(f"python loop  {args.python_builds:>9} builds {python_time:7.2f} s {args.python_builds / python_time / 1e3:9.0f} K builds/s")
+
+    for chunk_size in (1_000_000, 10_000, 100_000):
+        tracemalloc.start()
+        start = time.perf_counter()
+        histograms = simulator.run(args.builds, seed=1, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"chunks {chunk_size:>7} {args.builds:>9} builds {elapsed:7.2f} s {args.builds / elapsed / 1e3:9.0f} K builds/s, "
+              f"peak {peak / 2**20:7.1f} MB")
+
+    start = time.perf_counter()
+    parallel = simulator.run(args.builds, seed=1, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"workers {args.workers or os.cpu_count():>6} {args.builds:>9} builds {elapsed:7.2f} s {args.builds / elapsed / 1e3:9.0f} K builds/s")
+
+    if any(parallel.percentile(key, 50) != histograms.percentile(key, 50) for key in expected):
+        print("The worker count changed the results!")
+    # same distribution as the one-at-a-time randomizer, up to sampling noise
+    worst = max(abs(histograms.mean(key) - mean) for key, mean in expected.items())
+    print(f"largest difference in a mean total against the python loop: {worst:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_writer import synthetic_database
+from items_writer import write_items
+from stat_table import StatTable, write_stat_table
+
+
+def json_query(path):
+    # best melee strength per slot, the way an analysis script would do it today
+    with open(path, 'r', encoding='utf-8') as f:
+        item_database = json.load(f)
+    best = {}
+    for item in item_database.values():
+        equipment = item.get('equipment')
+        if not equipment:
+            continue
+        slot = equipment.get('slot')
+        best[slot] = max(best.get(slot, -32768), equipment.get('melee_strength') or 0)
+    return best
+
+
+def table_query(path):
+    with StatTable(path) as table:
+        slots = table.column('slot')
+        strength = table.column('melee_strength')
+        best = {}
+        for code, value in zip(slots, strength):
+            if value > best.get(code, -32768):
+                best[code] = value
+        return {table.slot_names[code]: value for code, value in best.items()}
+
+
+def timed(func, path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a stat query over items.json with the packed stat table.")
+    parser.add_argument("--items", type=int, default=15000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database = synthetic_database(args.items)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "items.json")
+        table_path = os.path.join(tmp, "stats.bin")
+        write_items(json_path, database)
+        write_stat_table(database, table_path)
+
+        json_time, json_result = timed(json_query, json_path, args.repeat)
+        table_time, table_result = timed(table_query, table_path, args.repeat)
+        if json_result != table_result:
+            print("Results differ between items.json and the stat table!")
+
+        json_bytes = os.path.getsize(json_path)
+        table_bytes = os.path.getsize(table_path)
+
+    print(f"{args.items} items, best melee strength per slot (best of {args.repeat})")
+    print(f"items.json:  {json_bytes / 1024:9.1f} KB, load + query {json_time * 1000:8.1f} ms")
+    print(f"stats.bin:   {table_bytes / 1024:9.1f} KB, open + query {table_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from items_writer import write_items
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SLOTS = ['head', 'cape', 'neck', 'ammo', 'weapon', '2h', 'shield', 'body', 'legs', 'hands', 'feet', 'ring']
+STAT_KEYS = [
+    'attack_stab', 'attack_slash', 'attack_crush', 'attack_magic', 'attack_ranged',
+    'defence_stab', 'defence_slash', 'defence_crush', 'defence_magic', 'defence_ranged',
+    'melee_strength', 'ranged_strength', 'magic_damage', 'prayer'
+]
+
+
+def synthetic_database(count):
+    database = {}
+    for i in range(1, count + 1):
+        name = f"Synthetic item {i}"
+        icon = base64.b64encode(bytes((i * 7 + n) % 256 for n in range(700))).decode('utf-8')
+        database[str(i)] = {
+            'id': i, 'name': name, 'last_updated': "2025-01-01T00:00:00Z", 'incomplete': False,
+            'members': i % 2 == 0, 'tradeable': True, 'tradeable_on_ge': True, 'stackable': False,
+            'stacked': None, 'noted': False, 'noteable': True, 'linked_id_item': None,
+            'linked_id_noted': None, 'linked_id_placeholder': None, 'placeholder': False,
+            'equipable': True, 'equipable_by_player': True, 'equipable_weapon': False,
+            'cost': i * 3, 'lowalch': i, 'highalch': i * 2, 'weight': 1.5, 'buy_limit': None,
+            'quest_item': False, 'release_date': "1 January 2025", 'examine': f"A synthetic item number {i}.",
+            'icon': icon, 'wiki_name': name.replace(' ', '_'),
+            'wiki_url': f"https://oldschool.runescape.wiki/w/{name.replace(' ', '_')}",
+            'equipment': {**{key: (i * (n + 3)) % 90 - 10 for n, key in enumerate(STAT_KEYS)}, 'slot': SLOTS[i % len(SLOTS)]},
+            'weapon': {'attack_speed': 4, 'weapon_type': 'stab sword', 'stances': []},
+        }
+    return database
+
+
+def legacy_write(path, item_database, compact=False):
+    with open(path, 'w', encoding='utf-8') as f:
+        sorted_data = {k: v for k, v in sorted(item_database.items(), key=lambda item: int(item[0]))}
+        json.dump(sorted_data, f, indent=None if compact else 4, separators=(',', ':') if compact else None)
+
+
+def _max_rss_mb():
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_writer(name, count, compact, path, results):
+    writer = legacy_write if name == 'legacy' else write_items
+    database = synthetic_database(count)
+    rss_before = _max_rss_mb()
+    start = time.perf_counter()
+    writer(path, database, compact=compact)
+    elapsed = time.perf_counter() - start
+    rss_growth = _max_rss_mb() - rss_before
+    # second pass under tracemalloc, which is too slow to time against
+    tracemalloc.start()
+    writer(path, database, compact=compact)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.put((elapsed, traced_peak / (1024 * 1024), rss_growth))
+
+
+def measure(name, count, compact, path):
+    # each writer runs in a fresh process so peak RSS is not shared between runs
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_writer, args=(name, count, compact, path, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming items.json writer with the old sorted-copy json.dump.")
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        stream_path = os.path.join(tmp, "stream.json")
+        compact_path = os.path.join(tmp, "compact.json")
+        runs = [
+            ("legacy indent=4", measure('legacy', args.items, False, legacy_path), legacy_path),
+            ("streaming indent=4", measure('stream', args.items, False, stream_path), stream_path),
+            ("streaming compact", measure('stream', args.items, True, compact_path), compact_path),
+        ]
+        with open(legacy_path, 'rb') as a, open(stream_path, 'rb') as b:
+            assert a.read() == b.read(), "streaming writer output differs from json.dump"
+        with open(compact_path, 'r', encoding='utf-8') as a, open(legacy_path, 'r', encoding='utf-8') as b:
+            assert json.load(a) == json.load(b), "compact output does not round-trip"
+
+        print(f"{args.items} items; indented streaming output is byte-identical to json.dump")
+        for label, (elapsed, traced_mb, rss_mb), path in runs:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{label:<20} {elapsed:6.2f}s  peak traced {traced_mb:7.1f} MB  "
+                  f"peak RSS growth {rss_mb:7.1f} MB  file {size_mb:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
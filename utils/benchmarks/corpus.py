@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infobox_parser import parse_infobox
+
+# synthetic OSRS-wiki-like item pages: a mix of slots, 2h weapons, untradeables, non-equipables,
+# variant titles, subpages and shared thumbnails, formatted the way real infoboxes are
+
+MATERIALS = ["Bronze", "Iron", "Steel", "Black", "White", "Mithril", "Adamant", "Rune", "Dragon", "Granite",
+             "Crystal", "Ancient", "Blessed", "Corrupted", "Elder", "Gilded", "Inquisitor's", "Void"]
+EQUIPMENT = {
+    'head': ["full helm", "med helm", "coif", "hat", "mask"],
+    'body': ["platebody", "chainbody", "body", "top", "robe top"],
+    'legs': ["platelegs", "plateskirt", "chaps", "robe bottom"],
+    'weapon': ["scimitar", "longsword", "dagger", "mace", "sword", "warhammer", "crossbow", "staff"],
+    '2h': ["2h sword", "halberd", "shortbow", "longbow", "godsword", "maul"],
+    'shield': ["kiteshield", "sq shield", "defender", "book", "ward"],
+    'feet': ["boots"],
+    'hands': ["gloves", "vambraces", "gauntlets"],
+    'cape': ["cape", "cloak"],
+    'neck': ["amulet", "necklace"],
+    'ring': ["ring"],
+    'ammo': ["arrow", "bolts", "dart"],
+}
+MISC = ["bar", "ore", "potion(4)", "potion(3)", "seed", "logs", "bones", "rune", "key", "certificate", "pie"]
+VARIANTS = ["(g)", "(t)", "(h1)", "(broken)", "(or)", "(i)", "(e)"]
+# switch infobox versions get ids from here up, clear of the one-per-page ids
+VERSION_IDS = 1_000_000
+WEAPON_TYPES = {'weapon': ["Slash Sword", "Stab Sword", "Blunt", "Crossbow", "Staff"],
+                '2h': ["2h Sword", "Polearm", "Bow", "Blunt"]}
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+PROSE = ("The {name} is an item that players can obtain in a variety of ways. It is commonly used alongside "
+         "other {material} equipment, and is popular among players training their combat skills. ")
+
+
+def _signed(value):
+    return f"+{value}" if value > 0 else str(value)
+
+
+def _value(rng, value):
+    # the wiki writes large values with thousands separators about half the time
+    return f"{value:,}" if value >= 1000 and rng.random() < 0.5 else str(value)
+
+
+def _bonuses(rng, slot, tier):
+    stats = {key: 0 for key in ("astab", "aslash", "acrush", "amagic", "arange", "dstab", "dslash", "dcrush",
+                                "dmagic", "drange", "str", "rstr", "mdmg", "prayer")}
+    if slot in ('weapon', '2h'):
+        for key in rng.sample(["astab", "aslash", "acrush", "amagic", "arange"], 2):
+            stats[key] = rng.randint(tier, tier * 6)
+        stats["str"] = rng.randint(0, tier * 5)
+    else:
+        for key in ("dstab", "dslash", "dcrush", "drange"):
+            stats[key] = rng.randint(0, tier * 8)
+        stats["dmagic"] = rng.randint(-tier * 2, tier)
+        stats["prayer"] = rng.randint(0, 3)
+    if slot == 'ammo':
+        stats["rstr"] = rng.randint(tier, tier * 5)
+    lines = [f"|{key} = {_signed(value)}" for key, value in stats.items()]
+    lines.append(f"|slot = {slot}")
+    if slot in ('weapon', '2h'):
+        lines.append(f"|aspeed = {rng.choice([4, 5, 6, 7])}")
+        lines.append(f"|wtype = {rng.choice(WEAPON_TYPES[slot])}")
+    return "{{Infobox Bonuses\n" + "\n".join(lines) + "\n}}\n"
+
+
+def make_switch_wikitext(rng, versions, slot, tier, material):
+    # one page holding several versions ([(label, name, id), ...]) the way {{Infobox Item}} switch infoboxes do:
+    # shared parameters plus versionN/nameN/idN, and a versioned {{Infobox Bonuses}} whose strength differs
+    single = make_wikitext(rng, versions[0][2], versions[0][1], slot, tier, material)
+    head, _, rest = single.partition("\n|id = ")
+    rest = rest.split("\n", 1)[1]
+    numbered = []
+    for number, (label, name, item_id) in enumerate(versions, 1):
+        numbered += [f"|version{number} = {label}", f"|name{number} = {name}", f"|id{number} = {item_id}"]
+    text = head.replace(f"|name = {versions[0][1]}\n", "", 1) + "\n" + "\n".join(numbered) + "\n" + rest
+    if slot is not None:
+        bonus_lines = [f"|version{number} = {label}\n|str{number} = +{rng.randint(0, tier * 5) + number}"
+                       for number, (label, _, _) in enumerate(versions, 1)]
+        text = text.replace("{{Infobox Bonuses\n", "{{Infobox Bonuses\n" + "\n".join(bonus_lines) + "\n", 1)
+    return text
+
+
+def make_wikitext(rng, item_id, name, slot, tier, material):
+    members = tier > 3 or rng.random() < 0.3
+    equipable = slot is not None
+    value = rng.randint(1, 50) * 10 ** rng.randint(0, 4)
+    release = f"[[{rng.randint(1, 28)} {rng.choice(MONTHS)}]] [[{rng.randint(2001, 2025)}]]"
+    fields = [
+        f"|name = {name}", f"|image = [[File:{name}.png]]", f"|release = {release}", f"|update = {name}",
+        f"|members = {'Yes' if members else 'No'}", "|quest = No",
+        f"|tradeable = {'Yes' if rng.random() < 0.85 else 'No'}", "|placeholder = Yes",
+        f"|equipable = {'Yes' if equipable else 'No'}", f"|stackable = {'Yes' if slot == 'ammo' else 'No'}",
+        f"|noteable = {'No' if slot == 'ammo' else 'Yes'}",
+        f"|options = {'Wield' if equipable else 'Use'}, Drop", f"|examine = A {material.lower()} item.",
+        f"|value = {_value(rng, value)}", "|alchable = Yes", f"|weight = {rng.uniform(0, 10):.3f}",
+        f"|exchange = {'Yes' if rng.random() < 0.8 else 'No'}", f"|id = {item_id}",
+    ]
+    text = "{{Infobox Item\n" + "\n".join(fields) + "\n}}\n"
+    if equipable:
+        text += _bonuses(rng, slot, tier)
+    text += PROSE.format(name=name.lower(), material=material.lower()) * rng.randint(2, 8)
+    text += f"\n==Changes==\n{{{{Subject changes table}}}}\n[[Category:{material} equipment]]\n"
+    return text
+
+
+def generate_corpus(count, seed=0, first_id=1000):
+    # {title: {"content", "timestamp", "thumb"}}, deterministic for a given count and seed
+    rng = random.Random(seed)
+    pages = {}
+    bases = [(slot, base) for slot, names in EQUIPMENT.items() for base in names] + [(None, base) for base in MISC]
+    n = 0
+    while len(pages) < count:
+        slot, base = bases[n % len(bases)]
+        tier = n // len(bases) % len(MATERIALS)
+        material = MATERIALS[tier]
+        generation = n // (len(bases) * len(MATERIALS))
+        name = f"{material} {base}" + (f" {generation + 1}" if generation else "")
+        roll = rng.random()
+        if roll < 0.08:
+            name = f"{name} {rng.choice(VARIANTS)}"
+        elif roll < 0.10:
+            name = f"{name}/Charged"
+        elif roll < 0.11:
+            name = f"{name} (unobtainable)"
+        n += 1
+        if name in pages:
+            continue
+        month = rng.randint(1, 12)
+        timestamp = f"{rng.randint(2021, 2025)}-{month:02d}-{rng.randint(1, 28):02d}T12:00:00Z"
+        # variants of one base item share their thumbnail, like dose and charge variants do
+        thumb = hash_thumb(material, base)
+        if slot is not None and roll > 0.94:
+            # a switch infobox page; some of its versions also have a page of their own, as on the wiki
+            labels = rng.sample(VARIANTS, rng.randint(1, 2))
+            versions = [("Normal", name, first_id + n)]
+            versions += [(label, f"{name} {label}", VERSION_IDS + n * 4 + k) for k, label in enumerate(labels, 1)]
+            pages[name] = {"content": make_switch_wikitext(rng, versions, slot, tier % 9 + 1, material),
+                           "timestamp": timestamp, "thumb": thumb}
+            for _, version_name, item_id in versions[1:]:
+                if len(pages) < count and version_name not in pages and rng.random() < 0.6:
+                    pages[version_name] = {"content": make_wikitext(rng, item_id, version_name, slot, tier % 9 + 1, material),
+                                           "timestamp": timestamp, "thumb": thumb}
+            continue
+        pages[name] = {
+            "content": make_wikitext(rng, first_id + n, name, slot, tier % 9 + 1, material),
+            "timestamp": timestamp,
+            "thumb": thumb,
+        }
+    return pages
+
+
+def hash_thumb(material, base):
+    return sum(map(ord, material + base)) % 997
+
+
+def baseline_items(pages, fraction=0.7, last_updated="2021-09-01T00:00:00"):
+    # osrsbox-shaped items for roughly `fraction` of the corpus, as an older snapshot the merge scripts start from
+    step = max(1, round(1 / (1 - fraction))) if fraction < 1 else 0
+    items = {}
+    for n, (title, page) in enumerate(pages.items()):
+        if step and n % step == 0:
+            continue
+        item = parse_infobox(page["content"], title, last_updated, None, fold_2h=False)
+        if not item:
+            continue
+        item['duplicate'] = False
+        if item['weapon']:
+            item['weapon']['stances'] = [{'combat_style': 'accurate', 'attack_type': 'stab', 'boosts': None}]
+        items[str(item['id'])] = item
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic wiki corpus and matching baseline to disk.")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="corpus")
+    args = parser.parse_args()
+
+    pages = generate_corpus(args.pages, args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, "pages.json"), 'w', encoding='utf-8') as f:
+        json.dump(pages, f)
+    with open(os.path.join(args.output_dir, "baseline.json"), 'w', encoding='utf-8') as f:
+        json.dump(baseline_items(pages), f)
+    print(f"Wrote {len(pages)} pages and their baseline to '{args.output_dir}'.")
+
+
+if __name__ == "__main__":
+    main()
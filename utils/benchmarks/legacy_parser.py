@@ -0,0 +1,111 @@
+import re
+
+# frozen copy of the regex parser the batch scripts used before infobox_parser.py; kept only so
+# bench_parser.py can check the new parser returns identical dicts
+
+def _to_int(value, default=0):
+    try:
+        return int(re.sub(r'[^0-9-]', '', str(value)))
+    except (ValueError, TypeError):
+        return default
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+def _parse_equipment_and_weapon(wikitext, fold_2h=True):
+    equipment = {}
+    weapon = {}
+    
+    match = re.search(r'\{\{Infobox Bonuses\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
+    if not match:
+        return equipment, weapon
+
+    content = match.group(1)
+    bonus_data = {}
+    lines = content.split('\n|')
+    for line in lines:
+        if '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        bonus_data[key.strip().lower()] = value.strip()
+
+    stat_map = {
+        'astab': 'attack_stab', 'aslash': 'attack_slash', 'acrush': 'attack_crush',
+        'amagic': 'attack_magic', 'arange': 'attack_ranged', 'dstab': 'defence_stab',
+        'dslash': 'defence_slash', 'dcrush': 'defence_crush', 'dmagic': 'defence_magic',
+        'drange': 'defence_ranged', 'str': 'melee_strength', 'rstr': 'ranged_strength',
+        'mdmg': 'magic_damage', 'prayer': 'prayer'
+    }
+    for wiki_key, osrsbox_key in stat_map.items():
+        equipment[osrsbox_key] = _to_int(bonus_data.get(wiki_key, 0))
+
+    slot = bonus_data.get('slot', 'not equipable').lower()
+    if fold_2h and '2h' in slot:
+        equipment['slot'] = '2h'
+    else:
+        equipment['slot'] = slot
+
+    weapon['attack_speed'] = _to_int(bonus_data.get('aspeed', 0))
+    weapon['weapon_type'] = bonus_data.get('wtype', 'unarmed').lower()
+    
+    weapon['stances'] = [] 
+    
+    return equipment, weapon
+
+def parse_infobox(wikitext, item_name, last_updated_iso, icon_b64, fold_2h=True):
+    match = re.search(r'\{\{Infobox Item\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
+    if not match: return None
+    
+    content = match.group(1)
+    item_data = {}
+
+    lines = content.split('\n|')
+    for line in lines:
+        if '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        key = key.strip().lower()
+        value = value.strip()
+        value = re.sub(r'\[\[(?:[^|]+\|)?([^\]]+)\]\]', r'\1', value)
+        value = re.sub(r'<[^>]+>', '', value)
+        value = re.sub(r'\{\{[^}]*?\}\}', '', value)
+        value = value.strip()
+        item_data[key] = value
+
+    try:
+        item_id = _to_int(item_data.get('id', '0'))
+        if item_id == 0: return None
+    except (ValueError, TypeError):
+        return None
+
+    equipment, weapon = _parse_equipment_and_weapon(wikitext, fold_2h)
+
+    return {
+        'id': item_id, 'name': item_name, 'last_updated': last_updated_iso,
+        'incomplete': False, 'members': item_data.get('members', 'no').lower() == 'yes',
+        'tradeable': 'yes' in item_data.get('tradeable', 'yes').lower(),
+        'tradeable_on_ge': 'yes' in item_data.get('tradeable', 'yes').lower(),
+        'stackable': item_data.get('stackable', 'no').lower() == 'yes',
+        'stacked': None, 'noted': 'yes' in item_data.get('noteable', 'no').lower(),
+        'noteable': 'yes' in item_data.get('noteable', 'no').lower(),
+        'linked_id_item': None, 'linked_id_noted': None, 'linked_id_placeholder': None,
+        'placeholder': False, 'equipable': item_data.get('equipable', 'no').lower() == 'yes',
+        'equipable_by_player': item_data.get('equipable', 'no').lower() == 'yes',
+        'equipable_weapon': 'weapon' in item_data.get('slayercat', ''),
+        'cost': _to_int(item_data.get('value', '0')),
+        'lowalch': _to_int(item_data.get('lowalch', '0')),
+        'highalch': _to_int(item_data.get('highalch', '0')),
+        'weight': _to_float(item_data.get('weight', 0.0)),
+        'buy_limit': _to_int(item_data.get('gemw'), default=None) if item_data.get('gemw') else None,
+        'quest_item': item_data.get('quest', 'no').lower() == 'yes',
+        'release_date': item_data.get('release', None),
+        'examine': item_data.get('examine', ''),
+        'icon': icon_b64,
+        'wiki_name': item_name.replace(' ', '_'),
+        'wiki_url': f"https://oldschool.runescape.wiki/w/{item_name.replace(' ', '_')}",
+        'equipment': equipment,
+        'weapon': weapon
+    }
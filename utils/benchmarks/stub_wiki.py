@@ -0,0 +1,342 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infobox_parser import extract_infoboxes, split_versions
+from item_sources import BONUS_BUCKET, BONUS_BUCKET_FIELDS, ITEM_BUCKET, ITEM_BUCKET_FIELDS
+
+# minimal stand-in for the OSRS wiki api.php, enough for the utils/ scripts to run against localhost
+BUCKET_QUERY = re.compile(r"bucket\('(\w+)'\)\.select\(([^)]*)\)\.limit\((\d+)\)\.offset\((\d+)\)\.run\(\)")
+NUMBER = re.compile(r"[+-]?\d[\d,]*(\.\d+)?")
+
+
+def make_png(seed, size=8):
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+    colour = bytes(((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256, 255))
+    raw = b"".join(b"\x00" + colour * size for _ in range(size))
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def make_page(item_id, title, timestamp="2025-01-01T00:00:00Z", thumb=None):
+    return {
+        "thumb": thumb,
+        "content": (
+            "{{Infobox Item\n|name = %s\n|release = [[1 January]] [[2025]]\n|members = Yes\n"
+            "|tradeable = Yes\n|equipable = Yes\n|value = 100\n|weight = 1.5\n|examine = A stub item.\n"
+            "|id = %d\n}}\n{{Infobox Bonuses\n|astab = +%d\n|aslash = 0\n|acrush = -2\n|amagic = 0\n"
+            "|arange = 0\n|dstab = 1\n|dslash = 1\n|dcrush = 1\n|dmagic = 0\n|drange = 0\n|str = +5\n"
+            "|rstr = 0\n|mdmg = 0\n|prayer = 0\n|slot = weapon\n|aspeed = 4\n|wtype = Stab sword\n}}\n"
+        ) % (title, item_id, item_id % 50),
+        "timestamp": timestamp,
+    }
+
+
+def _typed(value):
+    if value.lower() in ("yes", "no"):
+        return value.lower() == "yes"
+    if NUMBER.fullmatch(value):
+        number = value.replace(",", "")
+        return float(number) if "." in number else int(number)
+    return value
+
+
+class StubWiki:
+    def __init__(self, pages, latency=0.0, port=0):
+        self.pages = pages
+        self.latency = latency
+        # failure injection: titles whose batches fail with an api error, how many upcoming api requests get a
+        # 503 or a maxlag error (both with Retry-After: 0), and a result size cap like $wgAPIMaxResultSize
+        self.error_titles = set()
+        self.transient_errors = 0
+        self.lagged_requests = 0
+        self.max_result_bytes = None
+        # pages that exist but aren't in Category:Items, like guides and quest pages
+        self.non_item_titles = set()
+        self.request_count = 0
+        self.thumb_requests = 0
+        self.api_bytes = 0
+        self._page_ids = {}
+        self._bucket_rows = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}/api.php"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def category_members(self, params):
+        titles = sorted(set(self.pages) - self.non_item_titles)
+        limit = int(params.get("cmlimit", 500))
+        start = int(params.get("cmcontinue", 0))
+        chunk = titles[start:start + limit]
+        data = {"query": {"categorymembers": [{"ns": 0, "title": t} for t in chunk]}}
+        if start + limit < len(titles):
+            data["continue"] = {"cmcontinue": str(start + limit), "continue": "-||"}
+        return data
+
+    def generated_pages(self, params):
+        # generator=categorymembers: a page of members by sortkey (the title, uppercased) within the prefix range,
+        # with their revisions; past the result size cap the rest of the batch is continued with rvcontinue
+        start_key = params.get("gcmstartsortkeyprefix", "").upper()
+        end_key = params.get("gcmendsortkeyprefix", "").upper()
+        titles = [t for t in sorted(set(self.pages) - self.non_item_titles, key=str.upper)
+                  if t.upper() >= start_key and (not end_key or t.upper() < end_key)]
+        limit = int(params.get("gcmlimit", 10))
+        start = int(params.get("gcmcontinue", 0))
+        chunk = titles[start:start + limit]
+        skip = int(params.get("rvcontinue", 0))
+        data = self.page_query({**params, "titles": "|".join(chunk[skip:])}) if chunk[skip:] else {"query": {"pages": {}}}
+        if "error" in data:
+            return data
+        if "continue" in data:
+            returned = sum("revisions" in page for page in data["query"]["pages"].values())
+            data["continue"] = {"rvcontinue": str(skip + returned), "gcmcontinue": str(start), "continue": "gcmcontinue||"}
+        elif start + limit < len(titles):
+            data["continue"] = {"gcmcontinue": str(start + limit), "continue": "-||"}
+        return data
+
+    def recent_changes(self, params):
+        # a page with a "created" timestamp logs a "new" entry then, and an "edit" at its revision timestamp
+        since = params.get("rcstart", "")
+        types = params.get("rctype", "edit|new").split("|")
+        entries = []
+        for title, page in self.pages.items():
+            created = page.get("created")
+            if created and "new" in types:
+                entries.append({"type": "new", "ns": 0, "title": title, "timestamp": created})
+            if page["timestamp"] != created and "edit" in types:
+                entries.append({"type": "edit", "ns": 0, "title": title, "timestamp": page["timestamp"]})
+        entries = sorted((e for e in entries if e["timestamp"] >= since), key=lambda e: (e["timestamp"], e["title"]))
+        limit = int(params.get("rclimit", 500))
+        start = int(params.get("rccontinue", 0))
+        data = {"query": {"recentchanges": entries[start:start + limit]}}
+        if start + limit < len(entries):
+            data["continue"] = {"rccontinue": str(start + limit), "continue": "-||"}
+        return data
+
+    def page_categories(self, params):
+        # prop=categories filtered to clcategories, which the stub only knows as Category:Items
+        wanted = params.get("clcategories", "").split("|")
+        pages = {}
+        for n, title in enumerate(params.get("titles", "").split("|"), 1):
+            if title not in self.pages:
+                pages[str(-n)] = {"ns": 0, "title": title, "missing": ""}
+                continue
+            entry = {"pageid": n, "ns": 0, "title": title}
+            if "Category:Items" in wanted and title not in self.non_item_titles:
+                entry["categories"] = [{"ns": 14, "title": "Category:Items"}]
+            pages[str(n)] = entry
+        return {"query": {"pages": pages}}
+
+    def page_query(self, params):
+        titles = params.get("titles", "").split("|")
+        bad = self.error_titles.intersection(titles)
+        if bad:
+            return {"error": {"code": "internal_api_error_DBQueryError", "info": f"stub failure on {sorted(bad)[0]}"}}
+        pages = {}
+        missing = -1
+        result_bytes = 0
+        truncated = False
+        for title in titles:
+            page = self.pages.get(title)
+            if page is None:
+                pages[str(missing)] = {"ns": 0, "title": title, "missing": ""}
+                missing -= 1
+                continue
+            with self._lock:
+                page_id = str(self._page_ids.setdefault(title, len(self._page_ids) + 1))
+            revision = {"revid": page.get("revid", int(page_id)), "timestamp": page["timestamp"]}
+            if "content" in params.get("rvprop", "content"):
+                revision["*"] = page["content"]
+            entry = {"pageid": int(page_id), "ns": 0, "title": title, "revisions": [revision]}
+            # past the cap (the first page always fits) pages are listed without their revision, to be continued
+            if self.max_result_bytes is not None and result_bytes and result_bytes + len(page["content"]) > self.max_result_bytes:
+                truncated = True
+                del entry["revisions"]
+            else:
+                result_bytes += len(page["content"])
+            if page.get("thumb") is not None and "pageimages" in params.get("prop", ""):
+                entry["thumbnail"] = {"source": f"{self.base_url}/images/thumb/{page['thumb']}.png", "width": 8, "height": 8}
+            pages[page_id] = entry
+        data = {"query": {"pages": pages}}
+        if truncated:
+            data["continue"] = {"rvcontinue": "stub", "continue": "||"}
+        return data
+
+    def bucket_rows(self):
+        # the rows the wiki's infobox templates would store for each page, typed the way bucket returns them:
+        # one row per version of a switch infobox, each with that version's merged fields and its anchor
+        if self._bucket_rows is None:
+            rows = {ITEM_BUCKET: [], BONUS_BUCKET: []}
+            for title in sorted(self.pages):
+                item_fields, bonus_fields = extract_infoboxes(self.pages[title]["content"])
+                labels = {}
+                for bucket, fields, field_map in ((ITEM_BUCKET, item_fields, ITEM_BUCKET_FIELDS),
+                                                  (BONUS_BUCKET, bonus_fields, BONUS_BUCKET_FIELDS)):
+                    if fields is None:
+                        continue
+                    shared, versions = split_versions(fields)
+                    for number, version in sorted(versions.items()) or [(None, {})]:
+                        merged = {**shared, **version}
+                        row = {"page_name": title}
+                        for key, field in field_map.items():
+                            if key in merged:
+                                row[field] = _typed(merged[key])
+                        if number is not None:
+                            labels.setdefault(number, merged.get("version") or str(number))
+                            row["version_anchor"] = labels[number]
+                        if "id" in merged:
+                            row["item_id"] = [part.strip() for part in merged["id"].split(",")]
+                        rows[bucket].append(row)
+            self._bucket_rows = rows
+        return self._bucket_rows
+
+    def bucket(self, params):
+        match = BUCKET_QUERY.fullmatch(params.get("query", ""))
+        if not match or match.group(1) not in self.bucket_rows():
+            return {"error": {"code": "bucket", "info": "unsupported stub bucket query"}}
+        name, select, limit, offset = match.group(1), match.group(2), int(match.group(3)), int(match.group(4))
+        fields = [field.strip().strip("'") for field in select.split(",")]
+        rows = self.bucket_rows()[name][offset:offset + limit]
+        return {"bucket": [{field: row[field] for field in fields if field in row} for row in rows]}
+
+    def handle_api(self, params):
+        if params.get("action") == "bucket":
+            return self.bucket(params)
+        if params.get("list") == "categorymembers":
+            return self.category_members(params)
+        if params.get("generator") == "categorymembers":
+            return self.generated_pages(params)
+        if params.get("list") == "recentchanges":
+            return self.recent_changes(params)
+        if "revisions" in params.get("prop", ""):
+            return self.page_query(params)
+        if params.get("prop") == "categories":
+            return self.page_categories(params)
+        return {"error": {"code": "badvalue", "info": "unsupported stub query"}}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                if url.path.startswith("/images/thumb/"):
+                    self.send_thumb(url.path.rsplit("/", 1)[-1].split(".")[0])
+                    return
+                if url.path != "/api.php":
+                    self.send_error(404)
+                    return
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    status = 503 if stub.transient_errors else 200
+                    stub.transient_errors -= bool(stub.transient_errors)
+                    lagged = status == 200 and stub.lagged_requests > 0
+                    stub.lagged_requests -= lagged
+                if lagged:
+                    data = {"error": {"code": "maxlag", "info": "Waiting for a database server: 6 seconds lagged."}}
+                else:
+                    data = stub.handle_api(params) if status == 200 else {}
+                body = json.dumps(data).encode("utf-8")
+                with stub._lock:
+                    stub.api_bytes += len(body)
+                self.send_response(status)
+                if status != 200 or lagged:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_thumb(self, name):
+                with stub._lock:
+                    stub.thumb_requests += 1
+                body = make_png(int(name) if name.isdigit() else len(name))
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stub OSRS wiki api.php on localhost.")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--corpus", action="store_true",
+                        help="serve realistic synthetic item pages from corpus.py instead of identical stubs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        from corpus import generate_corpus
+        pages = generate_corpus(args.pages, args.seed)
+    else:
+        pages = {f"Stub item {i}": make_page(i, f"Stub item {i}", thumb=i % 20) for i in range(1, args.pages + 1)}
+    stub = StubWiki(pages, latency=args.latency, port=args.port)
+    print(f"Serving {len(pages)} pages at {stub.api_url} (set OSRS_WIKI_API_URL to use it).")
+    stub.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
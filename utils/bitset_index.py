@@ -0,0 +1,159 @@
+import argparse
+import base64
+import os
+import time
+
+from build_frontend import load_items, ui_slot
+
+# weapon attack speed in game ticks
+SPEED_BUCKETS = [('fastest', 1, 3), ('fast', 4, 4), ('average', 5, 5), ('slow', 6, 6), ('slowest', 7, 99)]
+
+
+def speed_bucket(ticks):
+    for name, low, high in SPEED_BUCKETS:
+        if low <= ticks <= high:
+            return name
+    return None
+
+
+def item_keys(item):
+    # the attributes a roll pool can be filtered on: flags are bare keys, everything else is "attribute:value"
+    keys = [flag for flag in ('members', 'tradeable', 'quest_item') if item.get(flag)]
+    slot = item['equipment']['slot']
+    keys.append(f"slot:{slot}")
+    weapon = item.get('weapon')
+    if weapon and ui_slot(item) == 'weapon':
+        if weapon.get('weapon_type'):
+            keys.append(f"weapon_type:{weapon['weapon_type'].replace(' ', '_')}")
+        bucket = speed_bucket(weapon.get('attack_speed') or 0)
+        if bucket:
+            keys.append(f"speed:{bucket}")
+    return keys
+
+
+def _pack(rows, row_count):
+    packed = bytearray((row_count + 7) // 8)
+    for row in rows:
+        packed[row >> 3] |= 1 << (row & 7)
+    return packed
+
+
+class BitsetIndex:
+    # every rollable item is a row, in id order; each key is a Python int with bit n set when row n has it,
+    # so filters are plain &, | and ~ over a few hundred machine words instead of a scan of the item dicts
+    def __init__(self, item_database):
+        self.items = []
+        self.slots = []
+        self.row_keys = []
+        rows = {}
+        for item_id in sorted(item_database, key=int):
+            item = item_database[item_id]
+            slot = ui_slot(item)
+            if not slot:
+                continue
+            keys = item_keys(item)
+            for key in keys:
+                rows.setdefault(key, []).append(len(self.items))
+            self.items.append(item)
+            self.slots.append(slot)
+            self.row_keys.append(keys)
+        self.all = (1 << len(self.items)) - 1
+        self.bits = {key: int.from_bytes(_pack(key_rows, len(self.items)), 'little') for key, key_rows in rows.items()}
+        # pools by the frontend's slots, so the weapon pool includes 2h weapons
+        self.pools = {}
+        for row, slot in enumerate(self.slots):
+            self.pools.setdefault(slot, []).append(row)
+        self.pool_bits = {slot: int.from_bytes(_pack(pool_rows, len(self.items)), 'little')
+                          for slot, pool_rows in self.pools.items()}
+
+    def get(self, key):
+        # an unknown key matches nothing rather than failing, like a value no item has
+        return self.bits.get(key, 0)
+
+    def invert(self, bits):
+        return self.all & ~bits
+
+    def all_of(self, *keys):
+        bits = self.all
+        for key in keys:
+            bits &= self.get(key)
+        return bits
+
+    def any_of(self, *keys):
+        bits = 0
+        for key in keys:
+            bits |= self.get(key)
+        return bits
+
+    def query(self, text):
+        # space-separated terms are ANDed, "a|b" is an OR within a term and a leading "!" negates a term,
+        # e.g. "tradeable !members !quest_item speed:fast|speed:fastest"
+        bits = self.all
+        for term in text.split():
+            negate = term.startswith('!')
+            term_bits = self.any_of(*term.lstrip('!').split('|'))
+            bits &= self.invert(term_bits) if negate else term_bits
+        return bits
+
+    def rows(self, bits):
+        # set bits in ascending order: lowest set bit, clear it, repeat
+        rows = []
+        while bits:
+            low = bits & -bits
+            rows.append(low.bit_length() - 1)
+            bits ^= low
+        return rows
+
+    def select(self, bits, slot=None):
+        if slot is not None:
+            bits &= self.pool_bits.get(slot, 0)
+        return [self.items[row] for row in self.rows(bits)]
+
+    def filtered_database(self, bits):
+        # {id: item} in the shape Randomizer and BuildSimulator load, so either can roll a filtered pool
+        return {str(item['id']): item for item in self.select(bits)}
+
+    def export(self):
+        # per frontend slot, each key as a little-endian bitset over that slot bundle's items, base64-encoded,
+        # so the browser can filter categorizedItems[slot] without the attributes in the bundles
+        slots = {}
+        for slot, pool_rows in self.pools.items():
+            rows = {}
+            for position, row in enumerate(pool_rows):
+                for key in self.row_keys[row]:
+                    rows.setdefault(key, []).append(position)
+            slots[slot] = {
+                'count': len(pool_rows),
+                'keys': {key: base64.b64encode(_pack(key_rows, len(pool_rows))).decode('ascii')
+                         for key, key_rows in sorted(rows.items())},
+            }
+        return {'version': 1, 'slots': slots}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter the roll pools of database/items.json through the bitset index.")
+    parser.add_argument("query", nargs="?", default="",
+                        help='e.g. "tradeable !members slot:2h|weapon_type:stab_sword"; empty lists the keys')
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    args = parser.parse_args()
+
+    item_database = load_items(args.input)
+    start = time.perf_counter()
+    index = BitsetIndex(item_database)
+    print(f"Indexed {len(index.items)} rollable items under {len(index.bits)} keys in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms.")
+    if not args.query:
+        for key in sorted(index.bits):
+            print(f"{key:<32} {bin(index.bits[key]).count('1'):>6}")
+        return
+
+    start = time.perf_counter()
+    bits = index.query(args.query)
+    elapsed = time.perf_counter() - start
+    print(f"'{args.query}' matches {bin(bits).count('1')} items ({elapsed * 1e6:.0f} us):")
+    for slot, pool in index.pool_bits.items():
+        print(f"{slot:<8} {bin(bits & pool).count('1'):>6} of {bin(pool).count('1'):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+
+# the only stats script.js reads; zero values are dropped since the UI treats a missing stat as 0
+STAT_KEYS = [
+    'attack_stab', 'attack_slash', 'attack_crush', 'attack_magic', 'attack_ranged',
+    'defence_stab', 'defence_slash', 'defence_crush', 'defence_magic', 'defence_ranged',
+    'melee_strength', 'ranged_strength', 'magic_damage', 'prayer'
+]
+
+
+def load_items(filepath):
+    print(f"Loading items from '{filepath}'.")
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ui_slot(item):
+    # mirrors the categorization script.js used to do on page load: 2h weapons roll in the weapon slot
+    if not item.get('equipable_by_player') or not item.get('equipment'):
+        return None
+    slot = item['equipment'].get('slot')
+    if not slot or slot == 'null':
+        return None
+    return 'weapon' if slot == '2h' else slot
+
+
+def ui_record(item, atlas_index=None):
+    equipment = {key: item['equipment'][key] for key in STAT_KEYS if item['equipment'].get(key)}
+    equipment['slot'] = item['equipment']['slot']
+    record = {'name': item['name'], 'equipment': equipment}
+    sprite_no = atlas_index['items'].get(str(item['id'])) if atlas_index else None
+    if sprite_no is not None:
+        # [atlas, x, y, w, h] into the sprite sheets listed in the manifest
+        record['sprite'] = atlas_index['sprites'][sprite_no]
+    elif item.get('icon'):
+        record['icon'] = item['icon']
+    return record
+
+
+def categorize(item_database, atlas_index=None):
+    slots = {}
+    for item_id in sorted(item_database, key=int):
+        item = item_database[item_id]
+        slot = ui_slot(item)
+        if slot:
+            slots.setdefault(slot, []).append(ui_record(item, atlas_index))
+    return slots
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def write_bundles(slots, output_dir, atlas_index=None, atlas_dir=None, filters=None):
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {'version': 1, 'slots': {}}
+    if atlas_index:
+        manifest['atlases'] = [
+            {'file': name, 'hash': _file_hash(os.path.join(atlas_dir, name))} for name in atlas_index['atlases']
+        ]
+    for slot in sorted(slots):
+        payload = json.dumps(slots[slot], separators=(',', ':')).encode('utf-8')
+        filename = f"{slot}.json"
+        tmp_path = os.path.join(output_dir, f".{filename}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, os.path.join(output_dir, filename))
+        manifest['slots'][slot] = {
+            'file': filename,
+            'count': len(slots[slot]),
+            'bytes': len(payload),
+            # the frontend appends this as ?v= so CDNs can cache each file until it changes
+            'hash': hashlib.sha256(payload).hexdigest()[:12],
+        }
+
+    if filters is not None:
+        payload = json.dumps(filters, separators=(',', ':')).encode('utf-8')
+        tmp_path = os.path.join(output_dir, ".filters.json.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, os.path.join(output_dir, "filters.json"))
+        manifest['filters'] = {'file': "filters.json", 'bytes': len(payload), 'hash': hashlib.sha256(payload).hexdigest()[:12]}
+
+    # the manifest goes last, so it never points at a bundle that has not been written yet
+    tmp_path = os.path.join(output_dir, ".manifest.json.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, os.path.join(output_dir, "manifest.json"))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-slot frontend bundles from database/items.json.")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--output-dir", default=os.path.join("database", "slots"))
+    parser.add_argument("--atlas-dir", default=os.path.join("database", "icons"),
+                        help="sprite atlases from sprite_atlas.py; used instead of inline icons when present")
+    parser.add_argument("--no-filters", action="store_true",
+                        help="skip filters.json, the attribute bitsets over each slot bundle")
+    args = parser.parse_args()
+    # bitset_index builds on ui_slot from this module
+    from bitset_index import BitsetIndex
+
+    item_database = load_items(args.input)
+    atlas_index = None
+    try:
+        with open(os.path.join(args.atlas_dir, "index.json"), 'r', encoding='utf-8') as f:
+            atlas_index = json.load(f)
+        print(f"Using sprite atlas index from '{args.atlas_dir}'.")
+    except FileNotFoundError:
+        pass
+    slots = categorize(item_database, atlas_index)
+    filters = None if args.no_filters else BitsetIndex(item_database).export()
+    manifest = write_bundles(slots, args.output_dir, atlas_index, args.atlas_dir, filters)
+
+    total_bytes = sum(entry['bytes'] for entry in manifest['slots'].values())
+    source_bytes = os.path.getsize(args.input)
+    for slot, entry in manifest['slots'].items():
+        print(f"{slot:<8} {entry['count']:>6} items {entry['bytes'] / 1024:>9.1f} KB")
+    if 'filters' in manifest:
+        print(f"filters  {manifest['filters']['bytes'] / 1024:>16.1f} KB")
+    print(f"Wrote {len(manifest['slots'])} slot bundles to '{args.output_dir}': "
+          f"{total_bytes / 1024:.1f} KB total vs {source_bytes / 1024:.1f} KB for the full items file.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from build_frontend import STAT_KEYS, load_items
+from randomizer import SLOTS, AliasTable, build_pools, is_two_handed, weight_function
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+CHUNK_SIZE = 100_000
+
+
+class SlotMatrix:
+    # one slot's pool as an items x STAT_KEYS matrix, with its alias table as arrays so draws are vectorized
+    def __init__(self, items, weights):
+        self.stats = np.array([[int(item['equipment'].get(key) or 0) for key in STAT_KEYS] for item in items],
+                              dtype=np.int32).reshape(len(items), len(STAT_KEYS))
+        self.two_handed = np.array([is_two_handed(item) for item in items], dtype=bool)
+        table = AliasTable(weights)
+        self.prob = np.array(table.prob)
+        self.alias = np.array(table.alias, dtype=np.intp)
+
+    def draw(self, rng, count):
+        u = rng.random(count) * len(self.prob)
+        # rounding can push u up to the pool size itself
+        column = np.minimum(u.astype(np.intp), len(self.prob) - 1)
+        return np.where(u - column < self.prob[column], column, self.alias[column])
+
+
+class StatHistograms:
+    # build totals are integers within bounds known up front, so each stat is a fixed-size count per value:
+    # memory doesn't grow with the number of builds, chunks merge by addition, and percentiles are exact
+    def __init__(self, low, high):
+        self.low = low
+        self.counts = [np.zeros(int(hi - lo) + 1, dtype=np.int64) for lo, hi in zip(low, high)]
+        self.count = 0
+
+    def add(self, totals):
+        for k, lo in enumerate(self.low):
+            self.counts[k] += np.bincount(totals[:, k] - lo, minlength=len(self.counts[k]))
+        self.count += len(totals)
+
+    def merge(self, other):
+        for k in range(len(self.counts)):
+            self.counts[k] += other.counts[k]
+        self.count += other.count
+
+    def _values(self, key):
+        k = STAT_KEYS.index(key)
+        return k, np.arange(len(self.counts[k])) + self.low[k]
+
+    def mean(self, key):
+        # with no builds every statistic is 0, the total of an empty build
+        if not self.count:
+            return 0.0
+        k, values = self._values(key)
+        return float((self.counts[k] * values).sum() / self.count)
+
+    def percentile(self, key, p):
+        # the smallest total that at least p% of the builds are at or below
+        if not self.count:
+            return 0
+        k, values = self._values(key)
+        rank = max(1, int(np.ceil(p / 100 * self.count)))
+        return int(values[np.searchsorted(np.cumsum(self.counts[k]), rank)])
+
+    def minimum(self, key):
+        if not self.count:
+            return 0
+        k, values = self._values(key)
+        return int(values[np.flatnonzero(self.counts[k])[0]])
+
+    def maximum(self, key):
+        if not self.count:
+            return 0
+        k, values = self._values(key)
+        return int(values[np.flatnonzero(self.counts[k])[-1]])
+
+
+class BuildSimulator:
+    # bulk version of Randomizer.roll_build and build_totals: draws whole chunks of builds as index arrays
+    def __init__(self, item_database, weight='uniform'):
+        weigh = weight_function(weight)
+        self.slots = {}
+        for slot, items in build_pools(item_database).items():
+            weighted = [(item, weigh(item)) for item in items]
+            weighted = [(item, w) for item, w in weighted if w > 0]
+            if weighted:
+                self.slots[slot] = SlotMatrix([item for item, _ in weighted], [w for _, w in weighted])
+        # weapon comes before shield, which the 2h exclusion relies on
+        self.slot_names = [slot for slot in SLOTS if slot in self.slots]
+        # an empty slot adds 0, so the bounds always include it; with no pools at all every total is 0
+        zeros = np.zeros(len(STAT_KEYS), dtype=np.int64)
+        self.low = sum((np.minimum(m.stats.min(axis=0), 0).astype(np.int64) for m in self.slots.values()), zeros)
+        self.high = sum((np.maximum(m.stats.max(axis=0), 0).astype(np.int64) for m in self.slots.values()), zeros)
+
+    def totals(self, rng, count, roll_limit=None):
+        # (count, STAT_KEYS) summed bonuses. With a roll limit, the rolls land on slots uniformly at random and
+        # a slot nobody rolled stays empty; a slot's last roll is just another independent draw
+        totals = np.zeros((count, len(STAT_KEYS)), dtype=np.int64)
+        if roll_limit is None or not self.slot_names:
+            filled = np.ones((count, len(self.slot_names)), dtype=bool)
+        else:
+            shares = np.full(len(self.slot_names), 1 / len(self.slot_names))
+            filled = rng.multinomial(roll_limit, shares, size=count) > 0
+        weapon_2h = np.zeros(count, dtype=bool)
+        for slot_no, slot in enumerate(self.slot_names):
+            matrix = self.slots[slot]
+            picks = matrix.draw(rng, count)
+            mask = filled[:, slot_no]
+            if slot == 'weapon':
+                weapon_2h = matrix.two_handed[picks] & mask
+            elif slot == 'shield':
+                mask = mask & ~weapon_2h
+            totals += matrix.stats[picks] * mask[:, None]
+        return totals
+
+    def best_totals(self, rng, count, roll_limit=None, best_of=1, objective='melee_strength'):
+        # each of the count results is the best of best_of builds by the objective stat
+        totals = self.totals(rng, count * best_of, roll_limit)
+        if best_of == 1:
+            return totals
+        groups = totals.reshape(count, best_of, len(STAT_KEYS))
+        best = groups[:, :, STAT_KEYS.index(objective)].argmax(axis=1)
+        return groups[np.arange(count), best]
+
+    def run(self, builds, roll_limit=None, best_of=1, objective='melee_strength', seed=None,
+            chunk_size=CHUNK_SIZE, workers=1):
+        # chunk_size counts draws, best_of of them per result, so memory stays bounded for any best_of. Chunk
+        # seeds come from one SeedSequence, so results depend on the seed and chunk size, not on workers
+        if objective not in STAT_KEYS:
+            raise ValueError(f"unknown stat '{objective}'")
+        if builds < 0 or (roll_limit is not None and roll_limit < 0):
+            raise ValueError("the number of builds and the roll limit can't be negative")
+        if best_of < 1 or chunk_size < 1:
+            raise ValueError("best of and chunk size must be at least 1")
+        per_chunk = max(1, chunk_size // best_of)
+        sizes = [min(per_chunk, builds - start) for start in range(0, builds, per_chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        jobs = [(size, chunk_seed, roll_limit, best_of, objective) for size, chunk_seed in zip(sizes, seeds)]
+        histograms = StatHistograms(self.low, self.high)
+        if workers == 1 or len(jobs) == 1:
+            _init_worker(self)
+            for job in jobs:
+                histograms.merge(_run_chunk(job))
+        else:
+            with multiprocessing.Pool(workers or None, initializer=_init_worker, initargs=(self,)) as pool:
+                for chunk in pool.imap_unordered(_run_chunk, jobs):
+                    histograms.merge(chunk)
+        return histograms
+
+
+_worker_simulator = None
+
+
+def _init_worker(simulator):
+    global _worker_simulator
+    _worker_simulator = simulator
+
+
+def _run_chunk(job):
+    size, chunk_seed, roll_limit, best_of, objective = job
+    simulator = _worker_simulator
+    histograms = StatHistograms(simulator.low, simulator.high)
+    histograms.add(simulator.best_totals(np.random.default_rng(chunk_seed), size, roll_limit, best_of, objective))
+    return histograms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate random builds in bulk and report their stat totals.")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--builds", type=int, default=1_000_000)
+    parser.add_argument("--roll-limit", type=int, default=None,
+                        help="rolls per build, spread over random slots (default: every slot rolled once)")
+    parser.add_argument("--best-of", type=int, default=1, help="keep the best of this many builds by --objective")
+    parser.add_argument("--objective", default="melee_strength", choices=STAT_KEYS)
+    parser.add_argument("--weight", default="uniform", help="a randomizer weighting, e.g. value or stat:prayer")
+    parser.add_argument("--stats", nargs="+", default=STAT_KEYS, choices=STAT_KEYS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="builds drawn at once, counting each of a --best-of group; bounds memory use")
+    parser.add_argument("--workers", type=int, default=1, help="processes to spread the chunks over (0: one per core)")
+    args = parser.parse_args()
+
+    try:
+        simulator = BuildSimulator(load_items(args.input), args.weight)
+        start = time.perf_counter()
+        histograms = simulator.run(args.builds, args.roll_limit, args.best_of, args.objective, args.seed,
+                                   args.chunk_size, args.workers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    elapsed = time.perf_counter() - start
+
+    limit = f"{args.roll_limit}-roll limit" if args.roll_limit is not None else "every slot rolled"
+    best = f", best of {args.best_of} by {args.objective}" if args.best_of > 1 else ""
+    print(f"{histograms.count} builds ({limit}{best}) in {elapsed:.2f} s")
+    print(f"{'stat':<16} {'mean':>8} {'min':>6} " + " ".join(f"{'p' + str(p):>6}" for p in PERCENTILES) + f" {'max':>6}")
+    for key in args.stats:
+        print(f"{key:<16} {histograms.mean(key):>8.2f} {histograms.minimum(key):>6} "
+              + " ".join(f"{histograms.percentile(key, p):>6}" for p in PERCENTILES) + f" {histograms.maximum(key):>6}")
+
+
+if __name__ == "__main__":
+    main()
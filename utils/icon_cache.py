@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from run_metrics import metrics
+
+# wiki thumbnail urls carry a cache-busting hash, so a known url is only revalidated once it is this old
+REVALIDATE_AFTER = 30 * 24 * 3600
+
+
+class IconCache:
+    # blobs/<sha256>.png holds each distinct image once; index.json maps url -> sha256 plus validators
+    def __init__(self, session, cache_dir=os.path.join(".cache", "icons"), revalidate_after=REVALIDATE_AFTER, offline=False):
+        self.session = session
+        self.offline = offline
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.revalidate_after = revalidate_after
+        self.downloads = 0
+        self.revalidations = 0
+        self._b64_by_hash = {}
+        # urls some prefetch is already downloading, so concurrent prefetches don't fetch them twice
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, f"{digest}.png")
+
+    def _is_fresh(self, entry):
+        if not entry or not os.path.exists(self._blob_path(entry["sha256"])):
+            return False
+        if self.offline:
+            return True
+        return time.time() - entry.get("checked", 0) < self.revalidate_after
+
+    def _store(self, url, content, response):
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, blob_path)
+        with self._lock:
+            self.index[url] = {
+                "sha256": digest,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked": time.time(),
+            }
+
+    def _fetch(self, url):
+        if self.offline:
+            return
+        with self._lock:
+            entry = self.index.get(url)
+        headers = {}
+        if entry and os.path.exists(self._blob_path(entry["sha256"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = self.session.get(url, headers=headers)
+            if response.status_code == 304:
+                with self._lock:
+                    entry["checked"] = time.time()
+                    self.revalidations += 1
+                return
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            return
+        with self._lock:
+            self.downloads += 1
+        self._store(url, response.content, response)
+
+    def prefetch(self, urls, concurrency=8):
+        with metrics.stage("icon_fetch"):
+            self._prefetch(urls, concurrency)
+
+    def _prefetch(self, urls, concurrency):
+        with self._lock:
+            stale = {url for url in urls if url and url not in self._in_flight and not self._is_fresh(self.index.get(url))}
+            self._in_flight |= stale
+        if not stale:
+            return
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(self._fetch, stale))
+        finally:
+            with self._lock:
+                self._in_flight -= stale
+
+    def get_b64(self, url):
+        if not url:
+            return None
+        with metrics.stage("icon_fetch"):
+            return self._get_b64(url)
+
+    def _get_b64(self, url):
+        with self._lock:
+            entry = self.index.get(url)
+        if not self._is_fresh(entry):
+            self._fetch(url)
+            with self._lock:
+                entry = self.index.get(url)
+            if not entry:
+                return None
+        digest = entry["sha256"]
+        # identical thumbnails (charge/dose variants) share one encoded string
+        icon_b64 = self._b64_by_hash.get(digest)
+        if icon_b64 is None:
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    icon_b64 = base64.b64encode(f.read()).decode('utf-8')
+            except FileNotFoundError:
+                return None
+            self._b64_by_hash[digest] = icon_b64
+        return icon_b64
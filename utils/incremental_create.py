@@ -1,18 +1,18 @@
+import argparse
 import requests
-import json
 import re
 import time
 
-def get_base_json(url):
-    print("Fetching base JSON from GitHub.")
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        print("Successfully fetched base JSON.")
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching base JSON: {e}")
-        return None
+from baseline_cache import load_baseline
+import infobox_parser
+from infobox_parser import extract_infoboxes, failure_reason
+from item_index import ItemIndex
+from item_record import ItemRecord
+from items_writer import write_items
+from name_search import NameSearchIndex
+from page_cache import PageCache, parser_fingerprint
+from run_metrics import add_metrics_args, metrics
+from wiki_fetch import api_get
 
 def get_session():
     session = requests.Session()
@@ -21,12 +21,11 @@ def get_session():
         'User-Agent': 'OSRS-Item-DB-Updater/1.0 (https://github.com/osrsbox/osrsbox-db; contact: your_username_or_email)'
     }
     session.headers.update(headers)
-    return session
+    return metrics.watch(session)
 
 def get_wiki_itm_tls(session):
     print("Fetching all item titles from the OSRS Wiki...")
     all_titles = set()
-    api_url = "https://oldschool.runescape.wiki/api.php"
     params = {
         "action": "query",
         "format": "json",
@@ -39,9 +38,8 @@ def get_wiki_itm_tls(session):
         try:
             req_params = params.copy()
             req_params.update(last_continue)
-            response = session.get(url=api_url, params=req_params)
-            response.raise_for_status()
-            data = response.json()
+            with metrics.stage("titles"):
+                data = api_get(session, req_params)
 
             if "query" not in data or "categorymembers" not in data["query"]:
                 print(f"Unexpected API response: {data}")
@@ -67,20 +65,21 @@ def get_wikitext(page_title, session):
     params = {
         "action": "query",
         "prop": "revisions",
-        "rvprop": "content",
+        "rvprop": "content|timestamp|ids",
         "format": "json",
         "titles": page_title
     }
     try:
-        response = session.get("https://oldschool.runescape.wiki/api.php", params=params)
-        response.raise_for_status()
-        data = response.json()
+        with metrics.stage("content_fetch"):
+            data = api_get(session, params)
         pages = data["query"]["pages"]
         page_id = next(iter(pages))
         if 'revisions' not in pages[page_id]:
+            metrics.incr("pages_missing")
             return None
-        content = pages[page_id]["revisions"][0]["*"]
-        return content
+        revision = pages[page_id]["revisions"][0]
+        metrics.incr("pages_fetched")
+        return {"content": revision["*"], "timestamp": revision["timestamp"], "revid": revision.get("revid")}
     except (KeyError, IndexError, requests.exceptions.RequestException) as e:
         print(f"Could not fetch wikitext for '{page_title}': {e}")
         return None
@@ -98,22 +97,10 @@ def _to_float(value, default=0.0):
         return default
 
 def parse_infobox(wikitext, item_name):
-    match = re.search(r'\{\{Infobox Item\s*\|([\s\S]+?)\}\}', wikitext, re.IGNORECASE)
-    if not match:
+    item_data, _ = extract_infoboxes(wikitext)
+    if item_data is None:
         return None
 
-    content = match.group(1)
-    item_data = {}
-    params = re.findall(r'\|\s*([^=]+?)\s*=\s*((?:.|\n)*?)(?=\n\s*\||\n\}\})', content)
-
-    for key, value in params:
-        key = key.strip().lower()
-        value = value.strip()
-        value = re.sub(r'\[\[(?:[^|]+\|)?([^\]]+)\]\]', r'\1', value)
-        value = re.sub(r'<[^>]+>', '', value)
-        value = re.sub(r'\{\{[^}]+\}\}', '', value)
-        item_data[key] = value
-
     try:
         item_id = int(item_data.get('id', '0'))
         if item_id == 0:
@@ -158,22 +145,45 @@ def parse_infobox(wikitext, item_name):
     return formatted_item
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Add wiki items missing from the OSRSBox baseline into items-delta.json.")
+    parser.add_argument("--offline", action="store_true",
+                        help="re-run from the local page cache only, without touching the wiki")
+    parser.add_argument("--compact", action="store_true",
+                        help="write the output JSON without indentation")
+    add_metrics_args(parser)
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    metrics.start("incremental_create", args.metrics_dir, args.profile)
     api_url = 'https://raw.githubusercontent.com/osrsbox/osrsbox-db/master/docs/items-complete.json'
 
-    base_data = get_base_json(api_url)
-    if base_data is None:
-        return
+    with metrics.stage("load"):
+        base_data = load_baseline(api_url, offline=args.offline, as_records=True)
+        if base_data is None:
+            return
 
-    existing_item_names = {item['name'] for item in base_data.values()}
-    print(f"Loaded {len(existing_item_names)} items from the base JSON.")
+        item_index = ItemIndex.build(base_data)
+        name_index = NameSearchIndex.build(item_index)
+    print(f"Loaded {len(item_index.names())} items from the base JSON.")
+    item_index.report()
 
     wiki_session = get_session()
-    wiki_titles = get_wiki_itm_tls(wiki_session)
-    if wiki_titles is None:
-        return
-
-    new_item_titles = sorted(list(wiki_titles - existing_item_names))
+    page_cache = PageCache()
+    parser_version = parser_fingerprint(infobox_parser, parse_infobox, _to_int, _to_float)
+
+    if args.offline:
+        wiki_titles = page_cache.load_titles()
+        print(f"Offline: using {len(wiki_titles)} cached item titles.")
+    else:
+        wiki_titles = get_wiki_itm_tls(wiki_session)
+        if wiki_titles is None:
+            return
+        page_cache.save_titles(wiki_titles)
+
+    new_item_titles = sorted(t for t in wiki_titles if item_index.resolve(t) is None)
     print(f"Found {len(new_item_titles)} new items to add.")
 
     if not new_item_titles:
@@ -187,23 +197,45 @@ def main():
             continue
 
         print(f"Processing ({i+1}/{len(new_item_titles)}): {title}", end='\r')
-        wikitext = get_wikitext(title, wiki_session)
-        if wikitext:
-            parsed_item = parse_infobox(wikitext, title)
+        if args.offline:
+            with metrics.stage("content_fetch"):
+                page = page_cache.get_pages([title]).get(title)
+        else:
+            page = get_wikitext(title, wiki_session)
+            if page:
+                page_cache.store_pages({title: page})
+        if page:
+            metrics.incr("pages_processed")
+            wikitext = page["content"]
+            with metrics.stage("parse"):
+                parsed_item = page_cache.parse(title, wikitext, parser_version, lambda: parse_infobox(wikitext, title))
             if parsed_item:
-                item_id = str(parsed_item['id'])
-                if item_id not in base_data:
-                    base_data[item_id] = parsed_item
-                    new_items_added += 1
-        time.sleep(0.05) # negating abusing osrs wiki
+                with metrics.stage("merge"):
+                    parsed_item['last_updated'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+                    item_id = str(parsed_item['id'])
+                    if item_id not in item_index:
+                        base_data[item_id] = ItemRecord.from_dict(parsed_item)
+                        new_items_added += 1
+                        for other_id in item_index.add(item_id, parsed_item):
+                            print(f"\nWarning: '{title}' ({item_id}) differs only in spelling from '{item_index.by_id[other_id][0]}' ({other_id}).")
+                        name_index.add(item_id, parsed_item)
+            else:
+                metrics.incr("parse_failures", reason=failure_reason(wikitext))
+        if not args.offline:
+            time.sleep(0.05) # negating abusing osrs wiki
 
+    page_cache.close()
     print(f"\nSuccessfully parsed and added {new_items_added} new items.")
+    name_index.report()
+    metrics.incr("items_added", new_items_added)
+    metrics.incr("near_duplicates", len(name_index.flagged))
 
     output_filename = 'items-delta.json'
     print(f"Saving combined data to '{output_filename}'...")
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        sorted_data = {k: v for k, v in sorted(base_data.items(), key=lambda item: int(item[0]))}
-        json.dump(sorted_data, f, indent=4)
+    with metrics.stage("write"):
+        write_items(output_filename, base_data, compact=args.compact)
+        item_index.save(output_filename)
+        name_index.save(output_filename)
 
     print("Process complete!")
 
@@ -0,0 +1,208 @@
+import re
+
+# one pattern finds both infobox headers; the body ends at the first '}}' after the header,
+# exactly like the old per-template r'\{\{Infobox X\s*\|([\s\S]+?)\}\}' searches
+INFOBOX_HEADER = re.compile(r'\{\{Infobox (Item|Bonuses)\s*\|', re.IGNORECASE)
+WIKI_LINK = re.compile(r'\[\[(?:[^|]+\|)?([^\]]+)\]\]')
+HTML_TAG = re.compile(r'<[^>]+>')
+TEMPLATE = re.compile(r'\{\{[^}]*?\}\}')
+NON_INT_CHARS = re.compile(r'[^0-9-]')
+# switch infoboxes number their per-version parameters: version1, id1, name2, astab2...
+VERSIONED_KEY = re.compile(r'(.*?[a-z_])(\d+)')
+
+STAT_MAP = {
+    'astab': 'attack_stab', 'aslash': 'attack_slash', 'acrush': 'attack_crush',
+    'amagic': 'attack_magic', 'arange': 'attack_ranged', 'dstab': 'defence_stab',
+    'dslash': 'defence_slash', 'dcrush': 'defence_crush', 'dmagic': 'defence_magic',
+    'drange': 'defence_ranged', 'str': 'melee_strength', 'rstr': 'ranged_strength',
+    'mdmg': 'magic_damage', 'prayer': 'prayer'
+}
+
+
+def _to_int(value, default=0):
+    if type(value) is int:
+        return value
+    value = str(value)
+    if value.isascii() and value.isdigit():
+        return int(value)
+    try:
+        return int(NON_INT_CHARS.sub('', value))
+    except (ValueError, TypeError):
+        return default
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def clean_value(value):
+    value = value.strip()
+    if '[[' in value:
+        value = WIKI_LINK.sub(r'\1', value)
+    if '<' in value:
+        value = HTML_TAG.sub('', value)
+    if '{{' in value:
+        value = TEMPLATE.sub('', value)
+    return value.strip()
+
+
+def _split_fields(body, clean):
+    fields = {}
+    for line in body.split('\n|'):
+        key, sep, value = line.partition('=')
+        if not sep:
+            continue
+        fields[key.strip().lower()] = clean_value(value) if clean else value.strip()
+    return fields
+
+
+def extract_infoboxes(wikitext):
+    # single scan for the first {{Infobox Item}} and first {{Infobox Bonuses}} on the page
+    bodies = {}
+    pos = 0
+    while len(bodies) < 2:
+        header = INFOBOX_HEADER.search(wikitext, pos)
+        if not header:
+            break
+        kind = header.group(1).lower()
+        body_start = header.end()
+        # resume right after the header, not the body, so a template opened inside an unclosed
+        # body is still found the way an independent search would find it
+        pos = header.start() + 1
+        if kind in bodies:
+            continue
+        body_end = wikitext.find('}}', body_start + 1)
+        if body_end == -1:
+            continue
+        bodies[kind] = wikitext[body_start:body_end]
+
+    item_fields = _split_fields(bodies['item'], clean=True) if 'item' in bodies else None
+    bonus_fields = _split_fields(bodies['bonuses'], clean=False) if 'bonuses' in bodies else None
+    return item_fields, bonus_fields
+
+
+def build_equipment_and_weapon(bonus_data, fold_2h=True):
+    equipment = {}
+    weapon = {}
+    if bonus_data is None:
+        return equipment, weapon
+
+    for wiki_key, osrsbox_key in STAT_MAP.items():
+        equipment[osrsbox_key] = _to_int(bonus_data.get(wiki_key, 0))
+
+    slot = bonus_data.get('slot', 'not equipable').lower()
+    if fold_2h and '2h' in slot:
+        equipment['slot'] = '2h'
+    else:
+        equipment['slot'] = slot
+
+    weapon['attack_speed'] = _to_int(bonus_data.get('aspeed', 0))
+    weapon['weapon_type'] = bonus_data.get('wtype', 'unarmed').lower()
+    weapon['stances'] = []
+    return equipment, weapon
+
+
+def build_item(item_data, equipment, weapon, item_name, last_updated_iso, icon_b64, wiki_name=None):
+    item_id = _to_int(item_data.get('id', '0'))
+    if item_id == 0:
+        return None
+
+    tradeable = 'yes' in item_data.get('tradeable', 'yes').lower()
+    noteable = 'yes' in item_data.get('noteable', 'no').lower()
+    equipable = item_data.get('equipable', 'no').lower() == 'yes'
+    wiki_name = (wiki_name or item_name).replace(' ', '_')
+    return {
+        'id': item_id, 'name': item_name, 'last_updated': last_updated_iso,
+        'incomplete': False, 'members': item_data.get('members', 'no').lower() == 'yes',
+        'tradeable': tradeable,
+        'tradeable_on_ge': tradeable,
+        'stackable': item_data.get('stackable', 'no').lower() == 'yes',
+        'stacked': None, 'noted': noteable,
+        'noteable': noteable,
+        'linked_id_item': None, 'linked_id_noted': None, 'linked_id_placeholder': None,
+        'placeholder': False, 'equipable': equipable,
+        'equipable_by_player': equipable,
+        'equipable_weapon': 'weapon' in item_data.get('slayercat', ''),
+        'cost': _to_int(item_data.get('value', '0')),
+        'lowalch': _to_int(item_data.get('lowalch', '0')),
+        'highalch': _to_int(item_data.get('highalch', '0')),
+        'weight': _to_float(item_data.get('weight', 0.0)),
+        'buy_limit': _to_int(item_data.get('gemw'), default=None) if item_data.get('gemw') else None,
+        'quest_item': item_data.get('quest', 'no').lower() == 'yes',
+        'release_date': item_data.get('release', None),
+        'examine': item_data.get('examine', ''),
+        'icon': icon_b64,
+        'wiki_name': wiki_name,
+        'wiki_url': f"https://oldschool.runescape.wiki/w/{wiki_name}",
+        'equipment': equipment,
+        'weapon': weapon
+    }
+
+
+def parse_infobox(wikitext, item_name, last_updated_iso, icon_b64, fold_2h=True):
+    item_data, bonus_data = extract_infoboxes(wikitext)
+    if item_data is None:
+        return None
+    if _to_int(item_data.get('id', '0')) == 0:
+        return None
+    equipment, weapon = build_equipment_and_weapon(bonus_data, fold_2h)
+    return build_item(item_data, equipment, weapon, item_name, last_updated_iso, icon_b64)
+
+
+def split_versions(fields):
+    # (shared fields, {version number: {field: value}}); only numbers that carry a version label or an id count
+    shared = {}
+    versions = {}
+    for key, value in fields.items():
+        match = VERSIONED_KEY.fullmatch(key)
+        if match:
+            versions.setdefault(int(match.group(2)), {})[match.group(1)] = value
+        else:
+            shared[key] = value
+    for number in [n for n, version in versions.items() if 'version' not in version and 'id' not in version]:
+        for key, value in versions.pop(number).items():
+            shared[f"{key}{number}"] = value
+    return shared, versions
+
+
+def parse_infobox_versions(wikitext, item_name, last_updated_iso, icon_b64, fold_2h=True):
+    # every version of a switch infobox as its own item, each with its own id, name and versioned bonuses;
+    # a page without versions gives the same single item parse_infobox does. Returns a list, empty for no item
+    item_data, bonus_data = extract_infoboxes(wikitext)
+    if item_data is None:
+        return []
+    shared, versions = split_versions(item_data)
+    if not versions:
+        item = parse_infobox(wikitext, item_name, last_updated_iso, icon_b64, fold_2h)
+        return [item] if item else []
+    bonus_shared, bonus_versions = split_versions(bonus_data) if bonus_data is not None else ({}, {})
+
+    items = []
+    seen_ids = set()
+    for number in sorted(versions):
+        fields = {**shared, **versions[number]}
+        # a version listing several ids (its noted or placeholder forms) is the first of them
+        fields['id'] = fields.get('id', '0').split(',')[0]
+        item_id = _to_int(fields['id'])
+        if item_id == 0 or item_id in seen_ids:
+            continue
+        seen_ids.add(item_id)
+        bonuses = {**bonus_shared, **bonus_versions.get(number, {})} if bonus_data is not None else None
+        equipment, weapon = build_equipment_and_weapon(bonuses, fold_2h)
+        label = fields.get('version') or str(number)
+        items.append(build_item(fields, equipment, weapon, fields.get('name') or item_name, last_updated_iso, icon_b64,
+                                wiki_name=f"{item_name}#{label}"))
+    return items
+
+
+def failure_reason(wikitext):
+    # why parse_infobox found no item on a page, for the run metrics
+    item_data, _ = extract_infoboxes(wikitext)
+    if item_data is None:
+        return 'no_infobox'
+    if not item_data.get('id'):
+        return 'missing_id'
+    return 'invalid_id'
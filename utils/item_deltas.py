@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import os
+
+from item_record import as_dict
+from items_writer import iter_item_chunks, write_items
+
+DELTAS_DIR = os.path.join("database", "deltas")
+MANIFEST_NAME = "manifest.json"
+
+
+def record_hashes(item_database):
+    # one digest per item, cheap enough to keep for the whole database while a run mutates it
+    return {
+        item_id: hashlib.sha1(json.dumps(as_dict(item), sort_keys=True).encode('utf-8')).hexdigest()
+        for item_id, item in item_database.items()
+    }
+
+
+def snapshot_hash(item_database):
+    # hash of the indented items.json text, so a snapshot is identified by its content whatever --compact said
+    digest = hashlib.sha256()
+    for chunk in iter_item_chunks(item_database):
+        digest.update(chunk.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def diff_items(before_hashes, item_database):
+    current_hashes = record_hashes(item_database)
+    added = {}
+    updated = {}
+    for item_id in sorted(current_hashes, key=int):
+        if item_id not in before_hashes:
+            added[item_id] = as_dict(item_database[item_id])
+        elif before_hashes[item_id] != current_hashes[item_id]:
+            updated[item_id] = as_dict(item_database[item_id])
+    removed = sorted((item_id for item_id in before_hashes if item_id not in current_hashes), key=int)
+    return added, updated, removed
+
+
+def load_manifest(deltas_dir=DELTAS_DIR):
+    try:
+        with open(os.path.join(deltas_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def publish_delta(item_database, before_hashes, before_snapshot, deltas_dir=DELTAS_DIR):
+    # writes delta_<n>.json and bumps the manifest; returns the new version, or None when nothing changed
+    added, updated, removed = diff_items(before_hashes, item_database)
+    if not (added or updated or removed):
+        return None
+
+    os.makedirs(deltas_dir, exist_ok=True)
+    manifest = load_manifest(deltas_dir)
+    if manifest is None or manifest['versions'][-1]['hash'] != before_snapshot:
+        # first run, or items.json was replaced outside of the delta chain: start a new chain from here
+        manifest = {'versions': [{'version': 0, 'hash': before_snapshot}]}
+        for name in os.listdir(deltas_dir):
+            if name.startswith("delta_") and name.endswith(".json"):
+                os.remove(os.path.join(deltas_dir, name))
+
+    version = manifest['versions'][-1]['version'] + 1
+    filename = f"delta_{version:06d}.json"
+    _write_json(os.path.join(deltas_dir, filename), {
+        'version': version,
+        'base': before_snapshot,
+        'added': added,
+        'updated': updated,
+        'removed': removed,
+    })
+    manifest['versions'].append({
+        'version': version,
+        'hash': snapshot_hash(item_database),
+        'file': filename,
+        'added': len(added),
+        'updated': len(updated),
+        'removed': len(removed),
+    })
+    manifest['latest'] = version
+    _write_json(os.path.join(deltas_dir, MANIFEST_NAME), manifest)
+    return version
+
+
+def apply_delta(item_database, delta):
+    for item_id in delta['removed']:
+        item_database.pop(item_id, None)
+    # updated records carry the whole item, so replacing keeps key order identical to the full rebuild
+    item_database.update(delta['added'])
+    item_database.update(delta['updated'])
+
+
+def apply_deltas(item_database, deltas_dir=DELTAS_DIR):
+    # brings an older snapshot up to the latest published version in place; returns (from_version, to_version)
+    manifest = load_manifest(deltas_dir)
+    if manifest is None:
+        raise ValueError(f"No delta manifest found in '{deltas_dir}'.")
+
+    current = snapshot_hash(item_database)
+    start = next((entry for entry in reversed(manifest['versions']) if entry['hash'] == current), None)
+    if start is None:
+        raise ValueError("This snapshot does not match any published version; download the full items.json instead.")
+
+    for entry in manifest['versions'][start['version'] + 1:]:
+        with open(os.path.join(deltas_dir, entry['file']), 'r', encoding='utf-8') as f:
+            apply_delta(item_database, json.load(f))
+
+    if snapshot_hash(item_database) != manifest['versions'][-1]['hash']:
+        raise ValueError("Applying the deltas did not reproduce the published snapshot.")
+    return start['version'], manifest['versions'][-1]['version']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring an older items.json snapshot up to date from published deltas.")
+    parser.add_argument("--input", required=True, help="older items.json snapshot")
+    parser.add_argument("--output", help="where to write the updated snapshot (default: overwrite --input)")
+    parser.add_argument("--deltas-dir", default=DELTAS_DIR)
+    parser.add_argument("--compact", action="store_true", help="write the output JSON without indentation")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        item_database = json.load(f)
+
+    try:
+        from_version, to_version = apply_deltas(item_database, args.deltas_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    output = args.output or args.input
+    if from_version == to_version:
+        print(f"'{args.input}' is already at the latest version ({to_version}).")
+    else:
+        print(f"Applied deltas {from_version + 1}..{to_version}.")
+    write_items(output, item_database, compact=args.compact)
+    print(f"Saved version {to_version} to '{output}'.")
+
+
+if __name__ == "__main__":
+    main()
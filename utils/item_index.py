@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import unicodedata
+
+INDEX_VERSION = 1
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    # case, underscores and spacing differences between wiki titles and item names shouldn't matter
+    name = unicodedata.normalize('NFKC', name).replace('_', ' ')
+    return _WHITESPACE.sub(' ', name).strip().casefold()
+
+
+def index_path_for(items_path):
+    root, _ = os.path.splitext(items_path)
+    return root + ".index.json"
+
+
+def _source_stamp(items_path):
+    try:
+        stat = os.stat(items_path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _variant_rank(item):
+    # noted and placeholder copies share their base item's name; the base item should win name lookups
+    return 1 if item.get('noted') or item.get('placeholder') else 0
+
+
+class ItemIndex:
+    # name -> ids maps keep every id for a key, ordered so the first one is the canonical item
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_normalized = {}
+        self.by_wiki_name = {}
+
+    @classmethod
+    def build(cls, item_database):
+        index = cls()
+        ranked = sorted(item_database, key=lambda item_id: (_variant_rank(item_database[item_id]), int(item_id)))
+        for item_id in ranked:
+            index.add(item_id, item_database[item_id])
+        return index
+
+    @classmethod
+    def load_or_build(cls, item_database, items_path):
+        # reuses the saved index while it still matches items.json, otherwise rebuilds it
+        stamp = _source_stamp(items_path)
+        index_path = index_path_for(items_path)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION and stamp is not None and data.get('source') == stamp:
+                index = cls()
+                index.by_id = data['by_id']
+                index.by_name = data['by_name']
+                index.by_normalized = data['by_normalized']
+                index.by_wiki_name = data['by_wiki_name']
+                if len(index.by_id) == len(item_database):
+                    return index
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+        return cls.build(item_database)
+
+    def save(self, items_path):
+        index_path = index_path_for(items_path)
+        data = {
+            'version': INDEX_VERSION,
+            'source': _source_stamp(items_path),
+            'by_id': self.by_id,
+            'by_name': self.by_name,
+            'by_normalized': self.by_normalized,
+            'by_wiki_name': self.by_wiki_name,
+        }
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, item_id):
+        return str(item_id) in self.by_id
+
+    def _keys(self, item_id):
+        name, wiki_name = self.by_id[item_id]
+        return ((self.by_name, name), (self.by_normalized, normalize_name(name)), (self.by_wiki_name, wiki_name))
+
+    def add(self, item_id, item):
+        # returns the ids of existing items whose name only differs by case/spacing, i.e. likely conflicts
+        item_id = str(item_id)
+        name = item.get('name') or ''
+        if item_id in self.by_id:
+            self.remove(item_id)
+        conflicts = [other for other in self.by_normalized.get(normalize_name(name), []) if self.by_id[other][0] != name]
+        self.by_id[item_id] = [name, item.get('wiki_name') or name.replace(' ', '_')]
+        for mapping, key in self._keys(item_id):
+            mapping.setdefault(key, []).append(item_id)
+        return conflicts
+
+    def remove(self, item_id):
+        item_id = str(item_id)
+        if item_id not in self.by_id:
+            return
+        for mapping, key in self._keys(item_id):
+            ids = mapping[key]
+            ids.remove(item_id)
+            if not ids:
+                del mapping[key]
+        del self.by_id[item_id]
+
+    def names(self):
+        return self.by_name.keys()
+
+    def resolve(self, title):
+        # id for a wiki title: exact name, then wiki_name, then normalized name; None when unknown
+        for mapping, key in ((self.by_name, title), (self.by_wiki_name, title.replace(' ', '_')),
+                             (self.by_normalized, normalize_name(title))):
+            ids = mapping.get(key)
+            if ids:
+                return ids[0]
+        return None
+
+    def duplicates(self):
+        # names shared by several ids; mostly noted/placeholder variants, which is expected
+        return {name: ids for name, ids in self.by_name.items() if len(ids) > 1}
+
+    def conflicts(self):
+        # normalized names that several distinct spellings collapse onto, which title matching can't tell apart
+        return {
+            key: ids for key, ids in self.by_normalized.items()
+            if len({self.by_id[item_id][0] for item_id in ids}) > 1
+        }
+
+    def report(self):
+        conflicts = self.conflicts()
+        print(f"Item index: {len(self.by_id)} ids, {len(self.by_name)} names, "
+              f"{len(self.duplicates())} shared names, {len(conflicts)} spelling conflicts.")
+        for key, ids in sorted(conflicts.items())[:10]:
+            print(f"  Conflict: {', '.join(repr(self.by_id[i][0]) for i in ids)} (ids {', '.join(ids)})")
@@ -0,0 +1,168 @@
+WIKI_URL_PREFIX = "https://oldschool.runescape.wiki/w/"
+
+# the item schema the merge scripts write; each gets a slot instead of a per-item dict entry
+FIELDS = (
+    'id', 'name', 'last_updated', 'incomplete', 'members', 'tradeable', 'tradeable_on_ge', 'stackable',
+    'stacked', 'noted', 'noteable', 'linked_id_item', 'linked_id_noted', 'linked_id_placeholder',
+    'placeholder', 'equipable', 'equipable_by_player', 'equipable_weapon', 'cost', 'lowalch', 'highalch',
+    'weight', 'buy_limit', 'quest_item', 'release_date', 'duplicate', 'examine', 'icon', 'wiki_name',
+    'wiki_url', 'equipment', 'weapon',
+)
+_FIELD_SET = frozenset(FIELDS)
+# categorical strings repeated across thousands of items; every record shares one copy
+INTERNED_FIELDS = frozenset(('last_updated', 'release_date', 'examine'))
+_MAX_NESTED_INTERN = 64
+
+_SCALARS = frozenset((int, float, bool, type(None)))
+
+_strings = {}
+_layouts = {}
+_DERIVED = object()
+
+
+class _Dict(tuple):
+    # (keys, values) for a nested dict; the keys tuple is shared by every dict with the same layout
+    __slots__ = ()
+
+
+class _List(tuple):
+    __slots__ = ()
+
+
+_EMPTY_LIST = _List()
+
+
+def intern_string(value):
+    return _strings.setdefault(value, value)
+
+
+def _layout(keys):
+    return _layouts.setdefault(keys, keys)
+
+
+def _pack(value):
+    kind = type(value)
+    if kind is dict:
+        return _Dict((_layout(tuple(value)), tuple([v if type(v) in _SCALARS else _pack(v) for v in value.values()])))
+    if kind is list:
+        return _List(_pack(v) for v in value) if value else _EMPTY_LIST
+    if kind is str and len(value) <= _MAX_NESTED_INTERN:
+        return intern_string(value)
+    return value
+
+
+def _unpack(value):
+    kind = type(value)
+    if kind is _Dict:
+        keys, values = value
+        return {key: _unpack(v) for key, v in zip(keys, values)}
+    if kind is _List:
+        return [_unpack(v) for v in value]
+    return value
+
+
+class ItemRecord:
+    # slotted stand-in for one item dict: nested dicts become shared-layout tuples, repeated strings are
+    # interned and wiki_name/wiki_url are only stored when they can't be derived from the name.
+    # _keys keeps the original key order so to_dict() is lossless; unknown keys live in _extra.
+    # Nested values come back as fresh dicts, so assign a new value instead of mutating one in place.
+    __slots__ = ('_keys', '_extra') + FIELDS
+
+    @classmethod
+    def from_dict(cls, item):
+        record = cls.__new__(cls)
+        record._keys = _layout(tuple(item))
+        record._extra = None
+        for key, value in item.items():
+            # most fields are bools, ints or None, which need no packing
+            if type(value) in _SCALARS and key in _FIELD_SET:
+                object.__setattr__(record, key, value)
+            else:
+                record._set(key, value, item)
+        return record
+
+    def _set(self, key, value, item):
+        if key not in _FIELD_SET:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = _pack(value)
+            return
+        if key == 'wiki_name' and value == (item.get('name') or '').replace(' ', '_'):
+            value = _DERIVED
+        elif key == 'wiki_url' and value == WIKI_URL_PREFIX + str(item.get('wiki_name')):
+            value = _DERIVED
+        elif key in INTERNED_FIELDS and type(value) is str:
+            value = intern_string(value)
+        elif key != 'icon':
+            value = _pack(value)
+        object.__setattr__(self, key, value)
+
+    def _raw(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __getitem__(self, key):
+        value = self._raw(key)
+        if value is _DERIVED:
+            if key == 'wiki_name':
+                return (self.get('name') or '').replace(' ', '_')
+            return WIKI_URL_PREFIX + str(self.get('wiki_name'))
+        return _unpack(value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            self._keys = _layout(self._keys + (key,))
+        # values derived from the one being replaced are pinned first, so they don't silently change
+        for dependent in {'name': ('wiki_name', 'wiki_url'), 'wiki_name': ('wiki_url',)}.get(key, ()):
+            if dependent in self._keys and self._raw(dependent) is _DERIVED:
+                object.__setattr__(self, dependent, self[dependent])
+        self._set(key, value, self)
+
+    def update(self, other):
+        for key, value in other.items():
+            self[key] = value
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return self._keys
+
+    def items(self):
+        return [(key, self[key]) for key in self._keys]
+
+    def values(self):
+        return [self[key] for key in self._keys]
+
+    def to_dict(self):
+        result = {}
+        for key in self._keys:
+            value = getattr(self, key) if key in _FIELD_SET else self._extra[key]
+            result[key] = value if type(value) in _SCALARS or type(value) is str else self[key]
+        return result
+
+    def __repr__(self):
+        return f"ItemRecord({self.to_dict()!r})"
+
+
+def as_dict(item):
+    # writers and hashers take either plain item dicts or records
+    return item.to_dict() if type(item) is ItemRecord else item
@@ -0,0 +1,201 @@
+import requests
+
+from infobox_parser import _to_int, build_equipment_and_weapon, build_item, failure_reason
+from pipeline import iter_parsed_batches
+from run_metrics import metrics
+from wiki_fetch import TokenBucket, iter_bucket_rows, iter_wiki_batches
+
+# where the merge scripts get item dicts from. Every source yields (batch_titles, pages, {title: item or None})
+# in title order (with versions=True, {title: [an item per infobox version]}), where pages[title] has at least the revision "timestamp" and the thumbnail "icon_url".
+#   wikitext: fetches page content and regex-parses the infoboxes (pipeline.py), cached in the page cache
+#   bucket:   reads the infobox fields the wiki already stores as structured data (action=bucket), many items
+#             per request, and only fetches revision timestamps and thumbnails per page; nothing is parsed
+SOURCES = ("wikitext", "bucket")
+
+# infobox parameter -> field of the wiki's infobox_item / infobox_bonuses buckets
+ITEM_BUCKET = "infobox_item"
+ITEM_BUCKET_FIELDS = {
+    'id': 'item_id', 'members': 'is_members_only', 'tradeable': 'tradeable', 'noteable': 'noteable',
+    'stackable': 'stackable', 'equipable': 'equipable', 'quest': 'quest_item', 'slayercat': 'slayer_category',
+    'value': 'value', 'lowalch': 'low_alchemy_value', 'highalch': 'high_alchemy_value', 'weight': 'weight',
+    'gemw': 'grand_exchange', 'release': 'release_date', 'examine': 'examine',
+    'name': 'item_name', 'version': 'version_anchor',
+}
+BONUS_BUCKET = "infobox_bonuses"
+BONUS_BUCKET_FIELDS = {
+    'astab': 'stab_attack_bonus', 'aslash': 'slash_attack_bonus', 'acrush': 'crush_attack_bonus',
+    'amagic': 'magic_attack_bonus', 'arange': 'range_attack_bonus', 'dstab': 'stab_defence_bonus',
+    'dslash': 'slash_defence_bonus', 'dcrush': 'crush_defence_bonus', 'dmagic': 'magic_defence_bonus',
+    'drange': 'range_defence_bonus', 'str': 'strength_bonus', 'rstr': 'ranged_strength_bonus',
+    'mdmg': 'magic_damage_bonus', 'prayer': 'prayer_bonus', 'slot': 'equipment_slot',
+    'aspeed': 'weapon_attack_speed', 'wtype': 'combat_style',
+}
+
+
+class WikitextSource:
+    name = "wikitext"
+
+    def __init__(self, session, page_cache, icon_cache, parser_version, fold_2h=True, from_cache=False,
+                 parse_workers=None, concurrency=4, requests_per_second=5, versions=False):
+        self.session = session
+        self.page_cache = page_cache
+        self.icon_cache = icon_cache
+        # the fold and version modes change the parsed result, so they're part of the parse cache key
+        self.parser_version = parser_version + ("" if fold_2h else "-no2hfold") + ("-versions" if versions else "")
+        self.fold_2h = fold_2h
+        self.versions = versions
+        self.from_cache = from_cache
+        self.parse_workers = parse_workers
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+
+    def prepare(self):
+        return True
+
+    def iter_items(self, titles, batch_size=50):
+        if self.from_cache:
+            wiki_batches = self.page_cache.iter_batches(titles, batch_size)
+        else:
+            wiki_batches = iter_wiki_batches(titles, self.session, batch_size, self.concurrency, self.requests_per_second)
+        yield from iter_parsed_batches(wiki_batches, self.page_cache, self.icon_cache, self.parser_version,
+                                       self.fold_2h, store_pages=not self.from_cache, parse_workers=self.parse_workers,
+                                       versions=self.versions)
+
+    def failure_reason(self, title, page):
+        return failure_reason(page['content'])
+
+
+def _wiki_value(value):
+    # bucket fields come back typed; the infobox builders expect the strings a template parameter holds
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def fields_from_row(row, field_map):
+    return {key: _wiki_value(row[field]) for key, field in field_map.items() if row.get(field) is not None}
+
+
+def item_from_rows(title, item_row, bonus_row, last_updated_iso, fold_2h=True, wiki_name=None):
+    # the same dict parse_infobox builds from the page's wikitext
+    if item_row is None:
+        return None
+    item_data = fields_from_row(item_row, ITEM_BUCKET_FIELDS)
+    if _to_int(item_data.get('id', '0')) == 0:
+        return None
+    bonus_data = fields_from_row(bonus_row, BONUS_BUCKET_FIELDS) if bonus_row is not None else None
+    equipment, weapon = build_equipment_and_weapon(bonus_data, fold_2h)
+    return build_item(item_data, equipment, weapon, title, last_updated_iso, None, wiki_name)
+
+
+def items_from_rows(title, item_rows, bonus_rows, last_updated_iso, fold_2h=True):
+    # parse_infobox_versions for bucket rows: a switch infobox stores one row per version, told apart by
+    # its version anchor, and each version's bonuses are the bonus row with the same anchor
+    if not any(row.get('version_anchor') for row in item_rows):
+        item = item_from_rows(title, item_rows[0] if item_rows else None, bonus_rows[0] if bonus_rows else None,
+                              last_updated_iso, fold_2h)
+        return [item] if item else []
+    bonus_by_anchor = {}
+    for row in bonus_rows:
+        bonus_by_anchor.setdefault(row.get('version_anchor'), row)
+    shared_bonus = bonus_by_anchor.get(None, bonus_rows[0] if bonus_rows else None)
+    items = []
+    seen_ids = set()
+    for row in item_rows:
+        anchor = row.get('version_anchor')
+        item = item_from_rows(row.get('item_name') or title, row, bonus_by_anchor.get(anchor, shared_bonus),
+                              last_updated_iso, fold_2h, wiki_name=f"{title}#{anchor}")
+        if item and item['id'] not in seen_ids:
+            seen_ids.add(item['id'])
+            items.append(item)
+    return items
+
+
+class BucketSource:
+    name = "bucket"
+
+    def __init__(self, session, icon_cache, fold_2h=True, concurrency=4, requests_per_second=5, versions=False):
+        self.session = session
+        self.icon_cache = icon_cache
+        self.fold_2h = fold_2h
+        self.versions = versions
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self._rows = None
+
+    def load_rows(self):
+        # {page name: ([item rows], [bonus rows])}, read once per run
+        if self._rows is None:
+            limiter = TokenBucket(self.requests_per_second)
+            item_rows = {}
+            for row in iter_bucket_rows(self.session, ITEM_BUCKET, ["page_name", *ITEM_BUCKET_FIELDS.values()], limiter):
+                item_rows.setdefault(row.get("page_name"), []).append(row)
+            bonus_rows = {}
+            for row in iter_bucket_rows(self.session, BONUS_BUCKET, ["page_name", "version_anchor",
+                                                                             *BONUS_BUCKET_FIELDS.values()], limiter):
+                bonus_rows.setdefault(row.get("page_name"), []).append(row)
+            self._rows = {title: (rows, bonus_rows.get(title, [])) for title, rows in item_rows.items()}
+            print(f"Loaded {sum(map(len, item_rows.values()))} {ITEM_BUCKET} and "
+                  f"{sum(map(len, bonus_rows.values()))} {BONUS_BUCKET} rows.")
+        return self._rows
+
+    def _parse(self, title, last_updated_iso):
+        item_rows, bonus_rows = self._rows.get(title, ([], []))
+        if self.versions:
+            return items_from_rows(title, item_rows, bonus_rows, last_updated_iso, self.fold_2h)
+        # without versions a switch infobox has no plain id, so like parse_infobox it gives no item
+        if any(row.get('version_anchor') for row in item_rows):
+            return None
+        return item_from_rows(title, item_rows[0] if item_rows else None, bonus_rows[0] if bonus_rows else None,
+                              last_updated_iso, self.fold_2h)
+
+    def prepare(self):
+        try:
+            self.load_rows()
+        except requests.exceptions.RequestException as e:
+            print(f"Error reading the wiki's item buckets: {e}")
+            return False
+        return True
+
+    def iter_items(self, titles, batch_size=50):
+        self.load_rows()
+        # revision timestamps and thumbnails still come from the pages themselves, without their content
+        for batch_titles, pages in iter_wiki_batches(titles, self.session, batch_size, self.concurrency,
+                                                     self.requests_per_second, content=False):
+            self.icon_cache.prefetch(page.get('icon_url') for page in pages.values())
+            with metrics.stage("parse"):
+                parsed = {title: self._parse(title, page['timestamp']) for title, page in pages.items()}
+            yield batch_titles, pages, parsed
+
+    def failure_reason(self, title, page):
+        item_rows = self.load_rows().get(title, ([], []))[0]
+        if not item_rows:
+            return 'no_infobox'
+        if not self.versions and any(row.get('version_anchor') for row in item_rows):
+            return 'missing_id'
+        if not any(row.get(ITEM_BUCKET_FIELDS['id']) for row in item_rows):
+            return 'missing_id'
+        return 'invalid_id'
+
+
+def open_source(name, session, page_cache, icon_cache, parser_version, fold_2h=True, from_cache=False,
+                parse_workers=None, concurrency=4, requests_per_second=5, versions=False):
+    if name == "bucket" and from_cache:
+        # --offline and --crawl runs read pages from the page cache, which only holds wikitext
+        print("Pages come from the page cache in this run, so they are parsed from wikitext.")
+        name = "wikitext"
+    if name == "bucket":
+        return BucketSource(session, icon_cache, fold_2h, concurrency, requests_per_second, versions)
+    return WikitextSource(session, page_cache, icon_cache, parser_version, fold_2h, from_cache, parse_workers,
+                          concurrency, requests_per_second, versions)
+
+
+def add_source_args(parser):
+    parser.add_argument("--source", choices=SOURCES, default="wikitext",
+                        help="parse item pages' wikitext, or read the infobox fields the wiki stores as structured data")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="parser processes (default: one per core, 0 parses inline without a pipeline)")
@@ -0,0 +1,54 @@
+import json
+import os
+
+from item_record import as_dict
+
+
+def _strip(item, omit_fields):
+    item = as_dict(item)
+    if not omit_fields:
+        return item
+    return {key: value for key, value in item.items() if key not in omit_fields}
+
+
+def iter_item_chunks(item_database, compact=False, omit_fields=()):
+    # yields the same text json.dump(sorted_by_id, f, indent=4) would, one record at a time
+    ids = sorted(item_database, key=int)
+    if not ids:
+        yield "{}"
+        return
+
+    if compact:
+        separators = (',', ':')
+        yield "{"
+        for n, item_id in enumerate(ids):
+            prefix = "," if n else ""
+            yield f"{prefix}{json.dumps(item_id)}:{json.dumps(_strip(item_database[item_id], omit_fields), separators=separators)}"
+        yield "}"
+        return
+
+    yield "{\n"
+    for n, item_id in enumerate(ids):
+        # json strings never contain raw newlines, so re-indenting the record's lines is safe
+        record = json.dumps(_strip(item_database[item_id], omit_fields), indent=4).replace("\n", "\n    ")
+        prefix = ",\n" if n else ""
+        yield f"{prefix}    {json.dumps(item_id)}: {record}"
+    yield "\n}"
+
+
+def write_items(path, item_database, compact=False, omit_fields=()):
+    # write to a sibling temp file and rename over the target, so readers never see a partial file
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for chunk in iter_item_chunks(item_database, compact, omit_fields):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,287 @@
+import argparse
+import base64
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from array import array
+
+from item_index import ItemIndex, _source_stamp, normalize_name
+
+NAMES_VERSION = 1
+# a new item's name is a likely duplicate of an existing one when the two have at least this Jaccard similarity
+# and differ by a typo: in one word no other name uses, without digits, at least TYPO_MIN_LENGTH letters long and
+# at most one edit away (two from TYPO_LONG_WORD letters). Trigrams alone flag "Black sword" and "Black 2h sword",
+# and the edit distance alone flags "Iron bolts" and "Iron boots"
+NEAR_DUPLICATE_SCORE = 0.5
+TYPO_MIN_LENGTH = 4
+TYPO_LONG_WORD = 8
+
+
+def names_path_for(items_path):
+    root, _ = os.path.splitext(items_path)
+    return root + ".names.json"
+
+
+def trigrams(text):
+    # per word, padded the way pg_trgm does it, so a query word matches inside a longer name
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(a, b, limit):
+    # optimal string alignment distance (a swap of neighbouring letters is one edit), or limit + 1 once it's above
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, other in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def is_typo(text, other, known_words=()):
+    # normalized names that differ in exactly one word, by a misspelling rather than a variant marker or another
+    # word that is already in use
+    words, other_words = text.split(), other.split()
+    if len(words) != len(other_words):
+        return False
+    changed = [(word, other_word) for word, other_word in zip(words, other_words) if word != other_word]
+    if len(changed) != 1:
+        return False
+    word, other_word = changed[0]
+    if word in known_words:
+        return False
+    shorter = min(len(word), len(other_word))
+    if shorter < TYPO_MIN_LENGTH or any(char.isdigit() for char in word + other_word):
+        return False
+    limit = 2 if shorter >= TYPO_LONG_WORD else 1
+    return edit_distance(word, other_word, limit) <= limit
+
+
+class NameSearchIndex:
+    # trigram -> doc numbers over the normalized names and wiki names, each doc listing the ids it belongs to.
+    # Docs and postings are append-only; an item that is renamed or removed just drops its id from its docs
+    def __init__(self):
+        self.docs = []
+        self.doc_ids = []
+        self.doc_grams = []
+        self.doc_numbers = {}
+        self.postings = {}
+        self.by_id = {}
+        self.names = {}
+        self.words = set()
+        self.flagged = []
+
+    @classmethod
+    def build(cls, item_index):
+        index = cls()
+        for item_id, (name, wiki_name) in item_index.by_id.items():
+            index._add_texts(item_id, name, wiki_name)
+        return index
+
+    @classmethod
+    def load(cls, items_path):
+        # the saved index while it still matches items.json, otherwise None
+        try:
+            with open(names_path_for(items_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        stamp = _source_stamp(items_path)
+        if data.get('version') != NAMES_VERSION or stamp is None or data.get('source') != stamp:
+            return None
+        index = cls()
+        index.docs = data['docs']
+        index.doc_ids = data['ids']
+        index.doc_grams = [trigrams(text) for text in index.docs]
+        index.doc_numbers = {text: doc for doc, text in enumerate(index.docs)}
+        index.words = {word for text in index.docs for word in text.split()}
+        for gram, packed in data['postings'].items():
+            docs = array(data['typecode'])
+            docs.frombytes(base64.b64decode(packed))
+            if sys.byteorder == 'big':
+                docs.byteswap()
+            index.postings[gram] = docs.tolist()
+        for doc, ids in enumerate(index.doc_ids):
+            for item_id in ids:
+                index.by_id.setdefault(item_id, []).append(doc)
+        index.names = data['names']
+        return index
+
+    @classmethod
+    def load_or_build(cls, item_index, items_path):
+        index = cls.load(items_path)
+        if index is not None and len(index.by_id) == len(item_index):
+            return index
+        return cls.build(item_index)
+
+    def save(self, items_path):
+        # postings as base64 little-endian uint16/uint32 arrays, which load back in one frombytes per trigram
+        typecode = 'H' if len(self.docs) <= 0xFFFF else 'I'
+        postings = {}
+        for gram, docs in self.postings.items():
+            packed = array(typecode, docs)
+            if sys.byteorder == 'big':
+                packed.byteswap()
+            postings[gram] = base64.b64encode(packed.tobytes()).decode('ascii')
+        data = {
+            'version': NAMES_VERSION,
+            'source': _source_stamp(items_path),
+            'typecode': typecode,
+            'docs': self.docs,
+            'ids': self.doc_ids,
+            'names': self.names,
+            'postings': postings,
+        }
+        path = names_path_for(items_path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _add_texts(self, item_id, name, wiki_name):
+        docs = []
+        for text in {normalize_name(name), normalize_name(wiki_name)}:
+            doc = self.doc_numbers.get(text)
+            if doc is None:
+                doc = len(self.docs)
+                self.docs.append(text)
+                self.doc_ids.append([])
+                grams = trigrams(text)
+                self.doc_grams.append(grams)
+                self.doc_numbers[text] = doc
+                self.words.update(text.split())
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(doc)
+            self.doc_ids[doc].append(item_id)
+            docs.append(doc)
+        self.by_id[item_id] = docs
+        self.names[item_id] = name
+
+    def add(self, item_id, item):
+        # returns [(score, id)] of existing items whose names are close to but not the same as a new item's,
+        # and keeps them in self.flagged for report(); re-adding a known id only refreshes its names
+        item_id = str(item_id)
+        name = item.get('name') or ''
+        wiki_name = item.get('wiki_name') or name.replace(' ', '_')
+        near = []
+        if item_id in self.by_id:
+            self.remove(item_id)
+        else:
+            near = self.near_duplicates(name)
+            if near:
+                self.flagged.append((item_id, name, near))
+        self._add_texts(item_id, name, wiki_name)
+        return near
+
+    def remove(self, item_id):
+        for doc in self.by_id.pop(str(item_id), []):
+            self.doc_ids[doc].remove(str(item_id))
+        self.names.pop(str(item_id), None)
+
+    def _scores(self, text, min_containment, limit=None):
+        # (containment, similarity, doc) per doc with at least min_containment of text's trigrams: containment is
+        # the share of the query's trigrams a doc has, so partial names score high; similarity is the Jaccard index.
+        # Postings are read rarest first. After reading n of them, every doc sharing len - n + 1 or more trigrams
+        # has been seen, so with a limit the reading stops once that many items are certain to rank first
+        grams = trigrams(text)
+        if not grams:
+            return []
+        needed = max(1, math.ceil(min_containment * len(grams) - 1e-9))
+        rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        postings, doc_ids, doc_grams = self.postings, self.doc_ids, self.doc_grams
+        seen = set()
+        scores = []
+        # ids certain to rank first, and found docs waiting for their count to become certain
+        certain = set()
+        pending = {}
+        for read, gram in enumerate(rarest[:len(grams) - needed + 1], 1):
+            complete = len(grams) - read + 1
+            new_docs = set(postings.get(gram, ())).difference(seen)
+            seen.update(new_docs)
+            for doc in new_docs:
+                ids = doc_ids[doc]
+                if not ids:
+                    continue
+                count = len(grams & doc_grams[doc])
+                if count >= needed:
+                    scores.append((count, doc))
+                    if count >= complete:
+                        certain.update(ids)
+                    else:
+                        pending.setdefault(count, []).append(doc)
+            for doc in pending.pop(complete, ()):
+                certain.update(doc_ids[doc])
+            if limit is not None and len(certain) >= limit:
+                break
+        return [(count / len(grams), count / (len(grams) + len(doc_grams[doc]) - count), doc) for count, doc in scores]
+
+    def search(self, query, limit=10, min_score=0.5):
+        # [(score, id, name)] best first, one entry per item; score is the containment, ties go to the closer name
+        # and then the lower id
+        best = {}
+        for containment, similarity, doc in self._scores(normalize_name(query), min_score, limit):
+            for item_id in self.doc_ids[doc]:
+                if best.get(item_id, (0, 0))[:2] < (containment, similarity):
+                    best[item_id] = (containment, similarity, doc)
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda entry: (-entry[1][0], -entry[1][1], int(entry[0]) if entry[0].isdigit() else 0))
+        return [(round(containment, 3), item_id, self.names[item_id]) for item_id, (containment, _, _) in ranked]
+
+    def near_duplicates(self, name, min_score=NEAR_DUPLICATE_SCORE):
+        # exact matches after normalization are ItemIndex's spelling conflicts; this finds the typos
+        text = normalize_name(name)
+        near = {}
+        # a typo is the one word no existing name uses, so most names are settled without a lookup
+        if sum(word not in self.words for word in text.split()) != 1:
+            return []
+        # the Jaccard index is never above the containment, so the same bound prunes the candidates
+        for _, similarity, doc in self._scores(text, min_score):
+            if similarity >= min_score and self.docs[doc] != text and is_typo(text, self.docs[doc], self.words):
+                for item_id in self.doc_ids[doc]:
+                    near[item_id] = max(near.get(item_id, 0), similarity)
+        return sorted(((round(score, 3), item_id) for item_id, score in near.items()), reverse=True)
+
+    def report(self):
+        if not self.flagged:
+            return
+        print(f"\nName search: {len(self.flagged)} new items have names close to an existing item's.")
+        for item_id, name, near in self.flagged[:10]:
+            score, other_id = near[0]
+            print(f"  Near duplicate: '{name}' ({item_id}) and '{self.names[other_id]}' ({other_id}), similarity {score}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzzy item name search over the trigram index saved next to items.json.")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = NameSearchIndex.load(args.input)
+    if index is None:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            index = NameSearchIndex.build(ItemIndex.build(json.load(f)))
+        print(f"No current name index next to '{args.input}'; built one with {len(index.docs)} names.")
+    query = " ".join(args.query)
+    start = time.perf_counter()
+    results = index.search(query, args.limit)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} matches for '{query}' in {elapsed * 1000:.2f} ms:")
+    for score, item_id, name in results:
+        print(f"  {score:5.3f} {item_id:>7} {name}")
+
+
+if __name__ == "__main__":
+    main()
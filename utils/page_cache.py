@@ -0,0 +1,145 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from run_metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    title TEXT PRIMARY KEY,
+    revid INTEGER,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    icon_url TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parsed (
+    title TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    item_json TEXT,
+    PRIMARY KEY (title, content_hash, parser_version)
+);
+CREATE TABLE IF NOT EXISTS titles (
+    title TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def parser_fingerprint(*funcs):
+    # hash of the parser source, so editing any of these functions invalidates memoized results
+    digest = hashlib.sha1()
+    for func in funcs:
+        digest.update(inspect.getsource(func).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class PageCache:
+    def __init__(self, path=os.path.join(".cache", "pages.sqlite")):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # shared between pipeline stages, so every access goes through self._lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self.parse_hits = 0
+        self.parse_misses = 0
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def save_titles(self, titles):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM titles")
+            self.conn.executemany("INSERT INTO titles (title) VALUES (?)", ((t,) for t in titles))
+
+    def load_titles(self):
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT title FROM titles")}
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def store_pages(self, wiki_data):
+        now = time.time()
+        rows = [
+            (title, data.get("revid"), data["timestamp"], data["content"], content_hash(data["content"]), data.get("icon_url"), now)
+            for title, data in wiki_data.items()
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pages (title, revid, timestamp, content, content_hash, icon_url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def get_pages(self, titles):
+        results = {}
+        titles = list(titles)
+        # stay under sqlite's bound-parameter limit
+        for i in range(0, len(titles), 500):
+            chunk = titles[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            query = f"SELECT title, revid, timestamp, content, icon_url FROM pages WHERE title IN ({placeholders})"
+            with self._lock:
+                rows = self.conn.execute(query, chunk).fetchall()
+            for title, revid, timestamp, content, icon_url in rows:
+                results[title] = {"content": content, "timestamp": timestamp, "icon_url": icon_url, "revid": revid}
+        return results
+
+    def iter_batches(self, all_titles, batch_size=50):
+        # same shape as wiki_fetch.iter_wiki_batches, served from disk
+        for i in range(0, len(all_titles), batch_size):
+            batch_titles = all_titles[i:i + batch_size]
+            with metrics.stage("content_fetch"):
+                pages = self.get_pages(batch_titles)
+            yield batch_titles, {title: pages[title] for title in batch_titles if title in pages}
+
+    def lookup_parsed(self, title, content, parser_version):
+        # returns (hit, item); a cached None means the page is known not to hold an item
+        key = (title, content_hash(content), parser_version)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT item_json FROM parsed WHERE title = ? AND content_hash = ? AND parser_version = ?", key).fetchone()
+            if row is None:
+                self.parse_misses += 1
+                return False, None
+            self.parse_hits += 1
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def store_parsed(self, title, content, parser_version, item):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO parsed (title, content_hash, parser_version, item_json) VALUES (?, ?, ?, ?)",
+                (title, content_hash(content), parser_version, json.dumps(item) if item is not None else None))
+
+    def parse(self, title, content, parser_version, parse):
+        # memoizes parse() by (title, content hash, parser version); None results are cached too
+        hit, item = self.lookup_parsed(title, content, parser_version)
+        if not hit:
+            item = parse()
+            self.store_parsed(title, content, parser_version, item)
+        return item
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
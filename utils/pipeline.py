@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from infobox_parser import parse_infobox, parse_infobox_versions
+from run_metrics import metrics
+
+_DONE = object()
+
+
+def parse_pages(pages, fold_2h, versions=False):
+    # runs in a worker process; pages is a list of (title, content, timestamp). The time spent is sent back
+    # because the parent's metrics can't see inside the worker
+    start = time.perf_counter()
+    parse = parse_infobox_versions if versions else parse_infobox
+    parsed = {title: parse(content, title, timestamp, None, fold_2h=fold_2h) for title, content, timestamp in pages}
+    return parsed, time.perf_counter() - start
+
+
+def _put(q, value, stop):
+    while not stop.is_set():
+        try:
+            q.put(value, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _iter_serial(wiki_batches, page_cache, icon_cache, parser_version, fold_2h, store_pages, versions):
+    parse = parse_infobox_versions if versions else parse_infobox
+    for batch_titles, wiki_data in wiki_batches:
+        if store_pages:
+            page_cache.store_pages(wiki_data)
+        icon_cache.prefetch(data.get('icon_url') for data in wiki_data.values())
+        parsed = {}
+        with metrics.stage("parse"):
+            for title, data in wiki_data.items():
+                parsed[title] = page_cache.parse(title, data['content'], parser_version,
+                                                 lambda: parse(data['content'], title, data['timestamp'], None, fold_2h=fold_2h))
+        yield batch_titles, wiki_data, parsed
+
+
+def iter_parsed_batches(wiki_batches, page_cache, icon_cache, parser_version, fold_2h=True,
+                        store_pages=True, parse_workers=None, queue_size=4, versions=False):
+    # fetch (+ page store and icon prefetch) -> parse in a process pool -> caller merges.
+    # Yields (batch_titles, wiki_data, {title: item or None}) in fetch order, so a single-writer
+    # merge loop over this sees exactly what the serial loop would. With versions=True each title
+    # maps to the list of items from all its infobox versions instead
+    if parse_workers == 0:
+        yield from _iter_serial(wiki_batches, page_cache, icon_cache, parser_version, fold_2h, store_pages, versions)
+        return
+
+    fetched = queue.Queue(maxsize=queue_size)
+    parsing = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def fetch_stage():
+        try:
+            for batch_titles, wiki_data in wiki_batches:
+                if store_pages:
+                    page_cache.store_pages(wiki_data)
+                icon_cache.prefetch(data.get('icon_url') for data in wiki_data.values())
+                if not _put(fetched, (batch_titles, wiki_data), stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(fetched, _DONE, stop)
+
+    def parse_stage(executor):
+        try:
+            while True:
+                entry = _get(fetched, stop)
+                if entry is _DONE:
+                    break
+                batch_titles, wiki_data = entry
+                cached = {}
+                misses = []
+                with metrics.stage("parse"):
+                    for title, data in wiki_data.items():
+                        hit, item = page_cache.lookup_parsed(title, data['content'], parser_version)
+                        if hit:
+                            cached[title] = item
+                        else:
+                            misses.append((title, data['content'], data['timestamp']))
+                future = executor.submit(parse_pages, misses, fold_2h, versions) if misses else None
+                if not _put(parsing, (batch_titles, wiki_data, cached, future), stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(parsing, _DONE, stop)
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        threads = [
+            threading.Thread(target=fetch_stage, daemon=True),
+            threading.Thread(target=parse_stage, args=(executor,), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                entry = parsing.get()
+                if entry is _DONE:
+                    break
+                batch_titles, wiki_data, cached, future = entry
+                fresh, parse_seconds = future.result() if future is not None else ({}, 0.0)
+                metrics.add_time("parse", parse_seconds)
+                with metrics.stage("parse"):
+                    for title, item in fresh.items():
+                        page_cache.store_parsed(title, wiki_data[title]['content'], parser_version, item)
+                parsed = {title: cached[title] if title in cached else fresh[title] for title in wiki_data}
+                yield batch_titles, wiki_data, parsed
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+    if errors:
+        raise errors[0]
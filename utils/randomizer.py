@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import random
+
+from bitset_index import BitsetIndex
+from build_frontend import STAT_KEYS, load_items, ui_slot
+
+# the equipment grid in index.html
+SLOTS = ['head', 'cape', 'neck', 'ammo', 'weapon', 'body', 'shield', 'legs', 'hands', 'feet', 'ring']
+
+
+class AliasTable:
+    # Vose's alias method: O(n) to build, then every weighted pick is one random number and one comparison
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if n == 0 or total <= 0:
+            raise ValueError("an alias table needs at least one positive weight")
+        self.size = n
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+        # whatever is left is 1.0 up to float rounding
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng):
+        # the integer part picks a column, the fraction decides between it and its alias
+        u = rng.random() * self.size
+        column = int(u)
+        return column if u - column < self.prob[column] else self.alias[column]
+
+
+def _stat_weight(key):
+    # higher bonuses roll more often; nothing is ruled out for a zero or negative bonus
+    return lambda item: 1 + max(0, item['equipment'].get(key) or 0)
+
+
+# named weightings for --weight; a weight of 0 removes the item from its pool
+WEIGHTS = {
+    'uniform': lambda item: 1,
+    'value': lambda item: 1 + max(0, item.get('cost') or 0),
+    'members': lambda item: 1 if item.get('members') else 0,
+    'f2p': lambda item: 0 if item.get('members') else 1,
+    'total': lambda item: 1 + max(0, sum(item['equipment'].get(key) or 0 for key in STAT_KEYS)),
+}
+
+
+def weight_function(weight):
+    # a WEIGHTS name, "stat:<stat key>" or a function of the item
+    if callable(weight):
+        return weight
+    if weight in WEIGHTS:
+        return WEIGHTS[weight]
+    if weight.startswith('stat:') and weight[5:] in STAT_KEYS:
+        return _stat_weight(weight[5:])
+    raise ValueError(f"unknown weighting '{weight}'")
+
+
+def build_pools(item_database):
+    # {slot: [items]} in id order, 2h weapons in the weapon slot, the same pools script.js rolls from
+    pools = {}
+    for item_id in sorted(item_database, key=int):
+        item = item_database[item_id]
+        slot = ui_slot(item)
+        if slot:
+            pools.setdefault(slot, []).append(item)
+    return pools
+
+
+class Randomizer:
+    # loads the pools once and keeps an alias table per slot, so a roll costs the same for any pool size or weighting
+    def __init__(self, item_database, weight='uniform', seed=None):
+        weigh = weight_function(weight)
+        self.rng = random.Random(seed)
+        self.pools = {}
+        self.tables = {}
+        for slot, items in build_pools(item_database).items():
+            weighted = [(item, weigh(item)) for item in items]
+            weighted = [(item, w) for item, w in weighted if w > 0]
+            if weighted:
+                self.pools[slot] = [item for item, _ in weighted]
+                self.tables[slot] = AliasTable([w for _, w in weighted])
+
+    def roll(self, slot):
+        # None when nothing in the slot can roll under this weighting
+        table = self.tables.get(slot)
+        if table is None:
+            return None
+        return self.pools[slot][table.sample(self.rng)]
+
+    def roll_many(self, slot, count):
+        table = self.tables.get(slot)
+        if table is None:
+            return []
+        pool, sample, rng = self.pools[slot], table.sample, self.rng
+        return [pool[sample(rng)] for _ in range(count)]
+
+    def roll_build(self):
+        # one item per slot; a 2h weapon leaves the shield slot empty
+        build = {}
+        for slot in SLOTS:
+            if slot == 'shield' and is_two_handed(build.get('weapon')):
+                build[slot] = None
+                continue
+            build[slot] = self.roll(slot)
+        return build
+
+    def session(self, roll_limit):
+        return RollSession(self, roll_limit)
+
+
+def is_two_handed(item):
+    return bool(item) and item['equipment'].get('slot') == '2h'
+
+
+def build_totals(equipped):
+    # summed bonuses the way script.js shows them: a shield under a 2h weapon doesn't count
+    totals = dict.fromkeys(STAT_KEYS, 0)
+    two_handed = is_two_handed(equipped.get('weapon'))
+    for slot, item in equipped.items():
+        if item is None or (two_handed and slot == 'shield'):
+            continue
+        for key in STAT_KEYS:
+            totals[key] += item['equipment'].get(key) or 0
+    return totals
+
+
+class RollSession:
+    # the browser game: click slots until the total roll limit is used up
+    def __init__(self, randomizer, roll_limit):
+        self.randomizer = randomizer
+        self.roll_limit = roll_limit
+        self.total_rolls = 0
+        self.roll_counters = dict.fromkeys(SLOTS, 0)
+        self.equipped = dict.fromkeys(SLOTS)
+
+    def rolls_left(self):
+        return max(0, self.roll_limit - self.total_rolls)
+
+    def roll(self, slot):
+        # None once the limit is reached or the slot has no items; neither uses up a roll
+        if self.total_rolls >= self.roll_limit:
+            return None
+        item = self.randomizer.roll(slot)
+        if item is None:
+            return None
+        self.equipped[slot] = item
+        self.roll_counters[slot] += 1
+        self.total_rolls += 1
+        return item
+
+    def totals(self):
+        return build_totals(self.equipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll random gear from database/items.json.")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--weight", default="uniform",
+                        help=f"one of {', '.join(WEIGHTS)}, or stat:<key> to favour high bonuses in that stat")
+    parser.add_argument("--seed", type=int, default=None, help="the same seed and weighting give the same rolls")
+    parser.add_argument("--slot", choices=SLOTS, help="roll this slot instead of a full build")
+    parser.add_argument("--rolls", type=int, default=1, help="how many builds (or slot rolls) to print")
+    parser.add_argument("--filter", default="",
+                        help='only roll items matching a bitset_index query, e.g. "tradeable !members !quest_item"')
+    parser.add_argument("--json", action="store_true", help="print ids and names as JSON")
+    args = parser.parse_args()
+
+    item_database = load_items(args.input)
+    if args.filter:
+        index = BitsetIndex(item_database)
+        item_database = index.filtered_database(index.query(args.filter))
+    try:
+        randomizer = Randomizer(item_database, args.weight, args.seed)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    for slot in SLOTS:
+        pool = randomizer.pools.get(slot, [])
+        print(f"{slot:<8} {len(pool):>6} items")
+
+    for roll_no in range(1, args.rolls + 1):
+        if args.slot:
+            rolled = {args.slot: randomizer.roll(args.slot)}
+        else:
+            rolled = randomizer.roll_build()
+        summary = {slot: None if item is None else [item['id'], item['name']] for slot, item in rolled.items()}
+        if args.json:
+            print(json.dumps(summary))
+            continue
+        print(f"\nRoll {roll_no}:")
+        for slot, entry in summary.items():
+            print(f"  {slot:<8} {entry[1] if entry else '-'}")
+        if not args.slot:
+            totals = build_totals(rolled)
+            print("  " + ", ".join(f"{key} {value:+}" for key, value in totals.items() if value))
+
+
+if __name__ == "__main__":
+    main()
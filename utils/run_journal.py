@@ -0,0 +1,70 @@
+import json
+import os
+
+JOURNAL_DIR = os.path.join(".cache", "journal")
+
+
+class RunJournal:
+    # append-only JSONL record of one run: a "start" line with the titles to fetch and the state the merge needs,
+    # then a "batch" line per merged batch with its parsed items. --resume replays it instead of fetching again;
+    # it is removed once the output has been written.
+    def __init__(self, script, journal_dir=JOURNAL_DIR):
+        self.path = os.path.join(journal_dir, f"{script}.jsonl")
+        self._file = None
+        self._valid_bytes = 0
+
+    def load(self):
+        # returns (state, [(title count, [[title, item], ...]), ...]) for an unfinished run, or None
+        try:
+            with open(self.path, 'rb') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        entries = []
+        valid_bytes = 0
+        for line in lines:
+            # a crash mid-write leaves a torn last line; everything before it is intact
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            valid_bytes += len(line)
+        if not entries or entries[0].get("type") != "start":
+            return None
+        self._valid_bytes = valid_bytes
+        batches = [(entry["count"], entry["items"]) for entry in entries[1:] if entry.get("type") == "batch"]
+        return entries[0]["state"], batches
+
+    def begin(self, state):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self._append({"type": "start", "state": state})
+
+    def resume(self):
+        # drop any torn tail before appending after it
+        self._file = open(self.path, 'r+b')
+        self._file.truncate(self._valid_bytes)
+        self._file.seek(self._valid_bytes)
+
+    def record_batch(self, count, items):
+        # count is how many titles the batch covered, including ones the wiki had no page for
+        self._append({"type": "batch", "count": count, "items": items})
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,202 @@
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+METRICS_DIR = os.path.join(".cache", "metrics")
+PROMETHEUS_PREFIX = "osrs_items"
+# exported even when nothing happened, so dashboards and alerts always see a value
+ALWAYS_EXPORTED = ('http_requests', 'http_bytes', 'http_retries', 'parse_failures')
+
+
+class RunMetrics:
+    # per-stage time plus labelled counters for one script run; shared by every module through `metrics`.
+    # Stage time is exclusive within a thread: a stage entered inside another (an icon fetch during the merge)
+    # pauses the outer one. Across threads and parse workers it adds up, so it is thread-seconds, not wall time:
+    # overlapping pipeline stages can total more than the run itself.
+    def __init__(self):
+        self.script = None
+        self.metrics_dir = METRICS_DIR
+        self.profile = False
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.stages = {}
+        self.counters = {name: {} for name in ALWAYS_EXPORTED}
+        self._profilers = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self, script, metrics_dir=METRICS_DIR, profile=False):
+        # resets the clock and writes the reports when the interpreter exits, whichever way main() returns
+        self.script = script
+        self.metrics_dir = metrics_dir
+        self.profile = profile
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        if profile:
+            tracemalloc.start()
+        atexit.register(self.write_reports)
+        return self
+
+    def incr(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counter = self.counters.setdefault(name, {})
+            counter[key] = counter.get(key, 0) + amount
+
+    def total(self, name):
+        return sum(self.counters.get(name, {}).values())
+
+    def add_time(self, stage, seconds):
+        # for work timed elsewhere, like parsing in a worker process
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        now = time.perf_counter()
+        if stack:
+            self._pause(stack[-1], now)
+        entry = [name, now, self._enable(self._profiler(name)) if self.profile else None]
+        stack.append(entry)
+        try:
+            yield
+        finally:
+            stack.pop()
+            self._pause(entry, time.perf_counter())
+            if stack:
+                stack[-1][1] = time.perf_counter()
+                stack[-1][2] = self._enable(stack[-1][2])
+
+    def _pause(self, entry, now):
+        name, since, profiler = entry
+        if profiler is not None:
+            profiler.disable()
+        self.add_time(name, now - since)
+
+    def _enable(self, profiler):
+        if profiler is None:
+            return None
+        try:
+            profiler.enable()
+        except ValueError:
+            # newer Pythons allow only one active profiler per process; that stage just goes unprofiled
+            return None
+        return profiler
+
+    def _profiler(self, stage):
+        # one profiler per stage and thread, since a profiler can't be active in two threads at once
+        key = (stage, threading.get_ident())
+        with self._lock:
+            if key not in self._profilers:
+                self._profilers[key] = cProfile.Profile()
+            return self._profilers[key]
+
+    def watch(self, session):
+        # counts every response a requests session receives, by host and status
+        session.hooks['response'].append(self._on_response)
+        return session
+
+    def _on_response(self, response, *args, **kwargs):
+        host = urlparse(response.url).netloc
+        self.incr('http_requests', host=host, status=str(response.status_code))
+        # streamed bodies (the baseline download) are never held in memory, so take their declared length
+        if kwargs.get('stream'):
+            size = int(response.headers.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        self.incr('http_bytes', size, host=host)
+
+    def report(self):
+        seconds = time.perf_counter() - self._clock
+        processed = self.total('pages_processed')
+        counters = {}
+        for name, values in sorted(self.counters.items()):
+            if list(values) in ([], [()]):
+                counters[name] = values.get((), 0)
+            else:
+                counters[name] = {",".join(f"{k}={v}" for k, v in key): value for key, value in sorted(values.items())}
+        report = {
+            'script': self.script,
+            'started': datetime.fromtimestamp(self.started, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'seconds': round(seconds, 3),
+            'items_per_second': round(processed / seconds, 1) if seconds else 0.0,
+            'stage_thread_seconds': {name: round(value, 3) for name, value in sorted(self.stages.items())},
+            'counters': counters,
+        }
+        if self.profile and tracemalloc.is_tracing():
+            report['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        return report
+
+    def prometheus(self, report):
+        labels = f'script="{self.script}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+            for extra, value in samples:
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{labels}{extra}}} {value}")
+
+        metric("run_seconds", "gauge", "Wall time of the last run.", [("", report['seconds'])])
+        metric("run_timestamp_seconds", "gauge", "Unix time the last run started.", [("", int(self.started))])
+        metric("items_per_second", "gauge", "Wiki pages merged per second of the last run.",
+               [("", report['items_per_second'])])
+        metric("stage_thread_seconds", "gauge",
+               "Time spent in each stage of the last run, summed over the threads and parse workers running it; "
+               "stages overlap, so the total can exceed run_seconds.",
+               [(f',stage="{name}"', value) for name, value in report['stage_thread_seconds'].items()])
+        for name, values in sorted(self.counters.items()):
+            samples = [("".join(f',{k}="{v}"' for k, v in key), value) for key, value in sorted(values.items())]
+            metric(f"{name}_total", "counter", f"{name.replace('_', ' ').capitalize()} in the last run.",
+                   samples or [("", 0)])
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self):
+        if self.script is None:
+            return
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        base = os.path.join(self.metrics_dir, self.script)
+        report = self.report()
+        # the textfile collector may read at any moment, so both files are renamed into place
+        for path, text in ((base + ".json", json.dumps(report, indent=4)), (base + ".prom", self.prometheus(report))):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        if self.profile:
+            self._write_profiles(base)
+        print(f"Run metrics written to '{base}.json' and '{base}.prom'.")
+
+    def _write_profiles(self, base):
+        # the allocation snapshot goes first, before building the stats allocates anything of its own
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+            tracemalloc.stop()
+            with open(f"{base}.tracemalloc.txt", 'w', encoding='utf-8') as f:
+                for stat in snapshot.statistics('lineno')[:50]:
+                    f.write(f"{stat}\n")
+        by_stage = {}
+        for (stage, _), profiler in self._profilers.items():
+            by_stage.setdefault(stage, []).append(profiler)
+        for stage, profilers in by_stage.items():
+            pstats.Stats(*profilers).dump_stats(f"{base}.{stage}.prof")
+
+metrics = RunMetrics()
+
+
+def add_metrics_args(parser):
+    parser.add_argument("--metrics-dir", default=METRICS_DIR,
+                        help="where the JSON run report and Prometheus textfile are written")
+    parser.add_argument("--profile", action="store_true",
+                        help="also profile each stage with cProfile and the run with tracemalloc, saved next to the report")
@@ -0,0 +1,147 @@
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+
+from PIL import Image
+
+from items_writer import write_items
+
+ATLAS_SIZE = 1024
+PADDING = 1
+
+
+def load_index(index_path):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def sprite_for(index, item_id):
+    # (atlas filename, x, y, w, h) for an item id, or None
+    sprite_no = index['items'].get(str(item_id))
+    if sprite_no is None:
+        return None
+    atlas_no, x, y, w, h = index['sprites'][sprite_no]
+    return index['atlases'][atlas_no], x, y, w, h
+
+
+def _decode(icon_b64):
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(icon_b64)))
+        return image.convert('RGBA')
+    except (ValueError, OSError):
+        return None
+
+
+def collect_icons(item_database, output_dir, previous_index=None):
+    # inline base64 icons win; items whose icon was already stripped are cropped out of the previous atlas
+    previous_atlases = {}
+    images = {}
+    item_hashes = {}
+    for item_id in sorted(item_database, key=int):
+        item = item_database[item_id]
+        image = _decode(item['icon']) if item.get('icon') else None
+        if image is None and previous_index is not None:
+            sprite = sprite_for(previous_index, item_id)
+            if sprite:
+                atlas_file, x, y, w, h = sprite
+                if atlas_file not in previous_atlases:
+                    with Image.open(os.path.join(output_dir, atlas_file)) as atlas:
+                        previous_atlases[atlas_file] = atlas.convert('RGBA')
+                image = previous_atlases[atlas_file].crop((x, y, x + w, y + h))
+        if image is None:
+            continue
+        digest = hashlib.sha256(f"{image.size}".encode() + image.tobytes()).hexdigest()
+        images.setdefault(digest, image)
+        item_hashes[item_id] = digest
+    return images, item_hashes
+
+
+def pack(images, atlas_size=ATLAS_SIZE, padding=PADDING):
+    # shelf packing, tallest first; returns {digest: (atlas_no, x, y, w, h)} and each atlas's used height
+    placements = {}
+    heights = []
+    atlas_no, x, y, shelf_height = 0, 0, 0, 0
+    order = sorted(images, key=lambda d: (-images[d].height, -images[d].width, d))
+    for digest in order:
+        w, h = images[digest].size
+        if x + w > atlas_size:
+            x, y, shelf_height = 0, y + shelf_height + padding, 0
+        if y + h > atlas_size:
+            heights.append(y)
+            atlas_no, x, y, shelf_height = atlas_no + 1, 0, 0, 0
+        placements[digest] = (atlas_no, x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+    if placements:
+        heights.append(y + shelf_height)
+    return placements, heights
+
+
+def build_atlas(item_database, output_dir, atlas_size=ATLAS_SIZE):
+    index_path = os.path.join(output_dir, "index.json")
+    os.makedirs(output_dir, exist_ok=True)
+    images, item_hashes = collect_icons(item_database, output_dir, load_index(index_path))
+    placements, heights = pack(images, atlas_size)
+
+    atlases = [Image.new('RGBA', (atlas_size, max(1, height)), (0, 0, 0, 0)) for height in heights]
+    for digest, (atlas_no, x, y, w, h) in placements.items():
+        atlases[atlas_no].paste(images[digest], (x, y))
+
+    atlas_files = []
+    for atlas_no, atlas in enumerate(atlases):
+        filename = f"atlas_{atlas_no}.png"
+        tmp_path = os.path.join(output_dir, f".{filename}.tmp")
+        atlas.save(tmp_path, format='PNG', optimize=True)
+        os.replace(tmp_path, os.path.join(output_dir, filename))
+        atlas_files.append(filename)
+
+    # sprites are stored once and items point at them, so dose/charge variants cost one int each
+    sprite_order = sorted(placements, key=lambda d: placements[d])
+    sprite_numbers = {digest: n for n, digest in enumerate(sprite_order)}
+    index = {
+        'version': 1,
+        'atlases': atlas_files,
+        'sprites': [list(placements[digest]) for digest in sprite_order],
+        'items': {item_id: sprite_numbers[digest] for item_id, digest in item_hashes.items()},
+    }
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack item icons into sprite atlases with an id -> sprite index.")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--output-dir", default=os.path.join("database", "icons"))
+    parser.add_argument("--atlas-size", type=int, default=ATLAS_SIZE)
+    parser.add_argument("--strip-icons", action="store_true",
+                        help="rewrite the input without the inline base64 'icon' field once the atlas is built")
+    args = parser.parse_args()
+
+    print(f"Loading items from '{args.input}'.")
+    with open(args.input, 'r', encoding='utf-8') as f:
+        item_database = json.load(f)
+
+    index = build_atlas(item_database, args.output_dir, args.atlas_size)
+    atlas_bytes = sum(os.path.getsize(os.path.join(args.output_dir, name)) for name in index['atlases'])
+    index_bytes = os.path.getsize(os.path.join(args.output_dir, "index.json"))
+    print(f"Packed {len(index['items'])} item icons into {len(index['sprites'])} unique sprites "
+          f"across {len(index['atlases'])} atlas(es): {atlas_bytes / 1024:.1f} KB of PNG, {index_bytes / 1024:.1f} KB index.")
+
+    if args.strip_icons:
+        before = os.path.getsize(args.input)
+        write_items(args.input, item_database, omit_fields=('icon',))
+        after = os.path.getsize(args.input)
+        print(f"Stripped inline icons from '{args.input}': {before / 1024:.1f} KB -> {after / 1024:.1f} KB.")
+
+
+if __name__ == "__main__":
+    main()
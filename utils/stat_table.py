@@ -0,0 +1,156 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_left
+
+# Layout, all little-endian:
+#   header   magic, version, column count, row count, string table offset, string table length
+#   columns  one contiguous block per column in COLUMNS order, each starting on an 8-byte boundary
+#   strings  slot names joined by '\0'; the slot column stores an index into this list
+# Column-major storage is what lets the reader hand out zero-copy typed memoryviews per column.
+MAGIC = b'OSRSSTAT'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIII')
+
+STAT_KEYS = [
+    'attack_stab', 'attack_slash', 'attack_crush', 'attack_magic', 'attack_ranged',
+    'defence_stab', 'defence_slash', 'defence_crush', 'defence_magic', 'defence_ranged',
+    'melee_strength', 'ranged_strength', 'magic_damage', 'prayer'
+]
+COLUMNS = [('id', 'I'), ('slot', 'B')] + [(key, 'h') for key in STAT_KEYS] + [('attack_speed', 'h')]
+INT16_MIN, INT16_MAX = -32768, 32767
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _clamp16(value):
+    return max(INT16_MIN, min(INT16_MAX, int(value or 0)))
+
+
+def _column_offsets(row_count):
+    offsets = []
+    offset = _align(HEADER.size)
+    for _, code in COLUMNS:
+        offsets.append(offset)
+        offset = _align(offset + row_count * struct.calcsize(code))
+    return offsets, offset
+
+
+def write_stat_table(item_database, path):
+    rows = []
+    slot_names = []
+    slot_codes = {}
+    for item_id in sorted(item_database, key=int):
+        item = item_database[item_id]
+        equipment = item.get('equipment')
+        if not equipment:
+            continue
+        slot = equipment.get('slot') or 'none'
+        if slot not in slot_codes:
+            slot_codes[slot] = len(slot_names)
+            slot_names.append(slot)
+        weapon = item.get('weapon') or {}
+        rows.append([int(item_id), slot_codes[slot]]
+                    + [_clamp16(equipment.get(key)) for key in STAT_KEYS]
+                    + [_clamp16(weapon.get('attack_speed'))])
+
+    offsets, strings_offset = _column_offsets(len(rows))
+    strings = '\0'.join(slot_names).encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS), len(rows), strings_offset, len(strings)))
+        for column_no, (_, code) in enumerate(COLUMNS):
+            f.write(b'\0' * (offsets[column_no] - f.tell()))
+            f.write(struct.pack(f'<{len(rows)}{code}', *(row[column_no] for row in rows)))
+        f.write(b'\0' * (strings_offset - f.tell()))
+        f.write(strings)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class StatTable:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, column_count, self.row_count, strings_offset, strings_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or column_count != len(COLUMNS):
+            self.close()
+            raise ValueError(f"'{path}' is not a version {VERSION} stat table")
+        strings = self._mmap[strings_offset:strings_offset + strings_length].decode('utf-8')
+        self.slot_names = strings.split('\0') if strings else []
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        offsets, _ = _column_offsets(self.row_count)
+        self.columns = {}
+        for (name, code), offset in zip(COLUMNS, offsets):
+            raw = view[offset:offset + self.row_count * struct.calcsize(code)]
+            self._views.append(raw)
+            if sys.byteorder == 'little':
+                self.columns[name] = raw.cast(code)
+            else:
+                # big-endian hosts get a byte-swapped copy instead of a zero-copy view
+                import array
+                column = array.array(code, raw.tobytes())
+                column.byteswap()
+                self.columns[name] = memoryview(column)
+
+    def __len__(self):
+        return self.row_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # every view onto the mmap has to be released before the mmap itself can close
+        for column in getattr(self, 'columns', {}).values():
+            column.release()
+        for view in reversed(getattr(self, '_views', [])):
+            view.release()
+        self.columns = {}
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+
+    def column(self, name):
+        return self.columns[name]
+
+    def slot_code(self, slot):
+        return self.slot_names.index(slot)
+
+    def row(self, index):
+        record = {name: self.columns[name][index] for name, _ in COLUMNS}
+        record['slot'] = self.slot_names[record['slot']]
+        return record
+
+    def find(self, item_id):
+        ids = self.columns['id']
+        index = bisect_left(ids, item_id)
+        if index < self.row_count and ids[index] == item_id:
+            return self.row(index)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export equipment stats from items.json into a packed binary table.")
+    parser.add_argument("--input", default=os.path.join("database", "items.json"))
+    parser.add_argument("--output", default=os.path.join("database", "stats.bin"))
+    args = parser.parse_args()
+
+    print(f"Loading items from '{args.input}'.")
+    with open(args.input, 'r', encoding='utf-8') as f:
+        item_database = json.load(f)
+    row_count = write_stat_table(item_database, args.output)
+    print(f"Wrote {row_count} rows to '{args.output}' ({os.path.getsize(args.output) / 1024:.1f} KB).")
+
+
+if __name__ == "__main__":
+    main()
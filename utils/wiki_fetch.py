@@ -0,0 +1,414 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from run_metrics import metrics
+
+# point this at a local stub (see utils/benchmarks/stub_wiki.py) to run the pipeline offline
+WIKI_API_URL = os.environ.get("OSRS_WIKI_API_URL", "https://oldschool.runescape.wiki/api.php")
+
+# every api.php request asks to be refused while replicas lag more than MAXLAG seconds, as MediaWiki asks
+# of bots, and is retried with backoff on lag, throttling, server errors and dropped connections
+MAXLAG = 5
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+REQUEST_TIMEOUT = 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_CODES = {"maxlag", "ratelimited", "readonly"}
+
+# --crawl splits the category into these sortkey-prefix ranges, crawled side by side since each range's
+# continuation chain is serial; "" to the first prefix also covers titles starting with digits or symbols
+CRAWL_RANGES = ["", "B", "D", "G", "L", "P", "S", "U"]
+# continuations that mean the current batch of generated pages isn't complete yet
+PROP_CONTINUES = {"rvcontinue", "picontinue"}
+
+# rows per action=bucket request; the api allows up to 5000, smaller pages keep responses well under the size cap
+BUCKET_PAGE_SIZE = 500
+
+# adaptive batch size: the api takes at most 50 titles per query and caps a result at 8 MiB
+MAX_TITLES = 50
+TARGET_SECONDS = 10.0
+TARGET_BYTES = 4 * 1024 * 1024
+GROW_BY = 5
+
+
+class TokenBucket:
+    # refills at `rate` tokens per second up to `capacity`; acquire() blocks until a token is free
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_for = (tokens - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def mount_pooled_adapter(session, concurrency):
+    # one keep-alive connection per in-flight batch, plus headroom for icon downloads
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, concurrency * 2))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class WikiAPIError(requests.exceptions.RequestException):
+    # api.php answered, but with an error object (or a body that wasn't JSON) instead of a result
+    def __init__(self, code, info=""):
+        super().__init__(f"{code}: {info}" if info else code)
+        self.code = code
+
+
+def _retry_delay(attempt, response=None):
+    # the server's Retry-After wins; otherwise exponential backoff with jitter so parallel batches don't retry in step
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _api_request(session, params, limiter=None, max_retries=MAX_RETRIES):
+    # returns (data, response size in bytes); raises the last error once the retries are used up
+    params = {"maxlag": MAXLAG, **params}
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        response = None
+        try:
+            response = session.get(WIKI_API_URL, params=params, timeout=REQUEST_TIMEOUT)
+            if response.status_code in RETRY_STATUSES:
+                reason = str(response.status_code)
+                error = requests.exceptions.HTTPError(f"{response.status_code} from the wiki", response=response)
+            else:
+                response.raise_for_status()
+                try:
+                    data = response.json()
+                except json.JSONDecodeError:
+                    raise WikiAPIError("badjson", "response was not JSON") from None
+                api_error = data.get("error") if isinstance(data, dict) else None
+                if not api_error:
+                    return data, len(response.content)
+                error = WikiAPIError(api_error.get("code", "unknown"), api_error.get("info", ""))
+                if error.code not in RETRY_CODES:
+                    raise error
+                reason = error.code
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            reason, error = type(e).__name__, e
+        if attempt == max_retries:
+            raise error
+        metrics.incr("http_retries", reason=reason)
+        time.sleep(_retry_delay(attempt, response))
+
+
+def api_get(session, params, limiter=None, max_retries=MAX_RETRIES):
+    # GET api.php with maxlag set, retrying lag, throttling, server errors and dropped connections with backoff
+    return _api_request(session, params, limiter, max_retries)[0]
+
+
+def _should_bisect(error):
+    # splitting only helps when the api blamed something in the batch. Server errors, timeouts and dropped
+    # connections have already been retried with backoff by then and hit every half alike, so the batch fails once
+    return isinstance(error, WikiAPIError) and error.code not in RETRY_CODES and error.code != "badjson"
+
+
+class BatchSizer:
+    # titles per request, adapted to the responses: halved after a failure or a slow/oversized response,
+    # grown back a few titles at a time while there is headroom. Shared by the fetch threads.
+    def __init__(self, size=50, minimum=1, maximum=MAX_TITLES, target_seconds=TARGET_SECONDS, target_bytes=TARGET_BYTES):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(size, maximum))
+        self.target_seconds = target_seconds
+        self.target_bytes = target_bytes
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, nbytes):
+        with self._lock:
+            if seconds > self.target_seconds or nbytes > self.target_bytes:
+                self.size = max(self.minimum, self.size // 2)
+            elif seconds < self.target_seconds / 2 and nbytes < self.target_bytes / 2:
+                self.size = min(self.maximum, self.size + GROW_BY)
+
+    def failed(self):
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+    def cut_off_at(self, fitted):
+        # the result size limit was hit after `fitted` pages, so that's what a request can hold for now
+        with self._lock:
+            self.size = max(self.minimum, min(self.size, fitted))
+
+
+def _page_entry(page_data, content=True):
+    # {"content", "timestamp", "icon_url", "revid"} for a page that came back with its revision, else None;
+    # without content only the revision metadata and thumbnail are expected
+    revisions = page_data.get("revisions")
+    if not page_data.get("title") or not revisions:
+        return None
+    revision = revisions[0]
+    timestamp = revision.get("timestamp")
+    if not timestamp or (content and not revision.get("*")):
+        return None
+    entry = {"timestamp": timestamp, "icon_url": page_data.get("thumbnail", {}).get("source"), "revid": revision.get("revid")}
+    if content:
+        entry["content"] = revision["*"]
+    return entry
+
+
+def _query_pages(page_titles, session, limiter, sizer, content=True):
+    # one request for the batch; returns (found, titles the result size limit cut off) and counts missing pages
+    params = {
+        "action": "query", "prop": "revisions|pageimages", "rvprop": "content|timestamp|ids" if content else "timestamp|ids",
+        "format": "json", "titles": "|".join(page_titles), "pithumbsize": 50
+    }
+    start = time.perf_counter()
+    with metrics.stage("content_fetch"):
+        data, nbytes = _api_request(session, params, limiter)
+    if sizer is not None:
+        sizer.observe(time.perf_counter() - start, nbytes)
+
+    query = data.get("query", {})
+    order = {title: n for n, title in enumerate(page_titles)}
+    for entry in query.get("normalized", []):
+        order.setdefault(entry["to"], order.get(entry["from"], len(order)))
+    found = {}
+    cut_off = []
+    for _, page_data in query.get("pages", {}).items():
+        title = page_data.get("title")
+        entry = _page_entry(page_data, content)
+        if entry is not None:
+            found[title] = entry
+            continue
+        # pages past the api's result size limit come back bare, with a continuation to fetch them later
+        if title and "continue" in data and "missing" not in page_data and "invalid" not in page_data:
+            cut_off.append(title)
+        else:
+            metrics.incr("pages_missing")
+    metrics.incr("pages_fetched", len(found))
+    # requested order rather than the api's pageid order, so the merge doesn't depend on where batches were cut
+    return dict(sorted(found.items(), key=lambda entry: order.get(entry[0], len(order)))), cut_off
+
+
+def batch_get_wiki_data(page_titles, session, limiter=None, sizer=None, content=True):
+    # a batch the api rejects with an error about its pages is split in half and each half retried, so one bad
+    # title only loses itself; every title ends up counted as fetched, missing or failed
+    try:
+        results, cut_off = _query_pages(page_titles, session, limiter, sizer, content)
+    except requests.exceptions.RequestException as e:
+        # timeouts and server errors suggest the batch was too heavy; an api error about one page doesn't
+        if sizer is not None and not isinstance(e, WikiAPIError):
+            sizer.failed()
+        if len(page_titles) > 1 and _should_bisect(e):
+            metrics.incr("batch_bisections")
+            middle = len(page_titles) // 2
+            results = batch_get_wiki_data(page_titles[:middle], session, limiter, sizer, content)
+            results.update(batch_get_wiki_data(page_titles[middle:], session, limiter, sizer, content))
+            return results
+        print(f"Could not fetch {len(page_titles)} title(s) starting at '{page_titles[0]}': {e}")
+        metrics.incr("pages_failed", len(page_titles))
+        return {}
+
+    if cut_off:
+        if sizer is not None:
+            sizer.cut_off_at(len(page_titles) - len(cut_off))
+        if len(cut_off) == len(page_titles) and len(page_titles) > 1:
+            middle = len(page_titles) // 2
+            results = batch_get_wiki_data(page_titles[:middle], session, limiter, sizer, content)
+            results.update(batch_get_wiki_data(page_titles[middle:], session, limiter, sizer, content))
+        elif len(cut_off) < len(page_titles):
+            results.update(batch_get_wiki_data(cut_off, session, limiter, sizer, content))
+        else:
+            metrics.incr("pages_failed")
+    return results
+
+
+def get_recent_changes(session, since):
+    # main-namespace edits and page creations at or after `since` (wiki timestamp format), oldest first
+    params = {
+        "action": "query", "format": "json", "list": "recentchanges", "rcstart": since, "rcdir": "newer",
+        "rcnamespace": "0", "rctype": "edit|new", "rcprop": "title|timestamp", "rclimit": "500"
+    }
+    changes = []
+    last_continue = {}
+    while True:
+        try:
+            with metrics.stage("titles"):
+                data = api_get(session, {**params, **last_continue})
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching recent changes: {e}")
+            return None
+        for change in data.get("query", {}).get("recentchanges", []):
+            changes.append({"title": change["title"], "type": change.get("type"), "timestamp": change.get("timestamp")})
+        if "continue" not in data:
+            return changes
+        last_continue = data["continue"]
+
+
+def get_category_members(session, titles, category="Category:Items", limiter=None):
+    # the titles that are in the category, asked MAX_TITLES at a time; None when the wiki couldn't be asked
+    members = set()
+    for start in range(0, len(titles), MAX_TITLES):
+        params = {
+            "action": "query", "format": "json", "prop": "categories", "clcategories": category, "cllimit": "max",
+            "titles": "|".join(titles[start:start + MAX_TITLES])
+        }
+        last_continue = {}
+        while True:
+            try:
+                with metrics.stage("titles"):
+                    data = api_get(session, {**params, **last_continue}, limiter)
+            except requests.exceptions.RequestException as e:
+                print(f"Error checking {category} membership: {e}")
+                return None
+            for page_data in data.get("query", {}).get("pages", {}).values():
+                if page_data.get("categories"):
+                    members.add(page_data["title"])
+            if "continue" not in data:
+                break
+            last_continue = data["continue"]
+    return members
+
+
+def iter_wiki_batches(all_titles, session, batch_size=50, concurrency=4, requests_per_second=5, content=True):
+    # keeps up to `concurrency` batches in flight but yields (batch_titles, data) in submission
+    # order, so callers merge exactly as the old one-batch-at-a-time loop did. Batches start at
+    # `batch_size` titles and are cut from the list as they're submitted, at whatever size the sizer is at.
+    # content=False fetches only each page's timestamp, revid and thumbnail
+    limiter = TokenBucket(requests_per_second)
+    sizer = BatchSizer(batch_size)
+    metrics.incr("pages_requested", len(all_titles))
+    position = 0
+
+    def next_batch():
+        nonlocal position
+        batch_titles = all_titles[position:position + sizer.size]
+        position += len(batch_titles)
+        return batch_titles
+
+    if concurrency <= 1:
+        while position < len(all_titles):
+            batch_titles = next_batch()
+            yield batch_titles, batch_get_wiki_data(batch_titles, session, limiter, sizer, content)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+        while position < len(all_titles) and len(in_flight) < concurrency:
+            batch_titles = next_batch()
+            in_flight.append((batch_titles, executor.submit(batch_get_wiki_data, batch_titles, session, limiter, sizer, content)))
+        while in_flight:
+            batch_titles, future = in_flight.popleft()
+            if position < len(all_titles):
+                next_titles = next_batch()
+                in_flight.append((next_titles, executor.submit(batch_get_wiki_data, next_titles, session, limiter, sizer, content)))
+            yield batch_titles, future.result()
+
+
+def _crawl_range(session, category, start, end, limiter, batch_size, on_pages):
+    # one generator=categorymembers chain over [start, end) of the category's sortkeys; each complete batch
+    # of pages is handed to on_pages as {title: data}
+    params = {
+        "action": "query", "format": "json", "generator": "categorymembers", "gcmtitle": category,
+        "gcmlimit": batch_size, "gcmsort": "sortkey", "prop": "revisions|pageimages",
+        "rvprop": "content|timestamp|ids", "pithumbsize": 50
+    }
+    if start:
+        params["gcmstartsortkeyprefix"] = start
+    if end:
+        params["gcmendsortkeyprefix"] = end
+    pending = {}
+    last_continue = {}
+    while True:
+        with metrics.stage("content_fetch"):
+            data = api_get(session, {**params, **last_continue}, limiter)
+        # pages past the result size limit come back bare and are filled in by the continued request
+        for page_id, page_data in data.get("query", {}).get("pages", {}).items():
+            merged = pending.setdefault(page_id, {})
+            merged.update({key: value for key, value in page_data.items() if value or key not in merged})
+        last_continue = data.get("continue", {})
+        if not PROP_CONTINUES.intersection(last_continue):
+            found = {}
+            for page_data in pending.values():
+                entry = _page_entry(page_data)
+                if entry is not None:
+                    found[page_data["title"]] = entry
+                else:
+                    metrics.incr("pages_missing")
+            metrics.incr("pages_fetched", len(found))
+            on_pages(found)
+            pending = {}
+        if not last_continue:
+            return
+
+
+def crawl_category(session, page_cache, category="Category:Items", concurrency=4, requests_per_second=5,
+                   batch_size=MAX_TITLES, on_pages=None):
+    # lists the category and fetches every member's content, timestamp and thumbnail in the same paginated
+    # requests, straight into the page cache. Returns (titles crawled, whether every range finished); after a
+    # partial crawl the caller has to list the category the usual way to find what was missed. on_pages, if
+    # given, is called with each batch as it arrives, e.g. to download icons while the crawl goes on
+    limiter = TokenBucket(requests_per_second)
+    titles = set()
+    lock = threading.Lock()
+
+    def store(found):
+        page_cache.store_pages(found)
+        if on_pages is not None:
+            on_pages(found)
+        with lock:
+            titles.update(found)
+            print(f"Crawled {len(titles)} pages...", end='\r')
+
+    print(f"Crawling {category} with page content.")
+    ranges = list(zip(CRAWL_RANGES, CRAWL_RANGES[1:] + [None]))
+    complete = True
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(_crawl_range, session, category, start, end, limiter, batch_size, store)
+                   for start, end in ranges]
+        for (start, end), future in zip(ranges, futures):
+            try:
+                future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"\nCould not crawl {category} from '{start}' to '{end or 'the end'}': {e}")
+                complete = False
+    page_cache.commit()
+    print(f"\nCrawled {len(titles)} pages of {category}.")
+    return titles, complete
+
+
+def bucket_query(bucket, fields, limit, offset):
+    # the wiki's Bucket query language, as accepted by action=bucket
+    select = ",".join(f"'{field}'" for field in fields)
+    return f"bucket('{bucket}').select({select}).limit({limit}).offset({offset}).run()"
+
+
+def iter_bucket_rows(session, bucket, fields, limiter=None, page_size=BUCKET_PAGE_SIZE):
+    # every row of a bucket as a dict of the selected fields, page_size rows per request
+    offset = 0
+    while True:
+        params = {"action": "bucket", "format": "json", "query": bucket_query(bucket, fields, page_size, offset)}
+        with metrics.stage("content_fetch"):
+            rows = api_get(session, params, limiter).get("bucket", [])
+        metrics.incr("bucket_rows", len(rows), bucket=bucket)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        offset += page_size